@@ -0,0 +1,34 @@
+"""
+审计日志归档任务
+预建未来月份分区，并将超过保留期的分区导出为压缩归档文件后删除
+用法：python archive_audit_logs.py [保留月数]
+"""
+import sys
+from utils.audit_archive import run_retention, HOT_RETENTION_MONTHS, ARCHIVE_DIR
+
+if __name__ == "__main__":
+    retention_months = int(sys.argv[1]) if len(sys.argv) > 1 else HOT_RETENTION_MONTHS
+
+    print("=" * 60)
+    print(f"  审计日志归档（在线保留 {retention_months} 个月）")
+    print("=" * 60)
+    print()
+
+    try:
+        result = run_retention(retention_months=retention_months)
+        if not result["partitioned"]:
+            print("✗ operation_logs 尚未分区，请先执行 python upgrade_audit_partitions.py")
+            sys.exit(1)
+
+        for name in result["created"]:
+            print(f"  ✓ 新建分区 {name}")
+        for name, count in result["archived"].items():
+            print(f"  ✓ 归档分区 {name}：{count} 条")
+        if not result["created"] and not result["archived"]:
+            print("  - 无需处理")
+
+        print(f"\n归档目录：{ARCHIVE_DIR}")
+
+    except Exception as e:
+        print(f"\n❌ 归档失败: {e}")
+        sys.exit(1)
@@ -0,0 +1,337 @@
+"""
+接口性能基准测试
+- 默认在进程内运行应用（不启动定时任务），也可通过 --base-url 测试本机运行中的服务
+- 覆盖登录、仪表盘、各列表接口的首页与深分页、搜索、导出、审计日志查询
+- 每个场景先预热，再记录 p50/p95/p99 延迟与吞吐量
+- --save 将结果保存为基线 JSON；--compare 与基线比较，任一场景退化超过阈值时返回非零退出码
+- 需先准备数据：python generate_bench_data.py --scale small
+用法：
+  python benchmark_api.py --save                 # 记录基线
+  python benchmark_api.py --compare              # 与基线比较（可用于 CI）
+  python benchmark_api.py --only papers --iterations 200
+  python benchmark_api.py --base-url http://127.0.0.1:8000 --concurrency 4
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# 基准配置
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_ITERATIONS = 50  # 每个场景的计时请求数
+WARMUP_ITERATIONS = 5  # 每个场景的预热请求数
+REGRESSION_THRESHOLD = 0.20  # 相对基线的允许退化比例
+NOISE_FLOOR_MS = 5.0  # 绝对差值低于该值时不判定退化（避免极快接口的抖动误报）
+COMPARED_PERCENTILES = ("p50", "p95")  # 参与退化判定的分位数
+ADMIN_ACCOUNT = ("admin", "Admin@123")  # 管理员账号（setup_database.py 创建，不存在时跳过管理员场景）
+
+PAGE_SIZE = 20
+DATASET_TABLES = ("users", "projects", "papers", "funds", "achievements")  # 判断数据集是否相同的业务表
+COUNTED_TABLES = DATASET_TABLES + ("operation_logs",)  # operation_logs 每次运行都随登录和审计写入增长，不参与判断
+
+
+class Scenario:
+    """基准场景"""
+
+    def __init__(self, name: str, method: str, path: str, role: str = "teacher",
+                 params: Optional[Dict[str, Any]] = None, body: Optional[Dict[str, Any]] = None,
+                 iterations: Optional[int] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.role = role  # teacher / secretary / admin / anonymous
+        self.params = params or {}
+        self.body = body
+        self.iterations = iterations  # 较慢的场景（登录、导出）使用较少的次数
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩法分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+# ==================== 数据集与账号 ====================
+
+def dataset_info() -> Dict[str, Any]:
+    """读取数据规模与测试账号（基准结果只在相同规模的数据集之间可比）"""
+    from sqlalchemy import text
+    from database import engine
+    from generate_bench_data import BENCH_PASSWORD
+
+    with engine.connect() as conn:
+        counts = {
+            table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in COUNTED_TABLES
+        }
+        # Zipf 分布下最早生成的教师项目最多，作为最坏情况的"我的项目"账号
+        teacher = conn.execute(text(
+            "SELECT id, username FROM users WHERE role = 'TEACHER' AND username LIKE 'bench%' "
+            "ORDER BY id LIMIT 1"
+        )).first()
+        secretary = conn.execute(text(
+            "SELECT username FROM users WHERE role = 'SECRETARY' AND username LIKE 'bench%' "
+            "ORDER BY id LIMIT 1"
+        )).scalar()
+        busiest_project = conn.execute(text(
+            "SELECT project_id FROM funds GROUP BY project_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+
+    if teacher is None or secretary is None:
+        raise RuntimeError("未找到测试账号，请先执行 python generate_bench_data.py")
+    return {
+        "counts": counts,
+        "teacher": {"id": teacher[0], "username": teacher[1], "password": BENCH_PASSWORD},
+        "secretary": {"username": secretary, "password": BENCH_PASSWORD},
+        "busiest_project": busiest_project or 1,
+    }
+
+
+def deep_skip(total: int) -> int:
+    """深分页偏移量：倒数第二页"""
+    return max(total - 2 * PAGE_SIZE, 0)
+
+
+def build_scenarios(info: Dict[str, Any]) -> List[Scenario]:
+    counts = info["counts"]
+    teacher = info["teacher"]
+    today = date.today()
+    audit_pages = max(counts["operation_logs"] // PAGE_SIZE - 1, 1)
+
+    return [
+        Scenario("login", "POST", "/api/auth/login", role="anonymous",
+                 body={"username": teacher["username"], "password": teacher["password"]}, iterations=10),
+        Scenario("dashboard", "GET", "/api/statistics/dashboard"),
+        Scenario("statistics_overview", "GET", "/api/statistics/overview"),
+        Scenario("projects_first_page", "GET", "/api/projects/", params={"skip": 0, "limit": PAGE_SIZE}),
+        Scenario("projects_deep_page", "GET", "/api/projects/",
+                 params={"skip": deep_skip(counts["projects"]), "limit": PAGE_SIZE}),
+        Scenario("projects_my", "GET", "/api/projects/my"),
+        Scenario("papers_first_page", "GET", "/api/papers/", params={"skip": 0, "limit": PAGE_SIZE}),
+        Scenario("papers_deep_page", "GET", "/api/papers/",
+                 params={"skip": deep_skip(counts["papers"]), "limit": PAGE_SIZE}),
+        Scenario("papers_search", "GET", "/api/papers/search", params={"keyword": "Federated", "limit": PAGE_SIZE}),
+        Scenario("funds_first_page", "GET", "/api/funds/", params={"skip": 0, "limit": PAGE_SIZE}),
+        Scenario("funds_deep_page", "GET", "/api/funds/",
+                 params={"skip": deep_skip(counts["funds"]), "limit": PAGE_SIZE}),
+        Scenario("funds_project_summary", "GET", f"/api/funds/project/{info['busiest_project']}/summary"),
+        Scenario("achievements_first_page", "GET", "/api/achievements/", params={"skip": 0, "limit": PAGE_SIZE}),
+        Scenario("achievements_deep_page", "GET", "/api/achievements/",
+                 params={"skip": deep_skip(counts["achievements"]), "limit": PAGE_SIZE}),
+        Scenario("users_list", "GET", "/api/users/", role="admin", params={"skip": 0, "limit": PAGE_SIZE}),
+        Scenario("projects_export", "GET", "/api/projects/export", iterations=5),
+        Scenario("papers_export", "GET", "/api/papers/export", iterations=5),
+        Scenario("audit_logs_first_page", "GET", "/api/audit/logs", role="secretary",
+                 params={"page": 1, "page_size": PAGE_SIZE}),
+        Scenario("audit_logs_deep_page", "GET", "/api/audit/logs", role="secretary",
+                 params={"page": audit_pages, "page_size": PAGE_SIZE}),
+        Scenario("audit_logs_filtered", "GET", "/api/audit/logs", role="secretary",
+                 params={"page": 1, "page_size": PAGE_SIZE, "module": "fund", "username": "bench",
+                         "start_date": (today - timedelta(days=30)).isoformat()}),
+        Scenario("audit_statistics", "GET", "/api/audit/logs/statistics", role="secretary", params={"days": 7}),
+        Scenario("audit_export_day", "GET", "/api/audit/logs/export", role="secretary", iterations=5,
+                 params={"format": "ndjson", "start_date": (today - timedelta(days=1)).isoformat()}),
+    ]
+
+
+# ==================== 执行 ====================
+
+def make_client(base_url: Optional[str]):
+    """进程内客户端（不触发 startup 事件，不启动定时任务）或本机服务客户端"""
+    import httpx
+
+    if base_url:
+        return httpx.Client(base_url=base_url, timeout=120)
+
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
+
+
+def login(client, username: str, password: str) -> Dict[str, str]:
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    if response.status_code != 200:
+        raise RuntimeError(f"登录失败（{username}）: {response.status_code} {response.text[:200]}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def run_scenario(client, scenario: Scenario, headers: Dict[str, str],
+                 iterations: int, concurrency: int) -> Dict[str, Any]:
+    """预热后执行计时请求，返回延迟分位数与吞吐量"""
+
+    def call() -> float:
+        started = time.perf_counter()
+        response = client.request(scenario.method, scenario.path, params=scenario.params,
+                                  json=scenario.body, headers=headers)
+        _ = response.content  # 流式响应（导出）读取完整响应体
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return elapsed
+
+    for _ in range(min(WARMUP_ITERATIONS, iterations)):
+        call()
+
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def timed(_):
+        try:
+            latencies.append(call())
+        except Exception as e:
+            errors.append(str(e))
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(iterations)))
+    else:
+        for i in range(iterations):
+            timed(i)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50": round(percentile(latencies, 50), 2),
+        "p95": round(percentile(latencies, 95), 2),
+        "p99": round(percentile(latencies, 99), 2),
+        "max": round(latencies[-1], 2) if latencies else 0.0,
+        "throughput": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+# ==================== 基线 ====================
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, report: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any]) -> List[str]:
+    """与基线比较，返回退化描述列表"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for key in COMPARED_PERCENTILES:
+            before, after = base[key], current[key]
+            if after - before > NOISE_FLOOR_MS and after > before * (1 + REGRESSION_THRESHOLD):
+                regressions.append(f"{name} {key}: {before:.1f}ms → {after:.1f}ms（+{(after / before - 1) * 100:.0f}%）")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]):
+    print(f"  {'场景':<26}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'错误':>6}{'p95变化':>10}")
+    for name, r in results.items():
+        change = ""
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base["p95"] > 0:
+            change = f"{(r['p95'] / base['p95'] - 1) * 100:+.0f}%"
+        print(f"  {name:<26}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['throughput']:>9.1f}{r['errors']:>6}{change:>10}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="接口性能基准测试")
+    parser.add_argument("--base-url", help="测试本机运行中的服务（默认进程内运行应用）")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="每个场景的计时请求数")
+    parser.add_argument("--concurrency", type=int, default=1, help="每个场景的并发请求数")
+    parser.add_argument("--only", action="append", default=[], help="只运行名称包含该字符串的场景（可重复）")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument("--save", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线比较，退化时返回非零退出码")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("=" * 60)
+    print("  科研管理系统 - 接口性能基准测试")
+    print("=" * 60)
+
+    info = dataset_info()
+    scenarios = [s for s in build_scenarios(info) if not args.only or any(k in s.name for k in args.only)]
+    print(f"  目标: {args.base_url or '进程内应用'}  并发: {args.concurrency}")
+    print("  数据规模: " + "，".join(f"{table} {count:,}" for table, count in info["counts"].items()))
+    print()
+
+    client = make_client(args.base_url)
+    headers = {
+        "anonymous": {},
+        "teacher": login(client, info["teacher"]["username"], info["teacher"]["password"]),
+        "secretary": login(client, info["secretary"]["username"], info["secretary"]["password"]),
+    }
+    try:
+        headers["admin"] = login(client, *ADMIN_ACCOUNT)
+    except RuntimeError as e:
+        print(f"  ⚠ {e}，跳过管理员场景")
+        scenarios = [s for s in scenarios if s.role != "admin"]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario in scenarios:
+        iterations = min(scenario.iterations or args.iterations, args.iterations)
+        print(f"  运行 {scenario.name}（{iterations} 次）...", end="", flush=True)
+        results[scenario.name] = run_scenario(client, scenario, headers[scenario.role],
+                                              iterations, args.concurrency)
+        print(f" p95 {results[scenario.name]['p95']:.1f}ms")
+    print()
+
+    baseline = load_baseline(args.baseline)
+    print_table(results, baseline)
+
+    report = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "dataset": info["counts"],
+        "results": results,
+    }
+
+    failed = [name for name, r in results.items() if r["errors"]]
+    for name in failed:
+        print(f"\n  ✗ {name} 出现 {results[name]['errors']} 个错误: {results[name]['first_error']}")
+
+    regressions: List[str] = []
+    if args.compare:
+        if baseline is None:
+            print(f"\n  ✗ 基线文件不存在: {args.baseline}（先执行 --save）")
+            sys.exit(1)
+        baseline_dataset = baseline.get("dataset") or {}
+        if any(baseline_dataset.get(table) != info["counts"][table] for table in DATASET_TABLES):
+            print("\n  ⚠ 当前数据规模与基线不同，比较结果仅供参考")
+        regressions = compare(results, baseline)
+        for line in regressions:
+            print(f"  ✗ 性能退化 {line}")
+
+    if args.save and not failed:
+        save_baseline(args.baseline, report)
+        print(f"\n  ✓ 基线已保存: {args.baseline}")
+
+    print("\n" + "=" * 60)
+    if failed or regressions:
+        print(f"  ❌ 基准测试未通过（错误 {len(failed)} 个场景，退化 {len(regressions)} 项）")
+        print("=" * 60)
+        sys.exit(1)
+    print("  ✅ 基准测试通过")
+    print("=" * 60)
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 import models
 import schemas
+from crud.attachment import release_owner_attachments
 
 
 def get_achievement_by_id(db: Session, achievement_id: int) -> Optional[models.Achievement]:
@@ -70,6 +71,7 @@ def delete_achievement(db: Session, achievement_id: int) -> bool:
     if not db_achievement:
         return False
     
+    release_owner_attachments(db, "achievement", achievement_id)
     db.delete(db_achievement)
     db.commit()
     return True
@@ -0,0 +1,80 @@
+"""
+附件 CRUD 操作
+"""
+from sqlalchemy.orm import Session
+from typing import Optional, List
+import models
+from utils.attachments import store_blob, release_blob
+
+# 可挂附件的业务表
+OWNER_MODELS = {
+    "project": models.Project,
+    "achievement": models.Achievement,
+}
+
+
+def get_owner(db: Session, owner_type: str, owner_id: int):
+    """获取附件所属的业务记录"""
+    model = OWNER_MODELS[owner_type]
+    return db.query(model).filter(model.id == owner_id).first()
+
+
+def get_attachment_by_id(db: Session, attachment_id: int) -> Optional[models.Attachment]:
+    """根据ID获取附件"""
+    return db.query(models.Attachment).filter(models.Attachment.id == attachment_id).first()
+
+
+def get_attachments(db: Session, owner_type: str, owner_id: int) -> List[models.Attachment]:
+    """获取业务记录的附件列表"""
+    return (
+        db.query(models.Attachment)
+        .filter(models.Attachment.owner_type == owner_type, models.Attachment.owner_id == owner_id)
+        .order_by(models.Attachment.id)
+        .all()
+    )
+
+
+def create_attachment(
+    db: Session,
+    owner_type: str,
+    owner_id: int,
+    temp_path: str,
+    sha256: str,
+    size: int,
+    filename: str,
+    content_type: Optional[str],
+    uploader_id: int
+) -> models.Attachment:
+    """创建附件（引用内容与写附件行在同一事务内）"""
+    try:
+        store_blob(db, temp_path, sha256, size)
+        db_attachment = models.Attachment(
+            owner_type=owner_type,
+            owner_id=owner_id,
+            sha256=sha256,
+            filename=filename,
+            content_type=content_type,
+            size=size,
+            uploader_id=uploader_id,
+        )
+        db.add(db_attachment)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(db_attachment)
+    return db_attachment
+
+
+def delete_attachment(db: Session, db_attachment: models.Attachment):
+    """删除附件并释放内容引用"""
+    release_blob(db, db_attachment.sha256)
+    db.delete(db_attachment)
+    db.commit()
+
+
+def release_owner_attachments(db: Session, owner_type: str, owner_id: int):
+    """业务记录删除时释放其全部附件（在调用方事务内，不提交）"""
+    for db_attachment in get_attachments(db, owner_type, owner_id):
+        release_blob(db, db_attachment.sha256)
+        db.delete(db_attachment)
@@ -1,10 +1,12 @@
 """
 经费 CRUD 操作
 """
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import models
 import schemas
+from utils import fund_ledger
 
 
 def get_fund_by_id(db: Session, fund_id: int) -> Optional[models.Fund]:
@@ -37,10 +39,17 @@ def get_funds(
 
 
 def create_fund(db: Session, fund: schemas.FundCreate) -> models.Fund:
-    """创建经费记录"""
-    db_fund = models.Fund(**fund.dict())
-    db.add(db_fund)
-    db.commit()
+    """创建经费记录（同一事务内计入项目台账，开启预算硬性限制时超支抛出 BudgetExceeded）"""
+    try:
+        spent = fund_ledger.lock_ledger(db, fund.project_id)
+        fund_ledger.check_budget(db, fund.project_id, spent, fund.amount)
+        db_fund = models.Fund(**fund.dict())
+        db.add(db_fund)
+        fund_ledger.record_expense(db, fund.project_id, fund.expense_type, fund.amount, fund.expense_date)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_fund)
     return db_fund
 
@@ -50,63 +59,78 @@ def update_fund(
     fund_id: int,
     fund_update: schemas.FundUpdate
 ) -> Optional[models.Fund]:
-    """更新经费记录"""
+    """更新经费记录（同一事务内调整项目台账）"""
     db_fund = get_fund_by_id(db, fund_id)
     if not db_fund:
         return None
     
-    update_data = fund_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_fund, field, value)
-    
-    db.commit()
+    try:
+        spent = fund_ledger.lock_ledger(db, db_fund.project_id)
+        db.refresh(db_fund, with_for_update=True)  # 加锁后重新读取，防止并发修改使扣除的旧值过期
+        old = (db_fund.expense_type, db_fund.amount, db_fund.expense_date)
+        
+        update_data = fund_update.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_fund, field, value)
+        
+        fund_ledger.check_budget(db, db_fund.project_id, spent, db_fund.amount - old[1])
+        db.flush()
+        fund_ledger.unrecord_expense(db, db_fund.project_id, *old)
+        fund_ledger.record_expense(db, db_fund.project_id, db_fund.expense_type, db_fund.amount, db_fund.expense_date)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_fund)
     return db_fund
 
 
 def delete_fund(db: Session, fund_id: int) -> bool:
-    """删除经费记录"""
+    """删除经费记录（同一事务内扣除项目台账）"""
     db_fund = get_fund_by_id(db, fund_id)
     if not db_fund:
         return False
     
-    db.delete(db_fund)
-    db.commit()
+    try:
+        fund_ledger.lock_ledger(db, db_fund.project_id)
+        db.refresh(db_fund, with_for_update=True)
+        db.delete(db_fund)
+        db.flush()
+        fund_ledger.unrecord_expense(db, db_fund.project_id, db_fund.expense_type, db_fund.amount, db_fund.expense_date)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     return True
 
 
 def get_project_fund_summary(db: Session, project_id: int) -> dict:
-    """获取项目经费汇总"""
-    funds = db.query(models.Fund).filter(models.Fund.project_id == project_id).all()
-    
-    total_expense = sum(fund.amount for fund in funds)
-    
-    # 按类型统计
-    by_type = {}
-    for fund in funds:
-        expense_type = fund.expense_type
-        by_type[expense_type] = by_type.get(expense_type, 0) + fund.amount
+    """获取项目经费汇总（读取项目台账，不扫描经费记录）"""
+    ledger = fund_ledger.get_ledger(db, project_id)
+    if ledger is None:
+        return {"total_expense": 0.0, "by_type": {}, "count": 0}
     
     return {
-        "total_expense": total_expense,
-        "by_type": by_type,
-        "count": len(funds)
+        "total_expense": ledger["spent_total"],
+        "by_type": ledger["by_type"],
+        "count": ledger["fund_count"],
+        "budget_total": ledger["budget_total"],
+        "remaining": ledger["remaining"],
+        "last_expense_date": ledger["last_expense_date"],
     }
 
 
 def get_fund_statistics(db: Session) -> dict:
-    """经费统计"""
-    funds = db.query(models.Fund).all()
-    
-    total_expense = sum(fund.amount for fund in funds)
+    """经费统计（按项目台账的类型合计汇总）"""
+    rows = (
+        db.query(models.ProjectFundLedgerType.expense_type, func.sum(models.ProjectFundLedgerType.amount))
+        .group_by(models.ProjectFundLedgerType.expense_type)
+        .all()
+    )
     
-    # 按类型统计
-    by_type = {}
-    for fund in funds:
-        expense_type = fund.expense_type
-        by_type[expense_type] = by_type.get(expense_type, 0) + fund.amount
+    by_type = {expense_type: amount for expense_type, amount in rows}
     
     return {
-        "total_expense": total_expense,
+        "total_expense": sum(by_type.values()),
         "by_type": by_type
     }
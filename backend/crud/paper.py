@@ -1,10 +1,53 @@
 """
 论文 CRUD 操作
 """
-from sqlalchemy.orm import Session
-from typing import Optional, List
+import re
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import Session, aliased
+from typing import Optional, List, Dict, Tuple
 import models
 import schemas
+from crud.user import resolve_user_ids
+
+_AUTHOR_SEPARATORS = re.compile(r"\s*(?:[,，、;；]|\band\b)\s*")
+_CORRESPONDING_MARK = re.compile(r"[*＊]|[（(]\s*(?:通讯作者|通讯|corresponding(?: author)?)\s*[)）]", re.IGNORECASE)
+_EQUAL_CONTRIBUTION_MARK = re.compile(r"[#＃†]")
+
+
+def parse_authors(raw: Optional[str]) -> List[Tuple[str, bool]]:
+    """
+    解析作者字符串为 [(姓名, 是否通讯作者)]，顺序即作者顺序
+    作者之间以逗号、顿号、分号或 and 分隔；姓名后的 *、（通讯作者）等标记表示通讯作者，# † 等共同一作标记忽略
+    """
+    if not raw or not raw.strip():
+        return []
+
+    authors = []
+    seen = set()
+    for part in _AUTHOR_SEPARATORS.split(raw.strip()):
+        is_corresponding = bool(_CORRESPONDING_MARK.search(part))
+        name = _EQUAL_CONTRIBUTION_MARK.sub("", _CORRESPONDING_MARK.sub("", part)).strip()[:50]
+        if name and name not in seen:
+            seen.add(name)
+            authors.append((name, is_corresponding))
+    return authors
+
+
+def sync_paper_authors(db: Session, db_paper: models.Paper, user_ids: Optional[Dict[str, int]] = None):
+    """
+    按 authors 字段重建作者行（在调用方事务内，不提交）
+    user_ids 为预先解析好的姓名 → 用户ID（批量回填时传入，避免逐篇查询用户表）
+    """
+    authors = parse_authors(db_paper.authors)
+    if user_ids is None:
+        user_ids = resolve_user_ids(db, [name for name, _ in authors])
+
+    db_paper.author_rows = [
+        models.PaperAuthor(
+            position=position, name=name, user_id=user_ids.get(name), is_corresponding=is_corresponding
+        )
+        for position, (name, is_corresponding) in enumerate(authors, start=1)
+    ]
 
 
 def get_paper_by_id(db: Session, paper_id: int) -> Optional[models.Paper]:
@@ -48,6 +91,7 @@ def get_papers(
 def create_paper(db: Session, paper: schemas.PaperCreate) -> models.Paper:
     """创建论文"""
     db_paper = models.Paper(**paper.dict())
+    sync_paper_authors(db, db_paper)
     db.add(db_paper)
     db.commit()
     db.refresh(db_paper)
@@ -67,6 +111,8 @@ def update_paper(
     update_data = paper_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_paper, field, value)
+    if "authors" in update_data:
+        sync_paper_authors(db, db_paper)
     
     db.commit()
     db.refresh(db_paper)
@@ -94,6 +140,72 @@ def search_papers(db: Session, keyword: str, skip: int = 0, limit: int = 100) ->
     return query.offset(skip).limit(limit).all()
 
 
+def get_author_papers(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    first_author: bool = False,
+    corresponding: bool = False
+) -> Tuple[int, List[models.Paper]]:
+    """获取用户署名的论文（走 paper_authors 的 user_id 索引），返回 (总数, 当前页)"""
+    query = (
+        db.query(models.Paper)
+        .join(models.PaperAuthor, models.PaperAuthor.paper_id == models.Paper.id)
+        .filter(models.PaperAuthor.user_id == user_id)
+    )
+    if first_author:
+        query = query.filter(models.PaperAuthor.position == 1)
+    if corresponding:
+        query = query.filter(models.PaperAuthor.is_corresponding.is_(True))
+
+    total = query.count()
+    items = query.order_by(models.Paper.publication_date.desc()).offset(skip).limit(limit).all()
+    return total, items
+
+
+def get_author_statistics(db: Session, user_id: int, top_coauthors: int = 10) -> dict:
+    """用户的论文署名统计：总数、第一作者、通讯作者、按年份、主要合作者"""
+    PaperAuthor = models.PaperAuthor
+    total, first, corresponding = db.query(
+        func.count(PaperAuthor.id),
+        func.coalesce(func.sum(case((PaperAuthor.position == 1, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((PaperAuthor.is_corresponding.is_(True), 1), else_=0)), 0),
+    ).filter(PaperAuthor.user_id == user_id).one()
+
+    year = func.year(models.Paper.publication_date)
+    by_year = (
+        db.query(year, func.count(models.Paper.id))
+        .join(PaperAuthor, PaperAuthor.paper_id == models.Paper.id)
+        .filter(PaperAuthor.user_id == user_id, models.Paper.publication_date.isnot(None))
+        .group_by(year)
+        .all()
+    )
+
+    coauthor = aliased(PaperAuthor)
+    coauthors = (
+        db.query(coauthor.name, coauthor.user_id, func.count(coauthor.id).label("papers"))
+        .join(PaperAuthor, and_(PaperAuthor.paper_id == coauthor.paper_id, PaperAuthor.id != coauthor.id))
+        .filter(PaperAuthor.user_id == user_id)
+        .group_by(coauthor.name, coauthor.user_id)
+        .order_by(func.count(coauthor.id).desc())
+        .limit(top_coauthors)
+        .all()
+    )
+
+    return {
+        "user_id": user_id,
+        "total": int(total),
+        "first_author": int(first),
+        "corresponding_author": int(corresponding),
+        "by_year": {int(y): count for y, count in sorted(by_year)},
+        "coauthors": [
+            {"name": name, "user_id": coauthor_id, "papers": papers}
+            for name, coauthor_id, papers in coauthors
+        ],
+    }
+
+
 def get_paper_statistics(db: Session) -> dict:
     """论文统计"""
     total = db.query(models.Paper).count()
@@ -1,11 +1,62 @@
 """
 项目 CRUD 操作
 """
+import re
+import json
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date
 import models
 import schemas
+from crud.user import resolve_user_ids
+from crud.attachment import release_owner_attachments
+
+# 项目成员角色
+MEMBER_ROLE_PI = "PI"
+MEMBER_ROLE_MEMBER = "MEMBER"
+
+_MEMBER_SEPARATORS = re.compile(r"[,，、;；\n]+")
+
+
+def parse_members(raw: Optional[str]) -> List[str]:
+    """
+    解析 members 字段为姓名列表（去重，保持顺序）
+    支持 JSON 数组（元素为姓名或含 name 的对象），非 JSON 时按逗号、顿号、分号分隔
+    """
+    if not raw or not raw.strip():
+        return []
+    try:
+        items = json.loads(raw)
+    except ValueError:
+        items = _MEMBER_SEPARATORS.split(raw)
+    if not isinstance(items, list):
+        items = [items]
+
+    names = []
+    for item in items:
+        name = item.get("name") if isinstance(item, dict) else item
+        if isinstance(name, str) and name.strip():
+            names.append(name.strip()[:50])
+    return list(dict.fromkeys(names))
+
+
+def sync_project_members(db: Session, db_project: models.Project, user_ids: Optional[Dict[str, int]] = None):
+    """
+    按负责人和 members 字段重建成员行（在调用方事务内，不提交）
+    user_ids 为预先解析好的姓名 → 用户ID（批量回填时传入，避免逐个项目查询用户表）
+    """
+    names = [name for name in parse_members(db_project.members) if name != db_project.pi_name]
+    if user_ids is None:
+        user_ids = resolve_user_ids(db, names)
+
+    rows = [models.ProjectMember(
+        user_id=db_project.pi_id, name=db_project.pi_name, role=MEMBER_ROLE_PI, position=0
+    )]
+    for position, name in enumerate(names, start=1):
+        rows.append(models.ProjectMember(
+            user_id=user_ids.get(name), name=name, role=MEMBER_ROLE_MEMBER, position=position
+        ))
+    db_project.member_rows = rows
 
 
 def get_project_by_id(db: Session, project_id: int) -> Optional[models.Project]:
@@ -37,9 +88,31 @@ def get_projects(
     return query.order_by(models.Project.created_at.desc()).offset(skip).limit(limit).all()
 
 
+def get_participating_projects(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100
+) -> List[models.Project]:
+    """获取用户作为成员（非负责人）参与的项目（走 project_members 的 user_id 索引）"""
+    return (
+        db.query(models.Project)
+        .join(models.ProjectMember, models.ProjectMember.project_id == models.Project.id)
+        .filter(
+            models.ProjectMember.user_id == user_id,
+            models.ProjectMember.role == MEMBER_ROLE_MEMBER
+        )
+        .order_by(models.Project.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
 def create_project(db: Session, project: schemas.ProjectCreate) -> models.Project:
     """创建项目"""
     db_project = models.Project(**project.dict())
+    sync_project_members(db, db_project)
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
@@ -59,6 +132,8 @@ def update_project(
     update_data = project_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_project, field, value)
+    if update_data.keys() & {"members", "pi_id", "pi_name"}:
+        sync_project_members(db, db_project)
     
     db.commit()
     db.refresh(db_project)
@@ -71,6 +146,7 @@ def delete_project(db: Session, project_id: int) -> bool:
     if not db_project:
         return False
     
+    release_owner_attachments(db, "project", project_id)
     db.delete(db_project)
     db.commit()
     return True
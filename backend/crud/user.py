@@ -2,7 +2,7 @@
 用户 CRUD 操作
 """
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict
 import models
 import schemas
 from utils.security import hash_password
@@ -23,6 +23,25 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
 
+def resolve_user_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    """姓名 → 用户ID（只返回系统内唯一的姓名，重名无法确定是谁）"""
+    if not names:
+        return {}
+    rows = db.query(models.User.id, models.User.name).filter(models.User.name.in_(names)).all()
+    matches: Dict[str, List[int]] = {}
+    for user_id, name in rows:
+        matches.setdefault(name, []).append(user_id)
+    return {name: ids[0] for name, ids in matches.items() if len(ids) == 1}
+
+
+def load_unique_name_ids(db: Session) -> Dict[str, int]:
+    """全部唯一姓名 → 用户ID（批量回填时一次加载，避免逐条查询用户表）"""
+    matches: Dict[str, List[int]] = {}
+    for user_id, name in db.query(models.User.id, models.User.name).all():
+        matches.setdefault(name, []).append(user_id)
+    return {name: ids[0] for name, ids in matches.items() if len(ids) == 1}
+
+
 def get_users(
     db: Session,
     skip: int = 0,
@@ -19,7 +19,7 @@ DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYS
 # 创建数据库引擎
 engine = create_engine(
     DATABASE_URL,
-    echo=True,  # 开发环境打印 SQL 语句
+    echo=False,  # SQL 日志级别见 utils/logger.py 中的 LOG_LEVELS
     pool_pre_ping=True,  # 自动重连
     pool_recycle=3600,  # 连接回收时间
 )
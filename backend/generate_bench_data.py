@@ -0,0 +1,597 @@
+"""
+性能测试数据生成与批量导入脚本
+- 按规模生成用户、项目、论文、经费、成果、审计日志，外键引用均指向已存在的行
+- 分布带倾斜：少数负责人承担大量项目，少数项目产出大量论文和经费记录（Zipf 分布）
+- 每行数据由 (种子, 行ID) 确定性生成，同一种子重复执行得到相同数据
+- 多个工作进程并行生成并导入，每个进程独立连接数据库
+- 导入方式：insert（多行 INSERT，默认）或 infile（LOAD DATA LOCAL INFILE，需服务端开启 local_infile）
+- 所有用户密码均为 BENCH_PASSWORD，用户名为 bench<ID>
+用法：
+  python generate_bench_data.py --scale small
+  python generate_bench_data.py --scale large --mode infile --workers 8
+  python generate_bench_data.py --scale medium --papers 500000 --audit-logs 0
+  python generate_bench_data.py --reset --scale small   # 先清空业务表和审计日志（危险）
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+from database import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE
+
+# 生成规模（行数）
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"users": 200, "projects": 2000, "papers": 20000, "funds": 50000,
+              "achievements": 2000, "audit_logs": 100000},
+    "medium": {"users": 1000, "projects": 20000, "papers": 200000, "funds": 1000000,
+               "achievements": 20000, "audit_logs": 2000000},
+    "large": {"users": 5000, "projects": 100000, "papers": 2000000, "funds": 10000000,
+              "achievements": 200000, "audit_logs": 50000000},
+}
+
+# 导入配置
+CHUNK_ROWS = 50000  # 每个任务生成的行数（每个任务提交一次事务）
+INSERT_BATCH_ROWS = 2000  # 多行 INSERT 每条语句的行数
+ZIPF_EXPONENT = 1.1  # 倾斜程度，越大越集中
+BENCH_PASSWORD = "Bench@123456"
+DATE_START = date(2018, 1, 1)  # 业务数据日期范围起点
+DATE_END = date(2025, 12, 31)
+
+# 表的生成顺序（后面的表引用前面的表）
+TABLE_ORDER = ["users", "projects", "papers", "funds", "achievements", "audit_logs"]
+
+# ==================== 取值词表 ====================
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN_CHARS = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华建文辉玲晨宇浩然欣怡子轩思远博雅诗涵梓萱俊杰一鸣"
+TITLES = [("教授", 2), ("副教授", 3), ("讲师", 4), ("助理研究员", 1)]
+COLLEGES = [("计算机学院", 6), ("信息学院", 4), ("软件学院", 3), ("电子工程学院", 3), ("数学学院", 2),
+            ("物理学院", 2), ("化学学院", 2), ("生命科学学院", 2), ("材料学院", 2), ("经济管理学院", 1)]
+RESEARCH_FIELDS = ["计算机视觉", "自然语言处理", "数据挖掘", "机器学习", "分布式系统", "信息安全",
+                   "软件工程", "物联网", "生物信息学", "新能源材料", "量子计算", "智能控制"]
+PROJECT_TYPES = [("国家自然科学基金", 5), ("青年基金", 4), ("省级自然科学基金", 5), ("企业横向课题", 6),
+                 ("国家重点研发计划", 1), ("教育部人文社科项目", 2), ("市级科技计划", 3)]
+PROJECT_SOURCES = {
+    "国家自然科学基金": "国家自然科学基金委", "青年基金": "国家自然科学基金委",
+    "省级自然科学基金": "省科技厅", "企业横向课题": "合作企业", "国家重点研发计划": "科技部",
+    "教育部人文社科项目": "教育部", "市级科技计划": "市科技局",
+}
+PROJECT_BUDGETS = {  # 预算范围（元）
+    "国家自然科学基金": (500000, 3000000), "青年基金": (200000, 300000),
+    "省级自然科学基金": (100000, 500000), "企业横向课题": (50000, 2000000),
+    "国家重点研发计划": (5000000, 20000000), "教育部人文社科项目": (80000, 200000),
+    "市级科技计划": (100000, 1000000),
+}
+PROJECT_STATUSES = [("DRAFT", 1), ("SUBMITTED", 1), ("APPROVED", 2), ("IN_PROGRESS", 10),
+                    ("MID_CHECK", 2), ("COMPLETED", 8), ("REJECTED", 1)]
+TOPIC_WORDS = ["深度学习", "联邦学习", "知识图谱", "图神经网络", "多模态融合", "边缘计算", "隐私保护",
+               "智能诊断", "时空数据", "强化学习", "大语言模型", "异构计算", "碳中和", "数字孪生"]
+TOPIC_OBJECTS = ["医学影像分析", "交通流预测", "电网调度", "药物发现", "工业质检", "金融风控",
+                 "智慧农业", "蛋白质结构预测", "城市治理", "新型储能材料", "遥感图像解译", "推荐系统"]
+PAPER_TEMPLATES = ["{topic} for {obj}: A Survey", "Towards Efficient {topic} in {obj}",
+                   "A Novel {topic} Framework for {obj}", "Scalable {topic} with Applications to {obj}"]
+EN_TOPICS = ["Deep Learning", "Federated Learning", "Knowledge Graphs", "Graph Neural Networks",
+             "Multimodal Fusion", "Edge Computing", "Privacy-Preserving Learning", "Reinforcement Learning",
+             "Large Language Models", "Contrastive Learning", "Spatio-Temporal Modeling"]
+EN_OBJECTS = ["Medical Imaging", "Traffic Forecasting", "Power Grids", "Drug Discovery",
+              "Industrial Inspection", "Financial Risk", "Smart Agriculture", "Remote Sensing", "Recommendation"]
+JOURNALS = [("IEEE Access", 8), ("Information Sciences", 3), ("Neurocomputing", 4), ("Pattern Recognition", 2),
+            ("IEEE Transactions on Knowledge and Data Engineering", 1), ("Expert Systems with Applications", 4),
+            ("Knowledge-Based Systems", 3), ("ACM Computing Surveys", 1), ("计算机学报", 2), ("软件学报", 2)]
+JCR_ZONES = [("Q1", 3), ("Q2", 4), ("Q3", 2), ("Q4", 1)]
+CAS_ZONES = {"Q1": "一区", "Q2": "二区", "Q3": "三区", "Q4": "四区"}
+EXPENSE_TYPES = [("设备费", 3), ("材料费", 5), ("差旅费", 6), ("劳务费", 5), ("会议费", 2),
+                 ("测试化验加工费", 2), ("出版/文献/信息传播费", 2), ("专家咨询费", 1)]
+EXPENSE_AMOUNTS = {"设备费": (5000, 300000), "材料费": (500, 50000), "差旅费": (300, 15000),
+                   "劳务费": (1000, 30000), "会议费": (1000, 40000), "测试化验加工费": (1000, 80000),
+                   "出版/文献/信息传播费": (500, 20000), "专家咨询费": (800, 10000)}
+ACHIEVEMENT_TYPES = [("PATENT", 5), ("AWARD", 2), ("BOOK", 1), ("SOFTWARE", 4)]
+ACHIEVEMENT_PREFIX = {"PATENT": "一种基于", "AWARD": "", "BOOK": "", "SOFTWARE": ""}
+ACHIEVEMENT_SUFFIX = {"PATENT": "的方法及系统", "AWARD": "科技进步奖", "BOOK": "原理与实践", "SOFTWARE": "软件V1.0"}
+CERT_PREFIX = {"PATENT": "ZL", "AWARD": "JL", "BOOK": "ISBN", "SOFTWARE": "RJ"}
+
+# 审计日志操作（模块, 操作, 方法, 路径, 资源类型, 权重）
+AUDIT_OPERATIONS = [
+    ("auth", "登录", "POST", "/api/auth/login", None, 30),
+    ("auth", "登出", "POST", "/api/auth/logout", None, 5),
+    ("auth", "登录失败", "POST", "/api/auth/login", None, 2),
+    ("project", "创建项目", "POST", "/api/projects/", "项目", 4),
+    ("project", "更新项目", "PUT", "/api/projects/{id}", "项目", 8),
+    ("project", "删除项目", "DELETE", "/api/projects/{id}", "项目", 1),
+    ("project", "导出项目列表", "GET", "/api/projects/export", "项目列表", 2),
+    ("paper", "创建论文", "POST", "/api/papers/", "论文", 6),
+    ("paper", "更新论文", "PUT", "/api/papers/{id}", "论文", 5),
+    ("paper", "导出论文列表", "GET", "/api/papers/export", "论文列表", 2),
+    ("fund", "创建经费记录", "POST", "/api/funds/", "经费记录", 12),
+    ("fund", "更新经费记录", "PUT", "/api/funds/{id}", "经费记录", 3),
+    ("achievement", "创建成果", "POST", "/api/achievements/", "成果", 2),
+    ("user", "更新用户", "PUT", "/api/users/{id}", "用户", 1),
+]
+USER_AGENTS = [
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36", 6),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15", 2),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0", 1),
+]
+
+
+# ==================== 确定性随机 ====================
+
+_MASK64 = (1 << 64) - 1
+
+
+def mix(*values: int) -> int:
+    """splitmix64 散列：相同输入得到相同的 64 位整数"""
+    h = 0x9E3779B97F4A7C15
+    for value in values:
+        h = (h ^ (value & _MASK64)) * 0xBF58476D1CE4E5B9 & _MASK64
+        h = (h ^ (h >> 27)) * 0x94D049BB133111EB & _MASK64
+        h ^= h >> 31
+    return h
+
+
+class RowRandom:
+    """单行的确定性随机数（按字段序号取值，互不相关）"""
+
+    __slots__ = ("base", "n")
+
+    def __init__(self, seed: int, table_no: int, row_id: int):
+        self.base = mix(seed, table_no, row_id)
+        self.n = 0
+
+    def next(self) -> int:
+        self.n += 1
+        return mix(self.base, self.n)
+
+    def random(self) -> float:
+        return (self.next() >> 11) / float(1 << 53)
+
+    def randint(self, low: int, high: int) -> int:
+        return low + self.next() % (high - low + 1)
+
+    def choice(self, items: Sequence[Any]) -> Any:
+        return items[self.next() % len(items)]
+
+    def weighted(self, table: "WeightedTable") -> Any:
+        return table.pick(self.random())
+
+
+class WeightedTable:
+    """按累计权重抽样"""
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float]):
+        self.items = list(items)
+        self.cumulative: List[float] = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+
+    @classmethod
+    def of(cls, pairs: Sequence[Tuple[Any, float]]) -> "WeightedTable":
+        return cls([item for item, _ in pairs], [weight for _, weight in pairs])
+
+    @classmethod
+    def zipf(cls, items: Sequence[Any]) -> "WeightedTable":
+        """第 k 项权重为 1/k^s，少数靠前的项被大量引用"""
+        return cls(items, [1.0 / (k ** ZIPF_EXPONENT) for k in range(1, len(items) + 1)])
+
+    def pick(self, u: float) -> Any:
+        index = bisect.bisect_right(self.cumulative, u * self.total)
+        return self.items[min(index, len(self.items) - 1)]
+
+
+TITLE_TABLE = WeightedTable.of(TITLES)
+COLLEGE_TABLE = WeightedTable.of(COLLEGES)
+PROJECT_TYPE_TABLE = WeightedTable.of(PROJECT_TYPES)
+PROJECT_STATUS_TABLE = WeightedTable.of(PROJECT_STATUSES)
+JOURNAL_TABLE = WeightedTable.of(JOURNALS)
+JCR_TABLE = WeightedTable.of(JCR_ZONES)
+EXPENSE_TYPE_TABLE = WeightedTable.of(EXPENSE_TYPES)
+ACHIEVEMENT_TYPE_TABLE = WeightedTable.of(ACHIEVEMENT_TYPES)
+AUDIT_OPERATION_TABLE = WeightedTable([op[:5] for op in AUDIT_OPERATIONS], [op[5] for op in AUDIT_OPERATIONS])
+USER_AGENT_TABLE = WeightedTable.of(USER_AGENTS)
+
+
+def person_name(seed: int, user_id: int) -> str:
+    """由用户ID确定的姓名（可能重名，与真实情况一致）"""
+    r = RowRandom(seed, 99, user_id)
+    given = r.choice(GIVEN_CHARS) + (r.choice(GIVEN_CHARS) if r.random() < 0.7 else "")
+    return r.choice(SURNAMES) + given
+
+
+def random_date(r: RowRandom, start: date, end: date) -> date:
+    days = max((end - start).days, 0)
+    return start + timedelta(days=r.randint(0, days))
+
+
+# ==================== 行生成 ====================
+
+# 各表导入的列（顺序与生成函数返回的元组一致）
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("id", "username", "password_hash", "name", "role", "title", "college", "email", "phone",
+              "research_field", "login_failures", "created_at", "updated_at"),
+    "projects": ("id", "project_name", "pi_id", "pi_name", "members", "project_type", "source", "budget_total",
+                 "start_date", "end_date", "status", "description", "objectives", "created_at", "updated_at"),
+    "papers": ("id", "title", "authors", "journal", "publication_date", "doi", "jcr_zone", "cas_zone",
+               "impact_factor", "project_id", "creator_id", "created_at", "updated_at"),
+    "funds": ("id", "project_id", "expense_type", "amount", "expense_date", "handler", "notes", "created_at"),
+    "achievements": ("id", "achievement_type", "title", "owner", "members", "completion_date",
+                     "certificate_no", "description", "created_at", "updated_at"),
+    "audit_logs": ("id", "user_id", "username_id", "operation_id", "module_id", "method_id", "path",
+                   "details", "resource_type", "resource_id", "ip_address", "user_agent_id", "status",
+                   "duration", "sql_count", "sql_ms", "created_at"),
+}
+TARGET_TABLES = {name: name for name in TABLE_ORDER}
+TARGET_TABLES["audit_logs"] = "operation_logs"
+
+# 工作进程内的共享上下文（由 _init_worker 设置）
+_ctx: Dict[str, Any] = {}
+
+
+def _at_time(d: date, r: RowRandom) -> datetime:
+    return datetime(d.year, d.month, d.day, r.randint(8, 21), r.randint(0, 59), r.randint(0, 59))
+
+
+def gen_user(r: RowRandom, row_id: int) -> tuple:
+    seed = _ctx["seed"]
+    role = "SECRETARY" if r.random() < 0.02 else "TEACHER"
+    created = _at_time(random_date(r, DATE_START, DATE_END), r)
+    return (
+        row_id, f"bench{row_id}", _ctx["password_hash"], person_name(seed, row_id), role,
+        r.weighted(TITLE_TABLE), r.weighted(COLLEGE_TABLE), f"bench{row_id}@example.com",
+        f"139{r.randint(0, 99999999):08d}", "、".join(dict.fromkeys([r.choice(RESEARCH_FIELDS), r.choice(RESEARCH_FIELDS)])),
+        0, created, created,
+    )
+
+
+def gen_project(r: RowRandom, row_id: int) -> tuple:
+    pi_id, pi_name = r.weighted(_ctx["pi_table"])
+    project_type = r.weighted(PROJECT_TYPE_TABLE)
+    low, high = PROJECT_BUDGETS[project_type]
+    start = random_date(r, DATE_START, DATE_END - timedelta(days=365))
+    end = start + timedelta(days=365 * r.randint(1, 4))
+    members = [pi_name] + [r.choice(_ctx["user_names"]) for _ in range(r.randint(0, 5))]
+    topic, obj = r.choice(TOPIC_WORDS), r.choice(TOPIC_OBJECTS)
+    created = _at_time(start - timedelta(days=r.randint(10, 90)), r)
+    return (
+        row_id, f"面向{obj}的{topic}关键技术研究", pi_id, pi_name,
+        json.dumps(list(dict.fromkeys(members)), ensure_ascii=False), project_type,
+        PROJECT_SOURCES[project_type], float(r.randint(low // 1000, high // 1000) * 1000),
+        start, end, r.weighted(PROJECT_STATUS_TABLE),
+        f"本项目针对{obj}中的关键问题，研究{topic}方法。", f"提出{topic}新方法并在{obj}场景验证。",
+        created, created,
+    )
+
+
+def gen_paper(r: RowRandom, row_id: int) -> tuple:
+    project = r.weighted(_ctx["project_table"]) if r.random() < 0.85 else None
+    if project is not None:
+        project_id, pi_id, pi_name, start, end = project
+        creator_id, first_author = pi_id, pi_name
+        published = random_date(r, start, end + timedelta(days=365))
+    else:
+        project_id = None
+        creator_id, first_author = r.weighted(_ctx["pi_table"])
+        published = random_date(r, DATE_START, DATE_END)
+    coauthors = [r.choice(_ctx["user_names"]) for _ in range(r.randint(0, 5))]
+    jcr = r.weighted(JCR_TABLE)
+    title = r.choice(PAPER_TEMPLATES).format(topic=r.choice(EN_TOPICS), obj=r.choice(EN_OBJECTS))
+    created = _at_time(published + timedelta(days=r.randint(0, 60)), r)
+    return (
+        row_id, title, ", ".join(dict.fromkeys([first_author] + coauthors)), r.weighted(JOURNAL_TABLE),
+        published, f"10.{r.randint(1000, 9999)}/bench.{row_id}", jcr, CAS_ZONES[jcr],
+        round(0.5 + r.random() * (12 if jcr == "Q1" else 5), 3), project_id, creator_id, created, created,
+    )
+
+
+def gen_fund(r: RowRandom, row_id: int) -> tuple:
+    project_id, pi_id, pi_name, start, end = r.weighted(_ctx["project_table"])
+    expense_type = r.weighted(EXPENSE_TYPE_TABLE)
+    low, high = EXPENSE_AMOUNTS[expense_type]
+    expense_date = random_date(r, start, end)
+    return (
+        row_id, project_id, expense_type, round(low + r.random() * (high - low), 2), expense_date,
+        pi_name if r.random() < 0.6 else r.choice(_ctx["user_names"]),
+        None if r.random() < 0.7 else f"{expense_type}报销",
+        _at_time(expense_date, r),
+    )
+
+
+def gen_achievement(r: RowRandom, row_id: int) -> tuple:
+    owner_id, owner = r.weighted(_ctx["pi_table"])
+    kind = r.weighted(ACHIEVEMENT_TYPE_TABLE)
+    members = [r.choice(_ctx["user_names"]) for _ in range(r.randint(0, 4))]
+    completed = random_date(r, DATE_START, DATE_END)
+    created = _at_time(completed + timedelta(days=r.randint(0, 60)), r)
+    title = f"{ACHIEVEMENT_PREFIX[kind]}{r.choice(TOPIC_WORDS)}的{r.choice(TOPIC_OBJECTS)}{ACHIEVEMENT_SUFFIX[kind]}"
+    return (
+        row_id, kind, title, owner, "、".join(dict.fromkeys(members)) or None, completed,
+        f"{CERT_PREFIX[kind]}{completed.year}{row_id:08d}", None, created, created,
+    )
+
+
+def gen_audit_log(r: RowRandom, row_id: int) -> tuple:
+    user_id, username = r.weighted(_ctx["audit_user_table"])
+    module, operation, method, path, resource_type = r.weighted(AUDIT_OPERATION_TABLE)
+    ids = _ctx["audit_ids"]
+    first_day, days = _ctx["audit_day_range"]
+    created = datetime.combine(first_day, datetime.min.time()) + timedelta(
+        days=r.randint(0, days - 1), seconds=r.randint(8 * 3600, 22 * 3600))
+    failed = operation == "登录失败"
+    resource_id = str(r.randint(1, 100000)) if "{id}" in path else None
+    duration = int(5 + r.random() ** 3 * 2000)
+    return (
+        row_id, user_id, ids[("username", username)], ids[("operation", operation)], ids[("module", module)],
+        ids[("method", method)], path.replace("{id}", resource_id or ""), None, resource_type, resource_id,
+        f"10.{r.randint(0, 255)}.{r.randint(0, 255)}.{r.randint(1, 254)}",
+        ids[("user_agent", r.weighted(USER_AGENT_TABLE))], "FAILED" if failed else "SUCCESS",
+        duration, r.randint(1, 30), duration // r.randint(2, 10), created,
+    )
+
+
+GENERATORS = {
+    "users": gen_user, "projects": gen_project, "papers": gen_paper,
+    "funds": gen_fund, "achievements": gen_achievement, "audit_logs": gen_audit_log,
+}
+
+
+# ==================== 导入 ====================
+
+def connect() -> pymysql.connections.Connection:
+    """独立连接（关闭唯一性与外键检查：生成的数据本身保证唯一与引用一致）"""
+    conn = pymysql.connect(
+        host=MYSQL_HOST, port=int(MYSQL_PORT), user=MYSQL_USER, password=MYSQL_PASSWORD,
+        database=MYSQL_DATABASE, charset="utf8mb4", local_infile=True, autocommit=False,
+    )
+    with conn.cursor() as cursor:
+        cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    return conn
+
+
+def _tsv_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    text = str(value)
+    if isinstance(value, str):
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return text
+
+
+def load_rows(conn, table: str, rows: List[tuple], mode: str):
+    """导入一批行并提交"""
+    columns = COLUMNS[table]
+    column_list = ", ".join(columns)
+    with conn.cursor() as cursor:
+        if mode == "infile":
+            with tempfile.NamedTemporaryFile("w", suffix=".tsv", encoding="utf-8", delete=False) as f:
+                for row in rows:
+                    f.write("\t".join(_tsv_value(value) for value in row))
+                    f.write("\n")
+                path = f.name
+            try:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {TARGET_TABLES[table]} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({column_list})",
+                    (path,)
+                )
+            finally:
+                os.remove(path)
+        else:
+            # pymysql 的 executemany 会把 INSERT ... VALUES 合并成多行 INSERT
+            sql = f"INSERT INTO {TARGET_TABLES[table]} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))})"
+            for i in range(0, len(rows), INSERT_BATCH_ROWS):
+                cursor.executemany(sql, rows[i:i + INSERT_BATCH_ROWS])
+    conn.commit()
+
+
+def _init_worker(context: Dict[str, Any]):
+    _ctx.update(context)
+    _ctx["conn"] = None
+
+
+def _run_chunk(task: Tuple[str, int, int]) -> int:
+    """工作进程：生成 [first_id, first_id + count) 的行并导入"""
+    table, first_id, count = task
+    if _ctx["conn"] is None:
+        _ctx["conn"] = connect()
+    table_no = TABLE_ORDER.index(table)
+    generate = GENERATORS[table]
+    rows = [generate(RowRandom(_ctx["seed"], table_no, row_id), row_id)
+            for row_id in range(first_id, first_id + count)]
+    load_rows(_ctx["conn"], table, rows, _ctx["mode"])
+    return count
+
+
+# ==================== 引用数据 ====================
+
+def fetch_all(conn, sql: str, params: Optional[tuple] = None) -> List[tuple]:
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return list(cursor.fetchall())
+
+
+def next_id(conn, table: str) -> int:
+    return (fetch_all(conn, f"SELECT COALESCE(MAX(id), 0) FROM {TARGET_TABLES[table]}")[0][0] or 0) + 1
+
+
+def build_context(conn, table: str, args) -> Dict[str, Any]:
+    """读取被引用的表，构造工作进程生成该表所需的上下文"""
+    context: Dict[str, Any] = {"seed": args.seed, "mode": args.mode}
+
+    if table == "users":
+        from utils.security import hash_password
+        context["password_hash"] = hash_password(BENCH_PASSWORD)
+        return context
+
+    users = fetch_all(conn, "SELECT id, name, role FROM users ORDER BY id")
+    teachers = [(user_id, name) for user_id, name, role in users if role == "TEACHER"]
+    if not teachers:
+        raise RuntimeError("users 表中没有普通教师，请先生成用户")
+    context["pi_table"] = WeightedTable.zipf(teachers)
+    context["user_names"] = [name for _, name, _ in users]
+
+    if table in ("papers", "funds"):
+        projects = fetch_all(conn, "SELECT id, pi_id, pi_name, start_date, end_date FROM projects "
+                                   "WHERE start_date IS NOT NULL AND end_date IS NOT NULL ORDER BY id")
+        if not projects:
+            raise RuntimeError("projects 表中没有带起止日期的项目，请先生成项目")
+        context["project_table"] = WeightedTable.zipf(projects)
+
+    if table == "audit_logs":
+        all_users = fetch_all(conn, "SELECT id, username FROM users ORDER BY id")
+        context["audit_user_table"] = WeightedTable.zipf(all_users)
+        context["audit_ids"] = prepare_audit_dictionary(conn, [username for _, username in all_users])
+        context["audit_day_range"] = audit_day_range(conn)
+
+    return context
+
+
+def prepare_audit_dictionary(conn, usernames: List[str]) -> Dict[Tuple[str, str], int]:
+    """预先写入审计字典项，返回 (类型, 值) → ID"""
+    entries = {("username", name) for name in usernames}
+    for module, operation, method, path, _ in AUDIT_OPERATION_TABLE.items:
+        entries |= {("module", module), ("operation", operation), ("method", method)}
+    entries |= {("user_agent", agent) for agent, _ in USER_AGENTS}
+
+    with conn.cursor() as cursor:
+        cursor.executemany("INSERT IGNORE INTO audit_dictionary (kind, value) VALUES (%s, %s)", sorted(entries))
+    conn.commit()
+    rows = fetch_all(conn, "SELECT kind, value, id FROM audit_dictionary")
+    return {(kind, value): entry_id for kind, value, entry_id in rows if (kind, value) in entries}
+
+
+def audit_day_range(conn) -> Tuple[date, int]:
+    """审计日志时间范围：已分区时限定在现有月份分区内，否则取最近一年"""
+    rows = fetch_all(conn, (
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'operation_logs' AND PARTITION_NAME IS NOT NULL"
+    ), (MYSQL_DATABASE,))
+    months = sorted(date(int(name[1:5]), int(name[5:7]), 1)
+                    for (name,) in rows if name and name.startswith("p") and name[1:].isdigit())
+    today = date.today()
+    if not months:
+        return today - timedelta(days=365), 365
+    last = months[-1]
+    end = date(last.year + (last.month == 12), last.month % 12 + 1, 1)
+    end = min(end, today + timedelta(days=1))
+    return months[0], max((end - months[0]).days, 1)
+
+
+# ==================== 主流程 ====================
+
+def reset_tables(conn):
+    """清空业务表与审计日志相关表"""
+    with conn.cursor() as cursor:
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        for table in ("fund_month_snapshots", "fund_snapshot_periods", "project_fund_ledger_types",
+                      "project_fund_ledgers", "funds", "paper_authors", "papers",
+                      "achievements", "project_members", "projects", "users",
+                      "operation_logs", "audit_chain_head", "audit_checkpoints", "operation_log_hourly"):
+            cursor.execute(f"TRUNCATE TABLE {table}")
+            print(f"  ✓ 已清空 {table}")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+    conn.commit()
+
+
+def bump_data_versions(conn, tables: List[str]):
+    """数据已变化：递增数据版本号，使运行中服务的合并/缓存结果失效"""
+    names = [TARGET_TABLES[table] for table in tables if table != "audit_logs"]
+    if not names:
+        return
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO data_versions (table_name, version) VALUES (%s, 1) "
+            "ON DUPLICATE KEY UPDATE version = version + 1",
+            [(name,) for name in sorted(names)]
+        )
+    conn.commit()
+
+
+def generate_table(conn, table: str, count: int, args) -> float:
+    """并行生成并导入一张表，返回耗时（秒）"""
+    first_id = next_id(conn, table)
+    context = build_context(conn, table, args)
+    tasks = [(table, start, min(CHUNK_ROWS, first_id + count - start))
+             for start in range(first_id, first_id + count, CHUNK_ROWS)]
+
+    started = time.perf_counter()
+    done = 0
+    with Pool(processes=min(args.workers, len(tasks)), initializer=_init_worker, initargs=(context,)) as pool:
+        for loaded in pool.imap_unordered(_run_chunk, tasks):
+            done += loaded
+            elapsed = time.perf_counter() - started
+            print(f"\r  {table}: {done}/{count} 行，{done / max(elapsed, 1e-6):,.0f} 行/秒", end="", flush=True)
+    print()
+    return time.perf_counter() - started
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="生成性能测试数据并批量导入")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="数据规模")
+    for table in TABLE_ORDER:
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, dest=table,
+                            help=f"覆盖 {table} 的行数（0 表示不生成）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="并行工作进程数")
+    parser.add_argument("--mode", choices=["insert", "infile"], default="insert", help="导入方式")
+    parser.add_argument("--seed", type=int, default=20240101, help="随机种子")
+    parser.add_argument("--reset", action="store_true", help="导入前清空业务表与审计日志")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    counts = dict(SCALES[args.scale])
+    for table in TABLE_ORDER:
+        if getattr(args, table) is not None:
+            counts[table] = getattr(args, table)
+
+    print("=" * 60)
+    print("  科研管理系统 - 性能测试数据生成")
+    print("=" * 60)
+    print(f"  规模: {args.scale}  导入方式: {args.mode}  工作进程: {args.workers}  种子: {args.seed}")
+    for table in TABLE_ORDER:
+        print(f"  {table:<14}{counts[table]:>12,} 行")
+    print()
+
+    conn = connect()
+    try:
+        if args.reset:
+            print("[清空数据]")
+            reset_tables(conn)
+            print()
+
+        total_started = time.perf_counter()
+        loaded_tables = []
+        for table in TABLE_ORDER:
+            if counts[table] <= 0:
+                continue
+            try:
+                seconds = generate_table(conn, table, counts[table], args)
+            except Exception as e:
+                print(f"\n❌ {table} 导入失败: {e}")
+                sys.exit(1)
+            loaded_tables.append(table)
+            print(f"  ✓ {table} 完成，耗时 {seconds:.1f}s")
+
+        bump_data_versions(conn, loaded_tables)
+    finally:
+        conn.close()
+
+    total = sum(counts[table] for table in loaded_tables)
+    elapsed = time.perf_counter() - total_started
+    print("\n" + "=" * 60)
+    print(f"  ✅ 共导入 {total:,} 行，耗时 {elapsed:.1f}s（{total / max(elapsed, 1e-6):,.0f} 行/秒）")
+    if {"projects", "papers", "funds"} & set(loaded_tables):
+        print("  项目成员、论文作者、经费台账和月末快照请执行 python migrate.py 回填")
+    if "audit_logs" in loaded_tables:
+        print("  生成的审计日志不含哈希（与升级前的历史日志一样不参与链校验）")
+    print(f"  测试账号: bench<ID> / {BENCH_PASSWORD}")
+    print("=" * 60)
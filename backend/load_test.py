@@ -0,0 +1,322 @@
+"""
+本机压力测试（模拟真实用户会话）
+- 每个虚拟用户按会话脚本依次请求：登录 → 仪表盘 → 我的项目 → 新增经费 → 导出论文，步骤之间有思考时间
+- 新会话按泊松过程到达，到达率分阶段递增（--rates），每个阶段持续 --stage-seconds 秒
+- 每个阶段统计吞吐量、延迟分位数、错误率和并发会话数，得到饱和曲线（吞吐不再随到达率增长即为饱和点）
+- 输出各接口的请求数、错误数、状态码分布与延迟分位数，用于确定工作进程数和数据库连接池大小
+- 会新增经费记录（备注为 LOAD_TEST_NOTE），请勿对生产库运行
+- 需先启动服务（python serve.py）并准备数据（python generate_bench_data.py）
+用法：
+  python load_test.py
+  python load_test.py --rates 1,2,4,8,16 --stage-seconds 60 --think 3
+  python load_test.py --base-url http://127.0.0.1:8000 --output load_report.json
+"""
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# 压测配置
+DEFAULT_BASE_URL = "http://127.0.0.1:8000"
+DEFAULT_RATES = (0.5, 1, 2, 4, 8)  # 各阶段新会话到达率（个/秒）
+DEFAULT_STAGE_SECONDS = 30  # 每个阶段的持续时间
+DEFAULT_THINK_SECONDS = 2.0  # 平均思考时间（指数分布）
+MAX_SESSIONS = 500  # 并发会话上限（超过时新到达的会话计为被拒绝）
+REQUEST_TIMEOUT = 60  # 单个请求超时（秒）
+USER_POOL_SIZE = 1000  # 参与压测的教师账号数
+LOAD_TEST_NOTE = "load_test"  # 压测写入的经费记录备注
+EXPENSE_TYPES = ["差旅费", "材料费", "劳务费", "会议费"]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩法分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(values[-1], 1) if values else 0.0,
+    }
+
+
+class Stats:
+    """压测统计（按阶段、按接口）"""
+
+    def __init__(self):
+        self.stage = 0
+        self.requests: List[Tuple[int, str, int, float]] = []  # (阶段, 接口, 状态码, 毫秒)，状态码 0 为连接错误
+        self.sessions_started: Counter = Counter()
+        self.sessions_completed: Counter = Counter()
+        self.sessions_rejected: Counter = Counter()
+        self.active_sessions = 0
+        self.peak_sessions: Counter = Counter()
+
+    def record(self, stage: int, endpoint: str, status: int, ms: float):
+        self.requests.append((stage, endpoint, status, ms))
+
+    def session_started(self):
+        self.sessions_started[self.stage] += 1
+        self.active_sessions += 1
+        self.peak_sessions[self.stage] = max(self.peak_sessions[self.stage], self.active_sessions)
+
+    def session_finished(self, completed: bool):
+        self.active_sessions -= 1
+        if completed:
+            self.sessions_completed[self.stage] += 1
+
+
+# ==================== 会话脚本 ====================
+
+async def timed_request(client: httpx.AsyncClient, stats: Stats, endpoint: str,
+                        method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+    """发送请求并记录延迟（读取完整响应体）"""
+    stage = stats.stage  # 按发出请求时所在的阶段统计
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+        await response.aread()
+    except httpx.HTTPError:
+        stats.record(stage, endpoint, 0, (time.perf_counter() - started) * 1000)
+        return None
+    stats.record(stage, endpoint, response.status_code, (time.perf_counter() - started) * 1000)
+    return response
+
+
+async def think(mean_seconds: float):
+    if mean_seconds > 0:
+        await asyncio.sleep(random.expovariate(1 / mean_seconds))
+
+
+async def user_session(client: httpx.AsyncClient, stats: Stats, account: Tuple[str, str], think_seconds: float):
+    """一个教师的典型会话：登录 → 仪表盘 → 我的项目 → 新增经费 → 导出论文"""
+    stats.session_started()
+    completed = False
+    try:
+        username, password = account
+        response = await timed_request(client, stats, "POST /api/auth/login", "POST", "/api/auth/login",
+                                       json={"username": username, "password": password})
+        if response is None or response.status_code != 200:
+            return
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await think(think_seconds)
+
+        response = await timed_request(client, stats, "GET /api/statistics/dashboard", "GET",
+                                       "/api/statistics/dashboard", headers=headers)
+        if response is None or response.status_code != 200:
+            return
+        await think(think_seconds)
+
+        response = await timed_request(client, stats, "GET /api/projects/my", "GET",
+                                       "/api/projects/my", headers=headers)
+        if response is None or response.status_code != 200:
+            return
+        projects = response.json()
+        await think(think_seconds)
+
+        if projects:
+            project = random.choice(projects)
+            fund = {
+                "project_id": project["id"],
+                "expense_type": random.choice(EXPENSE_TYPES),
+                "amount": round(random.uniform(100, 5000), 2),
+                "expense_date": date.today().isoformat(),
+                "notes": LOAD_TEST_NOTE,
+            }
+            response = await timed_request(client, stats, "POST /api/funds/", "POST", "/api/funds/",
+                                           headers=headers, json=fund)
+            if response is None or response.status_code != 200:
+                return
+            await think(think_seconds)
+
+        response = await timed_request(client, stats, "GET /api/papers/export", "GET",
+                                       "/api/papers/export", headers=headers)
+        completed = response is not None and response.status_code == 200
+    finally:
+        stats.session_finished(completed)
+
+
+# ==================== 到达过程 ====================
+
+async def run_stage(client: httpx.AsyncClient, stats: Stats, accounts: List[Tuple[str, str]],
+                    rate: float, seconds: float, think_seconds: float, tasks: set):
+    """按泊松过程产生新会话"""
+    deadline = time.monotonic() + seconds
+    while True:
+        await asyncio.sleep(random.expovariate(rate))
+        if time.monotonic() >= deadline:
+            return
+        if stats.active_sessions >= MAX_SESSIONS:
+            stats.sessions_rejected[stats.stage] += 1
+            continue
+        task = asyncio.create_task(user_session(client, stats, random.choice(accounts), think_seconds))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+async def run_load_test(args, accounts: List[Tuple[str, str]]) -> Stats:
+    stats = Stats()
+    tasks: set = set()
+    limits = httpx.Limits(max_connections=MAX_SESSIONS, max_keepalive_connections=MAX_SESSIONS)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        for stage, rate in enumerate(args.rates):
+            stats.stage = stage
+            print(f"  阶段 {stage + 1}/{len(args.rates)}：到达率 {rate}/s，持续 {args.stage_seconds}s ...",
+                  end="", flush=True)
+            await run_stage(client, stats, accounts, rate, args.stage_seconds, args.think, tasks)
+            print(f" 并发会话峰值 {stats.peak_sessions[stage]}")
+
+        if tasks:
+            print(f"  等待剩余 {len(tasks)} 个会话结束 ...")
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+# ==================== 报告 ====================
+
+def build_report(args, stats: Stats) -> Dict[str, Any]:
+    stages = []
+    for stage, rate in enumerate(args.rates):
+        rows = [r for r in stats.requests if r[0] == stage]
+        errors = sum(1 for _, _, status, _ in rows if status == 0 or status >= 400)
+        stages.append({
+            "arrival_rate": rate,
+            "sessions_started": stats.sessions_started[stage],
+            "sessions_completed": stats.sessions_completed[stage],
+            "sessions_rejected": stats.sessions_rejected[stage],
+            "peak_sessions": stats.peak_sessions[stage],
+            "requests": len(rows),
+            "throughput": round(len(rows) / args.stage_seconds, 2),
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            **summarize([ms for _, _, _, ms in rows]),
+        })
+
+    by_endpoint: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    for _, endpoint, status, ms in stats.requests:
+        by_endpoint[endpoint].append((status, ms))
+    endpoints = {}
+    for endpoint, rows in by_endpoint.items():
+        statuses = Counter("error" if status == 0 else str(status) for status, _ in rows)
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for status, _ in rows if status == 0 or status >= 400),
+            "statuses": dict(statuses),
+            **summarize([ms for _, ms in rows]),
+        }
+
+    return {
+        "base_url": args.base_url,
+        "stage_seconds": args.stage_seconds,
+        "think_seconds": args.think,
+        "stages": stages,
+        "endpoints": endpoints,
+    }
+
+
+def saturation_point(stages: List[Dict[str, Any]]) -> Optional[float]:
+    """吞吐量增长不足到达率增长一半、或错误率超过 1% 的第一个阶段的到达率"""
+    for previous, current in zip(stages, stages[1:]):
+        if current["error_rate"] > 0.01:
+            return current["arrival_rate"]
+        if previous["throughput"] > 0:
+            expected = current["arrival_rate"] / previous["arrival_rate"]
+            actual = current["throughput"] / previous["throughput"]
+            if actual < 1 + (expected - 1) / 2:
+                return current["arrival_rate"]
+    return None
+
+
+def print_report(report: Dict[str, Any]):
+    print("\n[饱和曲线]")
+    print(f"  {'到达率/s':>9}{'会话':>7}{'完成':>7}{'拒绝':>7}{'并发峰值':>9}{'req/s':>9}"
+          f"{'错误率':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for s in report["stages"]:
+        print(f"  {s['arrival_rate']:>9}{s['sessions_started']:>7}{s['sessions_completed']:>7}"
+              f"{s['sessions_rejected']:>7}{s['peak_sessions']:>9}{s['throughput']:>9.1f}"
+              f"{s['error_rate'] * 100:>7.1f}%{s['p50']:>9.1f}{s['p95']:>9.1f}{s['p99']:>9.1f}")
+
+    print("\n[各接口]")
+    print(f"  {'接口':<32}{'请求':>8}{'错误':>7}{'p50':>9}{'p95':>9}{'p99':>9}  状态码")
+    for endpoint, e in sorted(report["endpoints"].items()):
+        statuses = " ".join(f"{code}×{count}" for code, count in sorted(e["statuses"].items()))
+        print(f"  {endpoint:<32}{e['requests']:>8}{e['errors']:>7}{e['p50']:>9.1f}{e['p95']:>9.1f}"
+              f"{e['p99']:>9.1f}  {statuses}")
+
+
+def load_accounts(limit: int) -> List[Tuple[str, str]]:
+    """读取负责过项目的测试教师账号"""
+    from sqlalchemy import text
+    from database import engine
+    from generate_bench_data import BENCH_PASSWORD
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT u.username FROM users u "
+            "WHERE u.role = 'TEACHER' AND u.username LIKE 'bench%' "
+            "AND EXISTS (SELECT 1 FROM projects p WHERE p.pi_id = u.id) "
+            "ORDER BY u.id LIMIT :limit"
+        ), {"limit": limit}).fetchall()
+    return [(username, BENCH_PASSWORD) for (username,) in rows]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="本机压力测试")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="服务地址")
+    parser.add_argument("--rates", type=lambda v: [float(x) for x in v.split(",")], default=list(DEFAULT_RATES),
+                        help="各阶段新会话到达率（逗号分隔，个/秒）")
+    parser.add_argument("--stage-seconds", type=float, default=DEFAULT_STAGE_SECONDS, help="每个阶段的持续秒数")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK_SECONDS, help="平均思考时间（秒）")
+    parser.add_argument("--users", type=int, default=USER_POOL_SIZE, help="参与压测的教师账号数")
+    parser.add_argument("--seed", type=int, help="随机种子（便于复现）")
+    parser.add_argument("--output", help="将报告保存为 JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print("=" * 60)
+    print("  科研管理系统 - 压力测试")
+    print("=" * 60)
+
+    accounts = load_accounts(args.users)
+    if not accounts:
+        print("❌ 未找到测试教师账号，请先执行 python generate_bench_data.py")
+        sys.exit(1)
+    print(f"  目标: {args.base_url}  账号: {len(accounts)} 个  平均思考时间: {args.think}s")
+    print(f"  到达率: {', '.join(str(rate) for rate in args.rates)} 个会话/秒，每阶段 {args.stage_seconds}s")
+    print()
+
+    stats = asyncio.run(run_load_test(args, accounts))
+    report = build_report(args, stats)
+    print_report(report)
+
+    saturated = saturation_point(report["stages"])
+    print("\n" + "=" * 60)
+    if saturated is None:
+        print("  ✅ 所有阶段均未饱和，可提高到达率继续测试")
+    else:
+        print(f"  ⚠ 到达率 {saturated}/s 时达到饱和（吞吐不再线性增长或错误率超过 1%）")
+    print(f"  压测写入的经费记录备注为 \"{LOAD_TEST_NOTE}\"")
+    print("=" * 60)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  报告已保存: {args.output}")
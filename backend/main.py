@@ -1,14 +1,32 @@
 """
 科研管理系统（Research Management System）
 FastAPI 主应用入口
+生产环境通过 serve.py 启动；表结构由 migrate.py 创建，应用启动时不再建表
 """
-from fastapi import FastAPI
+import os
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import auth, user, project, paper, fund, achievement, statistics, audit_log
+from fastapi.responses import PlainTextResponse, JSONResponse
+from routers import auth, user, project, paper, fund, achievement, attachment, statistics, audit_log
+from utils.scheduler import scheduler
+from utils.audit_rollup import refresh_hourly_rollups
+from utils.audit_archive import run_retention
+from utils.audit_chain import build_checkpoints
+from utils.attachments import collect_garbage
+from utils.fund_ledger import reconcile_fund_ledgers
+from utils.fund_snapshots import build_month_snapshots
+from utils.profiling import ProfilingMiddleware
+from utils import metrics, olap_cube
+from utils.health import check_readiness
+from utils.logger import setup_logging, shutdown_logging, get_logger, RequestIdMiddleware
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 结构化日志（后台线程写出，需在其他模块输出日志前配置）
+setup_logging()
+logger = get_logger("main")
 
 # 创建 FastAPI 应用
 app = FastAPI(
@@ -26,8 +44,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+# 请求耗时与 SQL 剖析（Server-Timing 响应头、慢请求日志、审计日志耗时）
+app.add_middleware(ProfilingMiddleware)
+
+# 按路由统计请求数、耗时和并发数（/metrics）
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 请求ID（最外层，使上面各中间件的日志也带有 request_id）
+app.add_middleware(RequestIdMiddleware)
+
 # 注册路由
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
 app.include_router(user.router, prefix="/api/users", tags=["用户管理"])
@@ -35,9 +63,45 @@ app.include_router(project.router, prefix="/api/projects", tags=["项目管理"]
 app.include_router(paper.router, prefix="/api/papers", tags=["论文管理"])
 app.include_router(fund.router, prefix="/api/funds", tags=["经费管理"])
 app.include_router(achievement.router, prefix="/api/achievements", tags=["成果管理"])
+app.include_router(attachment.router, prefix="/api/attachments", tags=["附件管理"])
 app.include_router(statistics.router, prefix="/api/statistics", tags=["统计分析"])
 app.include_router(audit_log.router, prefix="/api/audit", tags=["安全审计"])
 
+# 应用导入耗时（预加载模式下为主进程的导入耗时）
+IMPORT_MS = int((time.perf_counter() - _import_started) * 1000)
+
+
+@app.on_event("startup")
+def start_scheduler():
+    """启动后台定时任务、指标快照写入和统计立方体加载"""
+    started = time.perf_counter()
+    scheduler.register("audit_rollup", 300, refresh_hourly_rollups, delay=10)  # 审计日志小时汇总
+    scheduler.register("audit_retention", 24 * 3600, run_retention, delay=60)  # 审计日志分区归档
+    scheduler.register("audit_checkpoint", 600, build_checkpoints, delay=30)  # 审计日志哈希链检查点
+    scheduler.register("attachment_gc", 3600, collect_garbage, delay=120)  # 清理无引用的附件文件
+    scheduler.register("fund_ledger_reconcile", 24 * 3600, reconcile_fund_ledgers, delay=300)  # 经费台账对账
+    scheduler.register("fund_snapshots", 6 * 3600, build_month_snapshots, delay=600)  # 生成上月经费月末快照
+    scheduler.start()
+    metrics.start_flusher()
+    olap_cube.start_loader()  # 每个进程各自加载，首次加载在后台进行
+    logger.info(
+        "Worker %d started", os.getpid(),
+        extra={"import_ms": IMPORT_MS, "startup_ms": int((time.perf_counter() - started) * 1000)}
+    )
+
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    """
+    停止后台定时任务、指标快照写入和统计立方体刷新（服务器已等待进行中的请求完成）
+    最后写出日志队列中剩余的日志
+    """
+    scheduler.stop()
+    metrics.stop_flusher()
+    olap_cube.stop_loader()
+    logger.info("Worker %d stopped", os.getpid())
+    shutdown_logging()
+
 
 @app.get("/")
 async def root():
@@ -55,7 +119,37 @@ async def health_check():
     return {"status": "healthy", "service": "RMS Backend"}
 
 
+@app.get("/api/health/live")
+async def liveness_check():
+    """存活检查（不访问数据库，进程能响应即存活）"""
+    return {"status": "alive", "service": "RMS Backend"}
+
+
+@app.get("/api/health/ready")
+def readiness_check():
+    """
+    就绪检查：数据库延迟、连接池饱和度（附带后台任务积压情况，仅供参考）
+    数据库或连接池超过阈值返回 503，负载均衡据此摘除该进程
+    """
+    result = check_readiness()
+    return JSONResponse(
+        status_code=200 if result["ready"] else 503,
+        content={"status": "ready" if result["ready"] else "unavailable", "service": "RMS Backend", **result}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics(request: Request):
+    """运行指标（Prometheus 文本格式，汇总所有工作进程，需携带抓取令牌）"""
+    if not metrics.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not metrics.authorized(request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="抓取令牌无效")
+    return PlainTextResponse(metrics.export_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
+    # 开发模式（生产环境使用 python serve.py）
     import uvicorn
     uvicorn.run(
         "main:app",
@@ -0,0 +1,70 @@
+"""
+数据库迁移脚本（部署/升级时执行一次，应用启动时不再建表）
+- 创建缺失的表
+- 依次执行审计日志、业务表升级步骤（每一步均可重复执行，已完成的步骤自动跳过）
+用法：python migrate.py
+"""
+import sys
+import time
+from database import engine, Base
+import models  # noqa: F401  注册全部模型
+from upgrade_audit_partitions import partition_operation_logs
+from upgrade_audit_resource_index import add_resource_columns, backfill_resource_columns
+from upgrade_audit_dictionary import create_dictionary_table, add_id_columns, backfill_ids, drop_string_columns
+from upgrade_audit_chain import add_hash_columns, create_chain_tables
+from upgrade_audit_profiling import add_profiling_columns
+from upgrade_project_members import create_members_table, backfill_project_members
+from upgrade_paper_authors import create_authors_table, backfill_paper_authors
+from upgrade_fund_ledger import create_ledger_tables, backfill_fund_ledgers
+from upgrade_fund_snapshots import create_snapshot_tables, backfill_fund_snapshots
+
+
+def create_tables():
+    """创建缺失的表（不修改已有表）"""
+    print("正在创建缺失的表...")
+    Base.metadata.create_all(bind=engine)
+    print("  ✓ 表结构已就绪")
+
+
+# 迁移步骤（按顺序执行）
+MIGRATIONS = [
+    ("创建数据表", create_tables),
+    ("审计日志按月分区", partition_operation_logs),
+    ("审计日志资源索引", add_resource_columns),
+    ("回填资源索引", backfill_resource_columns),
+    ("审计字典表", create_dictionary_table),
+    ("审计字典列", add_id_columns),
+    ("回填审计字典", backfill_ids),
+    ("删除审计原字符串列", drop_string_columns),
+    ("审计哈希链列", add_hash_columns),
+    ("审计哈希链表", create_chain_tables),
+    ("审计请求剖析列", add_profiling_columns),
+    ("项目成员表", create_members_table),
+    ("回填项目成员", backfill_project_members),
+    ("论文作者表", create_authors_table),
+    ("回填论文作者", backfill_paper_authors),
+    ("经费台账表", create_ledger_tables),
+    ("回填经费台账", backfill_fund_ledgers),
+    ("经费月末快照表", create_snapshot_tables),
+    ("生成经费月末快照", backfill_fund_snapshots),
+]
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 数据库迁移")
+    print("=" * 60)
+
+    for name, step in MIGRATIONS:
+        print(f"\n[{name}]")
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"\n❌ 迁移失败（{name}）: {e}")
+            sys.exit(1)
+        print(f"  耗时 {time.perf_counter() - started:.2f}s")
+
+    print("\n" + "=" * 60)
+    print("  ✅ 迁移完成！")
+    print("=" * 60)
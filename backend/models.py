@@ -2,10 +2,12 @@
 数据库模型定义
 包括：用户、项目、论文、经费、成果等表
 """
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey, Enum, UniqueConstraint, Index, select
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
+from utils.audit_dict import AuditDict
 import enum
 
 
@@ -82,7 +84,7 @@ class Project(Base):
     status = Column(Enum(ProjectStatus), default=ProjectStatus.DRAFT, comment="项目状态")
     description = Column(Text, comment="项目描述")
     objectives = Column(Text, comment="研究目标")
-    attachments = Column(Text, comment="附件（JSON格式）")
+    attachments = Column(Text, comment="附件（JSON格式，已弃用，新附件见 attachments 表）")
     created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
@@ -90,6 +92,30 @@ class Project(Base):
     pi_user = relationship("User", back_populates="projects", foreign_keys=[pi_id])
     funds = relationship("Fund", back_populates="project", cascade="all, delete-orphan")
     papers = relationship("Paper", back_populates="project")
+    member_rows = relationship(
+        "ProjectMember", back_populates="project", cascade="all, delete-orphan",
+        order_by="ProjectMember.position"
+    )
+
+
+# 项目成员表（由 Project.members 同步维护，见 crud/project.py 中的 sync_project_members）
+class ProjectMember(Base):
+    __tablename__ = "project_members"
+    __table_args__ = (
+        Index("ix_project_members_user_project", "user_id", "project_id"),
+        Index("ix_project_members_project_role", "project_id", "role"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, comment="项目ID")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True,
+                     comment="用户ID（校外成员或重名无法确定时为空）")
+    name = Column(String(50), nullable=False, comment="成员姓名")
+    role = Column(String(20), nullable=False, comment="角色：PI 负责人 / MEMBER 成员")
+    position = Column(Integer, nullable=False, default=0, comment="排序")
+    
+    # 关系
+    project = relationship("Project", back_populates="member_rows")
 
 
 # 论文表
@@ -113,11 +139,39 @@ class Paper(Base):
     # 关系
     project = relationship("Project", back_populates="papers")
     creator_user = relationship("User", back_populates="papers")
+    author_rows = relationship(
+        "PaperAuthor", back_populates="paper", cascade="all, delete-orphan",
+        order_by="PaperAuthor.position"
+    )
+
+
+# 论文作者表（由 Paper.authors 解析维护，见 crud/paper.py 中的 sync_paper_authors）
+class PaperAuthor(Base):
+    __tablename__ = "paper_authors"
+    __table_args__ = (
+        Index("ix_paper_authors_user_paper", "user_id", "paper_id"),
+        Index("ix_paper_authors_paper_position", "paper_id", "position"),
+        Index("ix_paper_authors_name", "name"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), nullable=False, comment="论文ID")
+    position = Column(Integer, nullable=False, comment="作者顺序（1 为第一作者）")
+    name = Column(String(50), nullable=False, comment="作者姓名")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True,
+                     comment="用户ID（校外作者或重名无法确定时为空）")
+    is_corresponding = Column(Boolean, nullable=False, default=False, comment="是否通讯作者")
+    
+    # 关系
+    paper = relationship("Paper", back_populates="author_rows")
 
 
 # 经费表
 class Fund(Base):
     __tablename__ = "funds"
+    __table_args__ = (
+        Index("ix_funds_project_date", "project_id", "expense_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, comment="项目ID")
@@ -132,6 +186,48 @@ class Fund(Base):
     project = relationship("Project", back_populates="funds")
 
 
+# 项目经费台账（随经费增删改在同一事务内更新，见 utils/fund_ledger.py；剩余经费 = 项目总预算 - spent_total）
+class ProjectFundLedger(Base):
+    __tablename__ = "project_fund_ledgers"
+    
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID")
+    spent_total = Column(Float(53), nullable=False, default=0.0, comment="已支出合计")
+    fund_count = Column(Integer, nullable=False, default=0, comment="经费记录数")
+    last_expense_date = Column(Date, comment="最近支出日期")
+    updated_at = Column(DateTime, server_default=func.now(), comment="更新时间")
+
+
+# 项目经费台账按支出类型的合计
+class ProjectFundLedgerType(Base):
+    __tablename__ = "project_fund_ledger_types"
+    
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID")
+    expense_type = Column(String(100), primary_key=True, comment="支出类型")
+    amount = Column(Float(53), nullable=False, default=0.0, comment="支出合计")
+    fund_count = Column(Integer, nullable=False, default=0, comment="经费记录数")
+
+
+# 经费月末快照期间（定时任务逐月生成，见 utils/fund_snapshots.py；只有已完成的期间用于查询）
+class FundSnapshotPeriod(Base):
+    __tablename__ = "fund_snapshot_periods"
+    
+    month = Column(Date, primary_key=True, comment="快照月份（当月1日）")
+    completed = Column(Boolean, nullable=False, default=False, comment="是否已生成完成")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    completed_at = Column(DateTime, comment="完成时间")
+
+
+# 经费月末快照：截至月末各项目按支出类型的累计支出（补录往期经费时在同一事务内修正其后各月）
+class FundMonthSnapshot(Base):
+    __tablename__ = "fund_month_snapshots"
+    
+    month = Column(Date, primary_key=True, comment="快照月份（当月1日）")
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID")
+    expense_type = Column(String(100), primary_key=True, comment="支出类型")
+    amount = Column(Float(53), nullable=False, default=0.0, comment="累计支出")
+    fund_count = Column(Integer, nullable=False, default=0, comment="累计经费记录数")
+
+
 # 科研成果表
 class Achievement(Base):
     __tablename__ = "achievements"
@@ -144,26 +240,147 @@ class Achievement(Base):
     completion_date = Column(Date, comment="完成日期")
     certificate_no = Column(String(100), comment="证书编号")
     description = Column(Text, comment="成果描述")
-    attachments = Column(Text, comment="附件（JSON格式）")
+    attachments = Column(Text, comment="附件（JSON格式，已弃用，新附件见 attachments 表）")
     created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
 
 
+# 附件文件（按内容 SHA-256 寻址，相同内容只存一份；引用计数归零后由定时任务清理，见 utils/attachments.py）
+class AttachmentBlob(Base):
+    __tablename__ = "attachment_blobs"
+    
+    sha256 = Column(String(64), primary_key=True, comment="内容SHA-256")
+    size = Column(Integer, nullable=False, comment="文件大小（字节）")
+    ref_count = Column(Integer, nullable=False, default=0, comment="引用次数")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, server_default=func.now(), comment="引用次数最后变化时间（由 utils/attachments.py 增减引用时写入）")
+
+
+# 附件（项目、成果等业务记录上传的文件，内容存于 attachment_blobs）
+class Attachment(Base):
+    __tablename__ = "attachments"
+    __table_args__ = (
+        Index("ix_attachments_owner", "owner_type", "owner_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    owner_type = Column(String(20), nullable=False, comment="所属类型：project / achievement")
+    owner_id = Column(Integer, nullable=False, comment="所属记录ID")
+    sha256 = Column(String(64), ForeignKey("attachment_blobs.sha256"), nullable=False, index=True, comment="内容SHA-256")
+    filename = Column(String(255), nullable=False, comment="原始文件名")
+    content_type = Column(String(100), comment="MIME 类型")
+    size = Column(Integer, nullable=False, comment="文件大小（字节）")
+    uploader_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, comment="上传人ID")
+    created_at = Column(DateTime, server_default=func.now(), comment="上传时间")
+
+
+# 审计日志字典字段：日志表存整数ID，读取时经进程内缓存还原为字符串，SQL 表达式为字典子查询
+def _dictionary_field(id_column: str, doc: str):
+    def getter(self):
+        return AuditDict.decode(getattr(self, id_column))
+
+    def expression(cls):
+        return select(AuditDictionary.value).where(
+            AuditDictionary.id == getattr(cls, id_column)
+        ).scalar_subquery()
+
+    getter.__doc__ = doc
+    return hybrid_property(getter, expr=expression)
+
+
 # 操作日志表（符合等保二级要求）
+# 按月 RANGE 分区（见 upgrade_audit_partitions.py），分区表不支持外键，user_id 不设外键约束
+# 用户名、操作类型、模块、方法、路径、用户代理以字典ID存储（见 utils/audit_dict.py）
 class OperationLog(Base):
     __tablename__ = "operation_logs"
+    __table_args__ = (
+        Index("ix_operation_logs_resource", "resource_type", "resource_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), comment="用户ID")
-    username = Column(String(50), comment="用户名")
-    operation = Column(String(100), nullable=False, comment="操作类型")
-    module = Column(String(50), nullable=False, comment="模块名称")
-    method = Column(String(10), comment="HTTP方法")
-    path = Column(String(200), comment="请求路径")
+    user_id = Column(Integer, index=True, comment="用户ID")
+    username_id = Column(Integer, index=True, comment="用户名字典ID")
+    operation_id = Column(Integer, index=True, comment="操作类型字典ID")
+    module_id = Column(Integer, index=True, comment="模块名称字典ID")
+    method_id = Column(Integer, comment="HTTP方法字典ID")
+    path = Column(String(500), comment="请求路径（含资源ID，取值不重复，不做字典编码）")
     details = Column(Text, comment="操作详情")
+    resource_type = Column(String(50), comment="资源类型")
+    resource_id = Column(String(50), comment="资源ID")
     ip_address = Column(String(50), nullable=False, comment="IP地址")
-    user_agent = Column(String(500), comment="用户代理")
+    user_agent_id = Column(Integer, comment="用户代理字典ID")
     status = Column(String(20), comment="操作结果")
     error_msg = Column(Text, comment="错误信息")
     duration = Column(Integer, comment="执行时间(毫秒)")
-    created_at = Column(DateTime, server_default=func.now(), index=True, comment="操作时间")
+    sql_count = Column(Integer, comment="请求内SQL语句数")
+    sql_ms = Column(Integer, comment="请求内SQL总耗时(毫秒)")
+    request_id = Column(String(64), comment="请求ID（与应用日志关联）")
+    prev_hash = Column(String(64), comment="前一条日志哈希")
+    row_hash = Column(String(64), comment="本条日志哈希（链式）")
+    created_at = Column(DateTime, nullable=False, server_default=func.now(), index=True, comment="操作时间")
+    
+    username = _dictionary_field("username_id", "用户名")
+    operation = _dictionary_field("operation_id", "操作类型")
+    module = _dictionary_field("module_id", "模块名称")
+    method = _dictionary_field("method_id", "HTTP方法")
+    user_agent = _dictionary_field("user_agent_id", "用户代理")
+
+
+# 审计日志字典表（用户名、操作类型等低基数字符串编码为整数ID）
+class AuditDictionary(Base):
+    __tablename__ = "audit_dictionary"
+    __table_args__ = (
+        UniqueConstraint("kind", "value", name="uq_audit_dictionary_kind_value"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False, comment="字段类型")
+    value = Column(String(500, collation="utf8mb4_bin"), nullable=False, comment="字段值")
+
+
+# 审计哈希链头（单行，写日志时加锁串行推进）
+class AuditChainHead(Base):
+    __tablename__ = "audit_chain_head"
+    
+    id = Column(Integer, primary_key=True, comment="固定为1")
+    last_log_id = Column(Integer, nullable=True, comment="链尾日志ID")
+    last_hash = Column(String(64), nullable=False, comment="链尾哈希")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+
+# 审计哈希链检查点（每 N 条日志一个 Merkle 根）
+class AuditCheckpoint(Base):
+    __tablename__ = "audit_checkpoints"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    first_id = Column(Integer, nullable=False, index=True, comment="块内第一条日志ID")
+    last_id = Column(Integer, nullable=False, index=True, comment="块内最后一条日志ID")
+    record_count = Column(Integer, nullable=False, comment="块内日志条数")
+    merkle_root = Column(String(64), nullable=False, comment="块内日志哈希的 Merkle 根")
+    last_hash = Column(String(64), nullable=False, comment="块内最后一条日志的链式哈希")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+
+
+# 审计日志小时汇总表（由定时任务维护，供审计统计接口使用）
+class OperationLogHourly(Base):
+    __tablename__ = "operation_log_hourly"
+    __table_args__ = (
+        UniqueConstraint("hour", "module", "operation", "status", "username", name="uq_operation_log_hourly"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hour = Column(DateTime, nullable=False, comment="统计小时（整点）")
+    module = Column(String(50), nullable=False, default="", comment="模块名称")
+    operation = Column(String(100), nullable=False, default="", comment="操作类型")
+    status = Column(String(20), nullable=False, default="", comment="操作结果")
+    username = Column(String(50), nullable=False, default="", comment="用户名")
+    count = Column(Integer, nullable=False, default=0, comment="操作次数")
+
+
+# 业务表数据版本号（每次提交写入时递增，用于单飞合并和结果缓存的失效判断，见 utils/data_version.py）
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    
+    table_name = Column(String(64), primary_key=True, comment="表名")
+    version = Column(Integer, nullable=False, default=0, comment="版本号")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="最后更新时间")
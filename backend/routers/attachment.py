@@ -0,0 +1,167 @@
+"""
+附件管理路由（符合等保二级要求）
+- 上传：请求体为文件原始内容（application/octet-stream），文件名通过 filename 参数传递，边接收边写盘
+- 下载：支持 ETag/If-None-Match 缓存校验和 Range 断点续传
+- 上传、删除均记录审计日志
+"""
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List
+from database import get_db
+import models
+import schemas
+from crud import attachment as crud_attachment
+from utils.security import get_current_user
+from utils.audit import AuditLogger
+from utils.attachments import (
+    MAX_ATTACHMENT_BYTES, AttachmentTooLarge, AttachmentFileResponse, blob_path, discard_temp, receive_to_temp
+)
+
+router = APIRouter()
+
+OWNER_TYPE_PATTERN = "^(project|achievement)$"
+
+
+def _get_owner_or_404(db: Session, owner_type: str, owner_id: int):
+    owner = crud_attachment.get_owner(db, owner_type, owner_id)
+    if not owner:
+        raise HTTPException(status_code=404, detail="附件所属记录不存在")
+    return owner
+
+
+def _check_write_permission(db: Session, owner_type: str, owner, current_user: models.User, request: Request):
+    """与修改所属记录的权限一致：项目仅负责人或管理员，成果为登录用户"""
+    if owner_type != "project":
+        return
+    if owner.pi_id != current_user.id and current_user.role != models.UserRole.ADMIN:
+        AuditLogger.log_permission_denied(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            module=owner_type,
+            request=request,
+            reason=f"尝试修改项目ID={owner.id}的附件，但无权限"
+        )
+        raise HTTPException(status_code=403, detail="无权限修改此项目的附件")
+
+
+@router.api_route("/{attachment_id}/download", methods=["GET", "HEAD"], summary="下载附件")
+def download_attachment(
+    attachment_id: int,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """下载附件（支持 If-None-Match 和 Range）"""
+    attachment = crud_attachment.get_attachment_by_id(db, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="附件不存在")
+
+    return AttachmentFileResponse(
+        path=blob_path(attachment.sha256),
+        sha256=attachment.sha256,
+        size=attachment.size,
+        filename=attachment.filename,
+        content_type=attachment.content_type,
+        request_headers=request.headers,
+    )
+
+
+@router.get("/{owner_type}/{owner_id}", response_model=List[schemas.AttachmentResponse], summary="获取附件列表")
+def get_attachments(
+    owner_type: str = Path(..., pattern=OWNER_TYPE_PATTERN),
+    owner_id: int = Path(...),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取项目或成果的附件列表"""
+    _get_owner_or_404(db, owner_type, owner_id)
+    return crud_attachment.get_attachments(db, owner_type, owner_id)
+
+
+@router.post("/{owner_type}/{owner_id}", response_model=schemas.AttachmentResponse, summary="上传附件")
+async def upload_attachment(
+    request: Request,
+    owner_type: str = Path(..., pattern=OWNER_TYPE_PATTERN),
+    owner_id: int = Path(...),
+    filename: str = Query(..., min_length=1, max_length=255, description="文件名"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    上传附件（含审计日志）
+    请求体为文件原始内容，服务端边接收边计算 SHA-256 并写入临时文件，内容相同的文件只存一份
+    """
+    owner = await run_in_threadpool(_get_owner_or_404, db, owner_type, owner_id)
+    await run_in_threadpool(_check_write_permission, db, owner_type, owner, current_user, request)
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_ATTACHMENT_BYTES:
+        raise HTTPException(status_code=413, detail=f"附件超过 {MAX_ATTACHMENT_BYTES // (1024 * 1024)}MB 上限")
+
+    try:
+        temp_path, sha256, size = await receive_to_temp(request.stream())
+    except AttachmentTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if size == 0:
+        discard_temp(temp_path)
+        raise HTTPException(status_code=400, detail="附件内容为空")
+
+    content_type = request.headers.get("content-type")
+    if not content_type or content_type.startswith("application/x-www-form-urlencoded"):
+        content_type = "application/octet-stream"
+
+    def save():
+        try:
+            attachment = crud_attachment.create_attachment(
+                db, owner_type, owner_id, temp_path, sha256, size,
+                filename=filename, content_type=content_type[:100], uploader_id=current_user.id
+            )
+        finally:
+            discard_temp(temp_path)  # 已移动到内容地址时不存在
+
+        AuditLogger.log_create(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            module=owner_type,
+            resource_type="附件",
+            resource_id=attachment.id,
+            request=request,
+            data={"owner_id": owner_id, "filename": filename, "size": size, "sha256": sha256}
+        )
+        return attachment
+
+    return await run_in_threadpool(save)
+
+
+@router.delete("/{attachment_id}", summary="删除附件")
+def delete_attachment(
+    attachment_id: int,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """删除附件（含审计日志，文件在无引用后由定时任务清理）"""
+    attachment = crud_attachment.get_attachment_by_id(db, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="附件不存在")
+
+    owner = _get_owner_or_404(db, attachment.owner_type, attachment.owner_id)
+    _check_write_permission(db, attachment.owner_type, owner, current_user, request)
+
+    snapshot = schemas.AttachmentResponse.model_validate(attachment).model_dump(mode="json")
+    crud_attachment.delete_attachment(db, attachment)
+
+    AuditLogger.log_delete(
+        db=db,
+        user_id=current_user.id,
+        username=current_user.username,
+        module=snapshot["owner_type"],
+        resource_type="附件",
+        resource_id=attachment_id,
+        request=request,
+        data=snapshot
+    )
+    return {"message": "附件删除成功"}
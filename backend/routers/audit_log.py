@@ -5,14 +5,85 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, and_, or_
 from database import get_db
 import models
 from utils.security import get_current_user, require_admin, require_secretary
+from utils.audit import AuditLogger
+from utils.audit_dict import AuditDict
+from utils.audit_archive import AuditArchive, build_predicate
+from utils.audit_rollup import get_statistics
+from utils.audit_export import MEDIA_TYPES, iter_export_rows, stream_export
+from utils.audit_chain import BLOCK_SIZE, verify_range
 
 router = APIRouter()
 
+# 资源历史查询支持的英文类型别名（日志中记录的是中文资源类型）
+RESOURCE_TYPE_ALIASES = {
+    "project": "项目",
+    "paper": "论文",
+    "fund": "经费记录",
+    "achievement": "成果",
+    "user": "用户",
+}
+
+# 在线完整性校验的范围上限（完整校验使用命令行脚本 verify_audit_chain.py）
+VERIFY_MAX_BLOCKS = 64  # 单次请求最多校验的检查点块数
+VERIFY_MAX_IDS = VERIFY_MAX_BLOCKS * BLOCK_SIZE  # 单次请求最多覆盖的日志ID数
+VERIFY_MAX_PROBLEMS = 100  # 响应中最多返回的问题条数
+
+
+def build_log_filters(
+    username: Optional[str],
+    operation: Optional[str],
+    module: Optional[str],
+    status: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str]
+):
+    """
+    构建审计日志查询条件（列表查询与导出共用）
+    
+    Returns:
+        (查询条件列表, 开始时间, 结束时间)
+    """
+    filters = []
+    start_dt = None
+    end_dt = None
+    
+    # 用户名、操作类型的模糊匹配在内存字典上完成，改写为整数ID列上的 IN 查询
+    if username:
+        filters.append(models.OperationLog.username_id.in_(AuditDict.match_ids("username", username)))
+    
+    if operation:
+        filters.append(models.OperationLog.operation_id.in_(AuditDict.match_ids("operation", operation)))
+    
+    if module:
+        module_id = AuditDict.lookup("module", module)
+        filters.append(models.OperationLog.module_id.in_([module_id] if module_id else []))
+    
+    if status:
+        filters.append(models.OperationLog.status == status)
+    
+    # 日期范围筛选
+    if start_date:
+        try:
+            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+            filters.append(models.OperationLog.created_at >= start_dt)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="开始日期格式错误，应为 YYYY-MM-DD")
+    
+    if end_date:
+        try:
+            end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+            filters.append(models.OperationLog.created_at < end_dt)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="结束日期格式错误，应为 YYYY-MM-DD")
+    
+    return filters, start_dt, end_dt
+
 
 @router.get("/logs", summary="查询审计日志")
 def get_audit_logs(
@@ -32,38 +103,11 @@ def get_audit_logs(
     查询审计日志
     - 支持多条件筛选
     - 支持分页
+    - 开始日期早于在线保留期时，自动合并归档数据
     - 管理员和科研秘书可访问
     """
     try:
-        # 构建查询条件
-        filters = []
-        
-        if username:
-            filters.append(models.OperationLog.username.like(f"%{username}%"))
-        
-        if operation:
-            filters.append(models.OperationLog.operation.like(f"%{operation}%"))
-        
-        if module:
-            filters.append(models.OperationLog.module == module)
-        
-        if status:
-            filters.append(models.OperationLog.status == status)
-        
-        # 日期范围筛选
-        if start_date:
-            try:
-                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                filters.append(models.OperationLog.created_at >= start_dt)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="开始日期格式错误，应为 YYYY-MM-DD")
-        
-        if end_date:
-            try:
-                end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-                filters.append(models.OperationLog.created_at < end_dt)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="结束日期格式错误，应为 YYYY-MM-DD")
+        filters, start_dt, end_dt = build_log_filters(username, operation, module, status, start_date, end_date)
         
         # 查询总数
         total = db.query(models.OperationLog).filter(and_(*filters)).count() if filters else db.query(models.OperationLog).count()
@@ -73,27 +117,24 @@ def get_audit_logs(
         if filters:
             query = query.filter(and_(*filters))
         
-        logs = query.order_by(desc(models.OperationLog.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+        offset = (page - 1) * page_size
+        logs = query.order_by(desc(models.OperationLog.created_at)).offset(offset).limit(page_size).all()
         
         # 转换为字典
-        result = []
-        for log in logs:
-            result.append({
-                "id": log.id,
-                "user_id": log.user_id,
-                "username": log.username,
-                "operation": log.operation,
-                "module": log.module,
-                "method": log.method,
-                "path": log.path,
-                "details": log.details,
-                "ip_address": log.ip_address,
-                "user_agent": log.user_agent,
-                "status": log.status,
-                "error_msg": log.error_msg,
-                "duration": log.duration,
-                "created_at": log.created_at.strftime("%Y-%m-%d %H:%M:%S") if log.created_at else None
-            })
+        result = [AuditLogger.to_dict(log) for log in logs]
+        
+        # 查询范围早于在线数据时，透明读取归档文件（归档数据均早于在线数据，接在在线结果之后）
+        archive_cutoff = AuditArchive.cutoff()
+        if start_dt is not None and archive_cutoff is not None and start_dt < archive_cutoff:
+            archive_total = 0
+            skip = max(0, offset - total)
+            need = page_size - len(result)
+            predicate = build_predicate(username, operation, module, status)
+            for row in AuditArchive.iter_logs(start_dt, end_dt, predicate):
+                if skip <= archive_total < skip + need:
+                    result.append(row)
+                archive_total += 1
+            total += archive_total
         
         return {
             "total": total,
@@ -122,63 +163,14 @@ def get_audit_statistics(
     - 操作类型分布
     - 成功/失败统计
     - 活跃用户统计
+    - 每日操作量统计
     """
     try:
         # 时间范围
         start_date = datetime.now() - timedelta(days=days)
         
-        # 操作类型统计
-        operation_stats = db.query(
-            models.OperationLog.operation,
-            func.count(models.OperationLog.id).label('count')
-        ).filter(
-            models.OperationLog.created_at >= start_date
-        ).group_by(
-            models.OperationLog.operation
-        ).order_by(
-            desc('count')
-        ).limit(10).all()
-        
-        # 成功/失败统计
-        status_stats = db.query(
-            models.OperationLog.status,
-            func.count(models.OperationLog.id).label('count')
-        ).filter(
-            models.OperationLog.created_at >= start_date
-        ).group_by(
-            models.OperationLog.status
-        ).all()
-        
-        # 活跃用户统计
-        user_stats = db.query(
-            models.OperationLog.username,
-            func.count(models.OperationLog.id).label('count')
-        ).filter(
-            models.OperationLog.created_at >= start_date
-        ).group_by(
-            models.OperationLog.username
-        ).order_by(
-            desc('count')
-        ).limit(10).all()
-        
-        # 每日操作量统计
-        daily_stats = db.query(
-            func.date(models.OperationLog.created_at).label('date'),
-            func.count(models.OperationLog.id).label('count')
-        ).filter(
-            models.OperationLog.created_at >= start_date
-        ).group_by(
-            func.date(models.OperationLog.created_at)
-        ).order_by(
-            'date'
-        ).all()
-        
-        return {
-            "operation_stats": [{"operation": op, "count": cnt} for op, cnt in operation_stats],
-            "status_stats": [{"status": st or "未知", "count": cnt} for st, cnt in status_stats],
-            "user_stats": [{"username": usr, "count": cnt} for usr, cnt in user_stats],
-            "daily_stats": [{"date": str(dt), "count": cnt} for dt, cnt in daily_stats]
-        }
+        # 整点小时从汇总表读取，仅范围两端不足一小时的部分实时查询
+        return get_statistics(db, start_date)
         
     except Exception as e:
         raise HTTPException(
@@ -187,6 +179,128 @@ def get_audit_statistics(
         )
 
 
+@router.get("/logs/export", summary="流式导出审计日志")
+def export_audit_logs(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式 ndjson/csv"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    username: Optional[str] = Query(None, description="用户名"),
+    operation: Optional[str] = Query(None, description="操作类型"),
+    module: Optional[str] = Query(None, description="模块名称"),
+    status: Optional[str] = Query(None, description="操作结果"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    current_user: models.User = Depends(require_secretary),
+    db: Session = Depends(get_db)
+):
+    """
+    流式导出审计日志（用于合规检查批量拉取）
+    - 筛选条件与日志查询接口一致，不分页、不统计总数
+    - 服务端游标逐批读取，边查边输出，内存占用恒定
+    - 开始日期早于在线保留期时，在线数据之后接着输出归档数据
+    """
+    filters, start_dt, end_dt = build_log_filters(username, operation, module, status, start_date, end_date)
+    
+    # 导出本身也需要审计
+    AuditLogger.log_operation(
+        db=db,
+        user_id=current_user.id,
+        username=current_user.username,
+        operation="导出审计日志",
+        module="audit",
+        request=request,
+        details={
+            "format": format,
+            "gzip": gzip,
+            "filters": {
+                "username": username,
+                "operation": operation,
+                "module": module,
+                "status": status,
+                "start_date": start_date,
+                "end_date": end_date
+            }
+        }
+    )
+    
+    rows = iter_export_rows(filters, start_dt, end_dt, build_predicate(username, operation, module, status))
+    filename = f"audit_logs_{datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        stream_export(rows, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/resources/{resource_type}/{resource_id}/history", summary="查询资源变更历史")
+def get_resource_history(
+    resource_type: str,
+    resource_id: str,
+    cursor: Optional[int] = Query(None, ge=1, description="上一页最后一条日志ID"),
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    current_user: models.User = Depends(require_secretary),
+    db: Session = Depends(get_db)
+):
+    """
+    查询指定资源的全部创建/更新/删除记录（按时间倒序）
+    - resource_type 支持 project/paper/fund/achievement/user 或中文资源类型
+    - 基于 (resource_type, resource_id, id) 索引的游标分页，翻页耗时与日志总量无关
+    """
+    resource_type = RESOURCE_TYPE_ALIASES.get(resource_type, resource_type)
+    
+    query = db.query(models.OperationLog).filter(
+        models.OperationLog.resource_type == resource_type,
+        models.OperationLog.resource_id == resource_id
+    )
+    if cursor:
+        query = query.filter(models.OperationLog.id < cursor)
+    
+    # 多取一条用于判断是否还有下一页
+    logs = query.order_by(desc(models.OperationLog.id)).limit(limit + 1).all()
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    
+    return {
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "data": [AuditLogger.to_dict(log) for log in logs],
+        "next_cursor": logs[-1].id if has_more else None
+    }
+
+
+@router.get("/verify", summary="校验审计日志完整性")
+def verify_audit_chain(
+    start_id: int = Query(..., ge=1, description="起始日志ID"),
+    end_id: Optional[int] = Query(None, ge=1, description=f"结束日志ID（默认校验起始ID之后 {VERIFY_MAX_IDS} 条）"),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    重算哈希链，检查指定ID范围内的日志是否被篡改、删除或插入
+    - 完整覆盖的块同时与 Merkle 检查点比对
+    - 未接入哈希链的历史日志不参与校验
+    - 单次最多校验 VERIFY_MAX_IDS 个ID，最多返回 VERIFY_MAX_PROBLEMS 条问题；全量校验请使用 verify_audit_chain.py
+    """
+    if end_id is None:
+        end_id = start_id + VERIFY_MAX_IDS - 1
+    if start_id > end_id:
+        raise HTTPException(status_code=400, detail="起始ID不能大于结束ID")
+    if end_id - start_id + 1 > VERIFY_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多校验 {VERIFY_MAX_IDS} 条日志，全量校验请在服务器上运行 verify_audit_chain.py"
+        )
+    
+    result = verify_range(start_id, end_id)
+    result["problem_count"] = len(result["problems"])
+    result["problems"] = result["problems"][:VERIFY_MAX_PROBLEMS]
+    return result
+
+
 @router.get("/logs/{log_id}", summary="查询日志详情")
 def get_audit_log_detail(
     log_id: int,
@@ -199,19 +313,4 @@ def get_audit_log_detail(
     if not log:
         raise HTTPException(status_code=404, detail="日志不存在")
     
-    return {
-        "id": log.id,
-        "user_id": log.user_id,
-        "username": log.username,
-        "operation": log.operation,
-        "module": log.module,
-        "method": log.method,
-        "path": log.path,
-        "details": log.details,
-        "ip_address": log.ip_address,
-        "user_agent": log.user_agent,
-        "status": log.status,
-        "error_msg": log.error_msg,
-        "duration": log.duration,
-        "created_at": log.created_at.strftime("%Y-%m-%d %H:%M:%S") if log.created_at else None
-    }
+    return AuditLogger.to_dict(log)
@@ -2,7 +2,9 @@
 经费管理路由（符合等保二级要求）
 包含完整的审计日志记录
 """
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
@@ -11,6 +13,9 @@ import schemas
 from crud import fund as crud_fund
 from utils.security import get_current_user
 from utils.audit import AuditLogger, Timer
+from utils.fund_ledger import BudgetExceeded
+from utils import fund_snapshots
+from utils.excel import export_fund_balances_to_excel
 
 router = APIRouter()
 
@@ -45,11 +50,85 @@ def get_project_fund_summary(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取指定项目的经费汇总"""
+    """获取指定项目的经费汇总（含总预算、剩余经费、最近支出日期）"""
     summary = crud_fund.get_project_fund_summary(db, project_id)
     return summary
 
 
+@router.get("/balances", summary="查询历史日期的项目经费余额")
+def get_fund_balances(
+    response: Response,
+    as_of: date = Query(..., description="截止日期（含当天）"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    project_id: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    各项目截至指定日期的已支出、剩余经费及按类型的支出
+    由最近的月末快照加上快照之后的经费计算，按项目ID分页
+    """
+    total, snapshot_month, items = fund_snapshots.get_balances(
+        db, as_of, skip=skip, limit=limit, project_id=project_id
+    )
+    # 在响应头中返回总数
+    response.headers["X-Total-Count"] = str(total)
+    return {"as_of": as_of, "snapshot_month": snapshot_month, "items": items}
+
+
+@router.get("/balances/export", summary="导出历史日期的项目经费余额到Excel")
+def export_fund_balances(
+    request: Request,
+    as_of: date = Query(..., description="截止日期（含当天）"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """导出全部项目截至指定日期的经费余额（含审计日志）"""
+    exported = 0
+
+    def counted(balances):
+        # 余额逐批生成、逐行写入，导出的项目数在写入时累计
+        nonlocal exported
+        for item in balances:
+            exported += 1
+            yield item
+
+    try:
+        excel_file = export_fund_balances_to_excel(
+            counted(fund_snapshots.iter_balances(db, as_of)), as_of, fund_snapshots.expense_types(db)
+        )
+        
+        AuditLogger.log_export(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            module="fund",
+            resource_type="经费余额",
+            request=request,
+            count=exported,
+            filters={"as_of": str(as_of)}
+        )
+        
+        return StreamingResponse(
+            excel_file,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f"attachment; filename=fund_balances_{as_of.strftime('%Y%m%d')}.xlsx"}
+        )
+    except Exception as e:
+        AuditLogger.log_operation(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            operation="导出经费余额失败",
+            module="fund",
+            request=request,
+            status="FAILED",
+            error_msg=str(e)
+        )
+        raise
+
+
 @router.get("/{fund_id}", response_model=schemas.FundResponse, summary="获取经费详情")
 def get_fund(
     fund_id: int,
@@ -91,6 +170,18 @@ def create_fund(
         )
         
         return new_fund
+    except BudgetExceeded as e:
+        AuditLogger.log_operation(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            operation="创建经费记录失败",
+            module="fund",
+            request=request,
+            status="FAILED",
+            error_msg=str(e)
+        )
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         AuditLogger.log_operation(
             db=db,
@@ -135,6 +226,18 @@ def update_fund(
         return updated_fund
     except HTTPException:
         raise
+    except BudgetExceeded as e:
+        AuditLogger.log_operation(
+            db=db,
+            user_id=current_user.id,
+            username=current_user.username,
+            operation="更新经费记录失败",
+            module="fund",
+            request=request,
+            status="FAILED",
+            error_msg=str(e)
+        )
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         AuditLogger.log_operation(
             db=db,
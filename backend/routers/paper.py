@@ -12,9 +12,17 @@ from crud import paper as crud_paper
 from utils.security import get_current_user
 from utils.excel import export_papers_to_excel
 from utils.audit import AuditLogger, Timer
+from utils.singleflight import SingleFlight, flight_key
 from fastapi.responses import StreamingResponse
 
 router = APIRouter()
+list_flight = SingleFlight("paper_list")
+
+
+def _query_papers(db: Session, **params):
+    """查询论文列表及总数（转换为响应模型，便于在并发请求间共享）"""
+    total, papers = crud_paper.get_papers(db, return_total=True, **params)
+    return total, [schemas.PaperResponse.model_validate(paper) for paper in papers]
 
 
 @router.get("/", response_model=List[schemas.PaperResponse], summary="获取论文列表")
@@ -30,17 +38,14 @@ def get_papers(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取论文列表，支持筛选"""
-    total, papers = crud_paper.get_papers(
-        db,
-        skip=skip,
-        limit=limit,
-        creator_id=creator_id,
-        project_id=project_id,
-        year=year,
-        jcr_zone=jcr_zone,
-        cas_zone=cas_zone,
-        return_total=True
+    """获取论文列表，支持筛选（相同筛选条件的并发请求共享一次查询）"""
+    params = {
+        "skip": skip, "limit": limit, "creator_id": creator_id, "project_id": project_id,
+        "year": year, "jcr_zone": jcr_zone, "cas_zone": cas_zone,
+    }
+    total, papers = list_flight.do(
+        flight_key("get_papers", params, ("papers",)),
+        lambda: _query_papers(db, **params)
     )
     # 在响应头中返回总数
     response.headers["X-Total-Count"] = str(total)
@@ -100,6 +105,35 @@ def export_papers(
         raise
 
 
+@router.get("/authors/{user_id}", response_model=List[schemas.PaperResponse], summary="获取作者的论文")
+def get_author_papers(
+    user_id: int,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    first_author: bool = Query(False, description="只看第一作者"),
+    corresponding: bool = Query(False, description="只看通讯作者"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取用户署名的论文（按作者表查询，不依赖录入人）"""
+    total, papers = crud_paper.get_author_papers(
+        db, user_id, skip=skip, limit=limit, first_author=first_author, corresponding=corresponding
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return papers
+
+
+@router.get("/authors/{user_id}/statistics", summary="作者论文统计")
+def get_author_statistics(
+    user_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """用户的论文总数、第一作者数、通讯作者数、年度分布和主要合作者"""
+    return crud_paper.get_author_statistics(db, user_id)
+
+
 @router.get("/{paper_id}", response_model=schemas.PaperResponse, summary="获取论文详情")
 def get_paper(
     paper_id: int,
@@ -12,9 +12,13 @@ from crud import project as crud_project
 from utils.security import get_current_user
 from utils.excel import export_projects_to_excel
 from utils.audit import AuditLogger, Timer
+from utils.logger import get_logger
+from utils.singleflight import SingleFlight, flight_key
 from fastapi.responses import StreamingResponse
 
 router = APIRouter()
+logger = get_logger("project")
+list_flight = SingleFlight("project_list")
 
 
 @router.get("/", response_model=List[schemas.ProjectResponse], summary="获取项目列表")
@@ -29,11 +33,12 @@ def get_projects(
     db: Session = Depends(get_db)
 ):
     """获取项目列表，支持筛选"""
-    # 调试日志：打印所有参数
-    print(f"[DEBUG] get_projects called with:")
-    print(f"  skip={skip}, limit={limit}")
-    print(f"  pi_id={pi_id}, status={repr(status)}")
-    print(f"  project_type={project_type}, year={year}")
+    # 调试日志：记录所有参数（按 DEBUG 级别采样输出）
+    logger.debug(
+        "get_projects called",
+        extra={"skip": skip, "limit": limit, "pi_id": pi_id, "status": status,
+               "project_type": project_type, "year": year}
+    )
     
     # 处理空字符串的 status，包括 None 和空字符串
     status_enum = None
@@ -42,19 +47,29 @@ def get_projects(
             status_enum = models.ProjectStatus(status)
         except ValueError:
             # 如果无法转换，直接忽略而不是抛异常
-            print(f"[DEBUG] Invalid status value: {status}")
-            pass
+            logger.debug("Invalid status value: %r", status)
     
-    projects = crud_project.get_projects(
-        db,
-        skip=skip,
-        limit=limit,
-        pi_id=pi_id,
-        status=status_enum,
-        project_type=project_type,
-        year=year
+    # 相同筛选条件的并发请求共享一次查询（结果转换为响应模型后共享，不跨会话共享 ORM 对象）
+    params = {
+        "skip": skip, "limit": limit, "pi_id": pi_id,
+        "status": status_enum.value if status_enum else None,
+        "project_type": project_type, "year": year,
+    }
+    return list_flight.do(
+        flight_key("get_projects", params, ("projects",)),
+        lambda: [
+            schemas.ProjectResponse.model_validate(project)
+            for project in crud_project.get_projects(
+                db,
+                skip=skip,
+                limit=limit,
+                pi_id=pi_id,
+                status=status_enum,
+                project_type=project_type,
+                year=year
+            )
+        ]
     )
-    return projects
 
 
 @router.get("/my", response_model=List[schemas.ProjectResponse], summary="获取我的项目")
@@ -69,6 +84,17 @@ def get_my_projects(
     return projects
 
 
+@router.get("/participating", response_model=List[schemas.ProjectResponse], summary="获取我参与的项目")
+def get_participating_projects(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户作为成员参与（非负责）的项目"""
+    return crud_project.get_participating_projects(db, current_user.id, skip=skip, limit=limit)
+
+
 @router.get("/export", summary="导出项目到Excel")
 def export_projects(
     request: Request,
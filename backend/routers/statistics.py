@@ -1,29 +1,53 @@
 """
 统计分析路由
+相同的并发统计请求通过单飞合并只计算一次（见 utils/singleflight.py）
+仪表盘各统计分区在线程池中并行计算，各用独立的数据库连接
+经费执行进度分析见 utils/fund_analytics.py
+多维下钻统计由进程内统计立方体回答（见 utils/olap_cube.py）
 """
-from fastapi import APIRouter, Depends
+import time
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from database import get_db
+from database import engine, get_db, SessionLocal
 import models
 from utils.security import get_current_user
 from crud import project as crud_project
 from crud import paper as crud_paper
 from crud import fund as crud_fund
 from crud import achievement as crud_achievement
+from utils.singleflight import SingleFlight, flight_key
+from utils.fund_analytics import get_burn_rate_report
+from utils.olap_cube import CubeNotReady, cube
+from utils.logger import get_logger
 
 router = APIRouter()
+logger = get_logger("statistics")
 
+# 仪表盘并行计算配置
+DASHBOARD_WORKERS = max(1, engine.pool.size() - 1)  # 线程池大小（每个进程同时计算的分区数上限，比连接池常驻连接数少一个，为其他请求留出连接）
+SECTION_TIMEOUT_SECONDS = 5  # 单个分区从开始计算起的超时时间，超时的分区返回空结果
+SECTION_QUEUE_TIMEOUT_SECONDS = 5  # 分区在线程池队列中等待开始的时间上限，超过后取消计算并返回空结果
+SECTION_STATEMENT_TIMEOUT_MS = SECTION_TIMEOUT_SECONDS * 1000  # 分区内单条查询的执行时间上限，超时后由 MySQL 中止并归还连接
 
-@router.get("/overview", summary="系统概览统计")
-def get_overview_statistics(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    获取系统整体统计数据
-    - 项目总数、论文总数、成果总数
-    - 经费总额
-    """
+# 各统计结果依赖的表（数据版本号计入单飞合并键）
+SECTION_TABLES = {
+    "overview": ("projects", "papers", "achievements", "funds"),
+    "projects": ("projects",),
+    "papers": ("papers",),
+    "funds": ("funds",),
+    "achievements": ("achievements",),
+}
+
+statistics_flight = SingleFlight("statistics")
+
+
+def compute_overview(db: Session) -> dict:
+    """系统概览统计"""
     project_count = db.query(models.Project).count()
     paper_count = db.query(models.Paper).count()
     achievement_count = db.query(models.Achievement).count()
@@ -39,16 +63,8 @@ def get_overview_statistics(
     }
 
 
-@router.get("/projects", summary="项目统计")
-def get_project_statistics(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    项目统计分析
-    - 按状态统计
-    - 按年份统计
-    """
+def compute_project_statistics(db: Session) -> dict:
+    """项目统计（含按年份统计）"""
     stats = crud_project.get_project_statistics(db)
     
     # 按年份统计
@@ -64,17 +80,8 @@ def get_project_statistics(
     return stats
 
 
-@router.get("/papers", summary="论文统计")
-def get_paper_statistics(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    论文统计分析
-    - 按年份统计
-    - 按JCR分区统计
-    - 按中科院分区统计
-    """
+def compute_paper_statistics(db: Session) -> dict:
+    """论文统计（含按分区统计）"""
     stats = crud_paper.get_paper_statistics(db)
     
     # 按JCR分区统计
@@ -94,6 +101,92 @@ def get_paper_statistics(
     return stats
 
 
+SECTION_COMPUTERS = {
+    "overview": compute_overview,
+    "projects": compute_project_statistics,
+    "papers": compute_paper_statistics,
+    "funds": crud_fund.get_fund_statistics,
+    "achievements": crud_achievement.get_achievement_statistics,
+}
+
+
+def coalesced_section(section: str, db: Session) -> dict:
+    """计算统计分区（相同的并发请求共享一次计算）"""
+    return statistics_flight.do(
+        flight_key(section, tables=SECTION_TABLES[section]),
+        lambda: SECTION_COMPUTERS[section](db)
+    )
+
+
+_dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="rms-dashboard")
+
+
+def _compute_section_with_session(section: str) -> dict:
+    """
+    在独立会话（独立连接）中计算统计分区
+    查询设置执行时间上限：超时未返回的分区不会长期占用连接池中的连接
+    """
+    db = SessionLocal()
+    try:
+        db.execute(text("SET SESSION max_execution_time = :ms"), {"ms": SECTION_STATEMENT_TIMEOUT_MS})
+        return coalesced_section(section, db)
+    finally:
+        try:
+            # 连接归还连接池前恢复默认值，避免影响其他请求
+            db.rollback()
+            db.execute(text("SET SESSION max_execution_time = 0"))
+        except Exception as e:
+            logger.warning("Failed to reset max_execution_time: %s", e)
+            db.invalidate()
+        db.close()
+
+
+def _run_section(section: str, started: dict) -> dict:
+    """线程池中执行的分区计算（记录开始时间，分区超时从开始计算时算起）"""
+    started[section] = time.monotonic()
+    return _compute_section_with_session(section)
+
+
+@router.get("/overview", summary="系统概览统计")
+def get_overview_statistics(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取系统整体统计数据
+    - 项目总数、论文总数、成果总数
+    - 经费总额
+    """
+    return coalesced_section("overview", db)
+
+
+@router.get("/projects", summary="项目统计")
+def get_project_statistics(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    项目统计分析
+    - 按状态统计
+    - 按年份统计
+    """
+    return coalesced_section("projects", db)
+
+
+@router.get("/papers", summary="论文统计")
+def get_paper_statistics(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    论文统计分析
+    - 按年份统计
+    - 按JCR分区统计
+    - 按中科院分区统计
+    """
+    return coalesced_section("papers", db)
+
+
 @router.get("/funds", summary="经费统计")
 def get_fund_statistics(
     current_user: models.User = Depends(get_current_user),
@@ -104,8 +197,81 @@ def get_fund_statistics(
     - 总支出
     - 按类型统计
     """
-    stats = crud_fund.get_fund_statistics(db)
-    return stats
+    return coalesced_section("funds", db)
+
+
+@router.get("/fund-burn", summary="经费执行进度与耗尽预测")
+def get_fund_burn(
+    at_risk_only: bool = Query(True, description="只返回预计在结束日期前耗尽经费的项目"),
+    as_of: Optional[date] = Query(None, description="截止日期，默认今天"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    在研项目经费执行进度
+    - 近期月均支出、累计支出与线性计划对比、预计耗尽日期
+    - 项目明细按预计耗尽日期排序，含最近 12 个月的月度与累计支出序列
+    - 经费或项目数据未变化时直接返回缓存结果
+    """
+    report = get_burn_rate_report(as_of)
+    total, items = report.query(at_risk_only=at_risk_only, skip=skip, limit=limit)
+    return {
+        "as_of": report.as_of,
+        "months": report.months,
+        "summary": report.summary,
+        "total": total,
+        "items": items,
+    }
+
+
+CUBE_FACT_PATTERN = "^(projects|papers|funds)$"
+
+
+def _parse_where(where: List[str]) -> dict:
+    """筛选条件 维度:取值 -> {维度: [取值, ...]}"""
+    filters = {}
+    for condition in where:
+        dim, sep, value = condition.partition(":")
+        if not sep or not dim:
+            raise HTTPException(status_code=400, detail=f"筛选条件格式应为 维度:取值，收到 {condition}")
+        filters.setdefault(dim.strip(), []).append(value.strip())
+    return filters
+
+
+@router.get("/cube", summary="多维下钻统计")
+def query_cube(
+    fact: str = Query(..., pattern=CUBE_FACT_PATTERN, description="事实表：projects / papers / funds"),
+    group_by: Optional[str] = Query(None, description="分组维度，逗号分隔，如 college,year"),
+    where: List[str] = Query([], description="筛选条件 维度:取值，可重复；同一维度多个取值为或，不同维度为且"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    任意维度组合的分组与筛选
+    - projects：college / year / project_type / status，度量 count、budget_total
+    - papers：college / year / jcr_zone / cas_zone，度量 count、impact_factor
+    - funds：college / year / month / expense_type，度量 count、amount
+    - 空维度取值为"未知"；其他进程的写入最多延迟约 30 秒可见
+    """
+    dims = [dim.strip() for dim in (group_by or "").split(",") if dim.strip()]
+    try:
+        return cube.query(fact, dims, _parse_where(where))
+    except CubeNotReady:
+        raise HTTPException(status_code=503, detail="统计数据加载中，请稍后重试")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cube/meta", summary="多维统计的维度取值")
+def get_cube_meta(
+    fact: str = Query(..., pattern=CUBE_FACT_PATTERN),
+    current_user: models.User = Depends(get_current_user)
+):
+    """事实表的维度、各维度全部取值和度量（供前端生成下钻选项）"""
+    try:
+        return cube.describe(fact)
+    except CubeNotReady:
+        raise HTTPException(status_code=503, detail="统计数据加载中，请稍后重试")
 
 
 @router.get("/achievements", summary="成果统计")
@@ -118,22 +284,64 @@ def get_achievement_statistics(
     - 总数
     - 按类型统计
     """
-    stats = crud_achievement.get_achievement_statistics(db)
-    return stats
+    return coalesced_section("achievements", db)
 
 
 @router.get("/dashboard", summary="仪表盘数据")
 def get_dashboard_data(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user)
 ):
     """
     获取仪表盘所需的综合统计数据
+    - 各分区并行计算，总耗时接近最慢的单个分区
+    - 分区超时从开始计算时算起；在队列中等待超过 SECTION_QUEUE_TIMEOUT_SECONDS 仍未开始的分区被取消
+    - 超时、取消或失败的分区返回 null，并在 unavailable 中说明原因，其余分区正常返回
     """
-    return {
-        "overview": get_overview_statistics(current_user, db),
-        "projects": get_project_statistics(current_user, db),
-        "papers": get_paper_statistics(current_user, db),
-        "funds": get_fund_statistics(current_user, db),
-        "achievements": get_achievement_statistics(current_user, db),
+    # 每个任务复制一份上下文，使分区内的 SQL 统计和日志仍归属于本请求
+    started = {}
+    submitted = time.monotonic()
+    futures = {
+        section: _dashboard_executor.submit(contextvars.copy_context().run, _run_section, section, started)
+        for section in SECTION_COMPUTERS
     }
+    
+    while True:
+        now = time.monotonic()
+        deadlines = []
+        for section, future in futures.items():
+            if future.done():
+                continue
+            if section in started:
+                deadlines.append(started[section] + SECTION_TIMEOUT_SECONDS)
+            elif now >= submitted + SECTION_QUEUE_TIMEOUT_SECONDS:
+                future.cancel()
+            else:
+                deadlines.append(submitted + SECTION_QUEUE_TIMEOUT_SECONDS)
+        deadlines = [deadline for deadline in deadlines if deadline > now]
+        if not deadlines:
+            break
+        pending = [future for future in futures.values() if not future.done()]
+        wait(pending, timeout=min(deadlines) - now, return_when=FIRST_COMPLETED)
+    
+    result = {}
+    unavailable = {}
+    for section, future in futures.items():
+        # 等待结束时仍未开始的分区取消，不再占用线程池
+        if future.cancel() or future.cancelled():
+            result[section] = None
+            unavailable[section] = "timeout"
+            logger.warning("Dashboard section %s not started within %ss", section, SECTION_QUEUE_TIMEOUT_SECONDS)
+        elif not future.done():
+            # 超时的计算继续在后台完成（结果会被同时进行的相同请求共享，查询受 max_execution_time 限制），本次不再等待
+            result[section] = None
+            unavailable[section] = "timeout"
+            logger.warning("Dashboard section %s timed out after %ss", section, SECTION_TIMEOUT_SECONDS)
+        elif future.exception() is not None:
+            result[section] = None
+            unavailable[section] = "error"
+            logger.error("Dashboard section %s failed: %s", section, future.exception())
+        else:
+            result[section] = future.result()
+    
+    result["unavailable"] = unavailable
+    return result
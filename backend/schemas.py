@@ -215,6 +215,22 @@ class AchievementResponse(AchievementBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ==================== 附件相关 ====================
+
+class AttachmentResponse(BaseModel):
+    id: int
+    owner_type: str
+    owner_id: int
+    filename: str
+    content_type: Optional[str] = None
+    size: int
+    sha256: str
+    uploader_id: Optional[int] = None
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 # ==================== 统计相关 ====================
 
 class ProjectStatistics(BaseModel):
@@ -0,0 +1,125 @@
+"""
+生产环境启动脚本
+- 工作进程数默认按 CPU 核数计算（上限 MAX_WORKERS，避免数据库连接数超限）
+- Linux/macOS 安装了 gunicorn 时：主进程预加载应用后 fork 工作进程，启动快且共享只读内存
+- Windows 或未安装 gunicorn 时：退回 uvicorn 多进程模式（各工作进程独立加载应用）
+- 工作进程处理 MAX_REQUESTS 个请求（加随机抖动）后自动重启，限制内存增长
+- 收到 SIGTERM/SIGINT 后停止接收新连接，等待进行中的请求（含流式导出）完成，
+  再执行应用的 shutdown 事件（停止定时任务、写出指标和日志队列）
+- 启动前请先执行 python migrate.py，应用启动时不再建表
+用法：python serve.py [工作进程数]
+"""
+import os
+import sys
+import time
+
+# 服务配置
+HOST = "0.0.0.0"
+PORT = 8000
+MAX_WORKERS = 8  # 每个工作进程最多占用 15 个数据库连接（连接池 5 + 溢出 10）
+MAX_REQUESTS = 10000  # 工作进程处理该数量请求后重启
+MAX_REQUESTS_JITTER = 1000  # 重启阈值随机抖动，避免所有工作进程同时重启
+GRACEFUL_TIMEOUT = 30  # 优雅退出时等待进行中请求的最长秒数
+KEEPALIVE_TIMEOUT = 5  # HTTP keep-alive 超时
+
+_launch_started = time.perf_counter()
+
+
+def default_workers() -> int:
+    """按 CPU 核数计算工作进程数"""
+    return max(2, min((os.cpu_count() or 1) + 1, MAX_WORKERS))
+
+
+def load_app():
+    """加载应用并报告冷启动耗时"""
+    started = time.perf_counter()
+    from main import app
+    from utils.audit_dict import AuditDict
+
+    # 首个登录/鉴权请求才会用到的模块在主进程提前导入，工作进程 fork 后直接共享
+    import bcrypt  # noqa: F401
+    from jose import jwt  # noqa: F401
+
+    # 预热审计字典缓存：预加载模式下由主进程加载一次，工作进程 fork 后直接共享
+    try:
+        AuditDict.sync()
+    except Exception as e:
+        print(f"  ✗ 审计字典预热失败（不影响启动）: {e}")
+
+    print(f"  ✓ 应用加载耗时 {(time.perf_counter() - started) * 1000:.0f}ms"
+          f"（自启动 {(time.perf_counter() - _launch_started) * 1000:.0f}ms）")
+    return app
+
+
+def post_fork(server, worker):
+    """工作进程 fork 后：丢弃从主进程继承的数据库连接，重建日志后台线程"""
+    from database import engine
+    from utils.logger import reinit_after_fork
+
+    engine.dispose(close=False)
+    reinit_after_fork()
+
+
+def run_gunicorn(workers: int):
+    """gunicorn 预加载 + fork 模式"""
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{HOST}:{PORT}",
+                "workers": workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "keepalive": KEEPALIVE_TIMEOUT,
+                "post_fork": post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    Application().run()
+
+
+def run_uvicorn(workers: int):
+    """uvicorn 多进程模式"""
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        limit_max_requests=MAX_REQUESTS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE_TIMEOUT,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else default_workers()
+
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = os.name == "posix"
+    except ImportError:
+        use_gunicorn = False
+
+    print("=" * 60)
+    print("  科研管理系统 - 后端服务（生产模式）")
+    print("=" * 60)
+    print(f"  服务地址: http://{HOST}:{PORT}")
+    print(f"  工作进程: {workers}（{'gunicorn 预加载' if use_gunicorn else 'uvicorn 多进程'}）")
+    print(f"  请求 {MAX_REQUESTS} 次后重启工作进程，优雅退出等待 {GRACEFUL_TIMEOUT}s")
+    print()
+
+    if use_gunicorn:
+        run_gunicorn(workers)
+    else:
+        run_uvicorn(workers)
@@ -0,0 +1,107 @@
+"""
+应用启动耗时测试
+使用 python -X importtime 在子进程中导入 main，检查：
+- 导入总耗时不超过 STARTUP_BUDGET_MS
+- 仅在导出/登录/统计计算时才用到的重量级模块（openpyxl、jose、numpy）未在启动时导入
+  （bcrypt 不检查：PyMySQL 的认证模块导入 cryptography，后者在启动时即加载 bcrypt）
+用法：python test_startup_time.py（超出预算时退出码为 1，可接入 CI）
+"""
+import os
+import sys
+import subprocess
+from typing import Dict, List, Tuple
+
+STARTUP_BUDGET_MS = 1500  # 导入 main 的耗时预算（毫秒）
+LAZY_MODULES = ("openpyxl", "jose", "numpy")  # 启动时不应导入的模块
+TOP_N = 15  # 输出耗时最多的顶层模块数
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import() -> Dict[str, int]:
+    """
+    在全新子进程中导入 main
+
+    Returns:
+        dict: 模块名 -> 累计导入耗时（微秒）
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 main 失败:\n{result.stderr[-2000:]}")
+
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # 格式：import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def top_level(cumulative: Dict[str, int]) -> List[Tuple[str, int]]:
+    """顶层模块（不含子模块）按耗时倒序"""
+    return sorted(
+        ((name, us) for name, us in cumulative.items() if "." not in name),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+def test_startup_budget():
+    """导入 main 的耗时不超过预算"""
+    cumulative = measure_import()
+    total_ms = cumulative["main"] / 1000
+    assert total_ms <= STARTUP_BUDGET_MS, f"导入 main 耗时 {total_ms:.0f}ms，超出预算 {STARTUP_BUDGET_MS}ms"
+
+
+def test_heavy_modules_are_lazy():
+    """重量级模块未在启动时导入"""
+    cumulative = measure_import()
+    loaded = [name for name in LAZY_MODULES if name in cumulative]
+    assert not loaded, f"启动时导入了应延迟加载的模块: {', '.join(loaded)}"
+
+
+def main():
+    print("=" * 60)
+    print("  应用启动耗时测试")
+    print("=" * 60)
+    print()
+
+    try:
+        cumulative = measure_import()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    total_ms = cumulative["main"] / 1000
+    print(f"导入 main 总耗时: {total_ms:.0f}ms（预算 {STARTUP_BUDGET_MS}ms）\n")
+    print(f"耗时最多的 {TOP_N} 个顶层模块：")
+    for name, us in top_level(cumulative)[:TOP_N]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+    print()
+
+    failed = False
+    if total_ms > STARTUP_BUDGET_MS:
+        print(f"  ❌ 超出启动预算 {total_ms - STARTUP_BUDGET_MS:.0f}ms")
+        failed = True
+    else:
+        print("  ✅ 启动耗时在预算内")
+
+    loaded = [name for name in LAZY_MODULES if name in cumulative]
+    if loaded:
+        print(f"  ❌ 启动时导入了应延迟加载的模块: {', '.join(loaded)}")
+        failed = True
+    else:
+        print(f"  ✅ {', '.join(LAZY_MODULES)} 未在启动时导入")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+审计日志哈希链升级脚本
+- operation_logs 增加 prev_hash / row_hash 列
+- 创建链头表 audit_chain_head 与检查点表 audit_checkpoints
+- 历史日志不补算哈希（无法证明其未被篡改），哈希链从升级后的第一条日志开始
+"""
+from database import engine
+from sqlalchemy import text
+from models import AuditChainHead, AuditCheckpoint
+from utils.audit_chain import GENESIS_HASH
+
+
+def add_hash_columns():
+    """添加哈希列"""
+    print("正在升级 operation_logs 表...")
+
+    sqls = [
+        "ALTER TABLE operation_logs ADD COLUMN prev_hash CHAR(64) NULL COMMENT '前一条日志哈希' AFTER duration",
+        "ALTER TABLE operation_logs ADD COLUMN row_hash CHAR(64) NULL COMMENT '本条日志哈希' AFTER prev_hash",
+    ]
+
+    for sql in sqls:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(sql))
+            print(f"  ✓ {sql[:60]}...")
+        except Exception as e:
+            # 如果字段已存在则跳过
+            if "Duplicate column name" in str(e):
+                print(f"  - 字段已存在，跳过")
+            else:
+                raise
+
+
+def create_chain_tables():
+    """创建链头表和检查点表，初始化链头"""
+    print("\n正在创建哈希链表...")
+    AuditChainHead.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ audit_chain_head")
+    AuditCheckpoint.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ audit_checkpoints")
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT IGNORE INTO audit_chain_head (id, last_log_id, last_hash) VALUES (1, NULL, :genesis)"
+        ), {"genesis": GENESIS_HASH})
+    print("  ✓ 链头已初始化")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 审计日志哈希链升级")
+    print("=" * 60)
+    print()
+
+    try:
+        add_hash_columns()
+        create_chain_tables()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
@@ -0,0 +1,144 @@
+"""
+审计日志字典编码升级脚本
+- 创建 audit_dictionary 字典表
+- operation_logs 增加 *_id 字典列并回填历史日志
+- 回填校验通过后删除原字符串列，缩小行宽
+- 请求路径含资源ID，不做字典编码，保留原 path 列
+"""
+from database import engine, MYSQL_DATABASE
+from sqlalchemy import text
+from models import AuditDictionary
+
+BACKFILL_BATCH = 20000  # 每批回填的 ID 跨度
+
+# 需要编码的字段：字典类型 -> operation_logs 中的原始列
+ENCODED_COLUMNS = {
+    "username": "username",
+    "operation": "operation",
+    "module": "module",
+    "method": "method",
+    "user_agent": "user_agent",
+}
+
+# 需要建索引的字典列（用于筛选）
+INDEXED_KINDS = ("username", "operation", "module")
+
+
+def column_exists(column: str) -> bool:
+    """检查 operation_logs 中是否存在指定列"""
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = 'operation_logs' AND COLUMN_NAME = :column"
+        ), {"schema": MYSQL_DATABASE, "column": column}).scalar() > 0
+
+
+def create_dictionary_table():
+    """创建字典表"""
+    print("正在创建 audit_dictionary 表...")
+    AuditDictionary.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ audit_dictionary")
+
+
+def add_id_columns():
+    """添加字典ID列和索引"""
+    print("\n正在升级 operation_logs 表...")
+
+    sqls = []
+    for kind in ENCODED_COLUMNS:
+        sqls.append(f"ALTER TABLE operation_logs ADD COLUMN {kind}_id INT NULL")
+        if kind in INDEXED_KINDS:
+            sqls.append(f"CREATE INDEX ix_operation_logs_{kind}_id ON operation_logs({kind}_id)")
+
+    for sql in sqls:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(sql))
+            print(f"  ✓ {sql[:60]}...")
+        except Exception as e:
+            # 如果字段或索引已存在则跳过
+            if "Duplicate column name" in str(e) or "Duplicate key name" in str(e):
+                print(f"  - 字段/索引已存在，跳过")
+            else:
+                raise
+
+
+def backfill_ids():
+    """写入字典项并回填历史日志的字典ID（按 ID 分批，避免长事务）"""
+    print("\n正在回填字典ID...")
+
+    with engine.connect() as conn:
+        min_id, max_id = conn.execute(text("SELECT MIN(id), MAX(id) FROM operation_logs")).fetchone()
+
+    if min_id is None:
+        print("  - 无历史日志")
+        return
+
+    for kind, column in ENCODED_COLUMNS.items():
+        if not column_exists(column):
+            print(f"  - {column} 列已删除，跳过")
+            continue
+
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT IGNORE INTO audit_dictionary (kind, value) "
+                f"SELECT DISTINCT '{kind}', {column} COLLATE utf8mb4_bin FROM operation_logs WHERE {column} IS NOT NULL"
+            ))
+
+        updated = 0
+        for start in range(min_id, max_id + 1, BACKFILL_BATCH):
+            with engine.begin() as conn:
+                result = conn.execute(text(
+                    f"UPDATE operation_logs l JOIN audit_dictionary d "
+                    f"ON d.kind = '{kind}' AND d.value = l.{column} COLLATE utf8mb4_bin "
+                    f"SET l.{kind}_id = d.id "
+                    f"WHERE l.id >= :start AND l.id < :end AND l.{kind}_id IS NULL"
+                ), {"start": start, "end": start + BACKFILL_BATCH})
+                updated += result.rowcount
+        print(f"  ✓ {kind}: 已回填 {updated} 条")
+
+
+def drop_string_columns():
+    """校验回填完整后删除原字符串列"""
+    print("\n正在删除原字符串列...")
+
+    columns = [column for column in ENCODED_COLUMNS.values() if column_exists(column)]
+    if not columns:
+        print("  - 已删除，跳过")
+        return
+
+    with engine.connect() as conn:
+        for kind, column in ENCODED_COLUMNS.items():
+            if column not in columns:
+                continue
+            missing = conn.execute(text(
+                f"SELECT COUNT(*) FROM operation_logs WHERE {column} IS NOT NULL AND {kind}_id IS NULL"
+            )).scalar()
+            if missing:
+                raise RuntimeError(f"{column} 仍有 {missing} 条未回填，已中止删除")
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE operation_logs " + ", ".join(f"DROP COLUMN {column}" for column in columns)
+        ))
+    print(f"  ✓ 已删除 {', '.join(columns)}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 审计日志字典编码升级")
+    print("=" * 60)
+    print()
+
+    try:
+        create_dictionary_table()
+        add_id_columns()
+        backfill_ids()
+        drop_string_columns()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
@@ -0,0 +1,70 @@
+"""
+审计日志分区升级脚本（等保二级改造）
+将 operation_logs 改造为按月 RANGE 分区表
+- 分区表要求分区键包含在主键中：主键改为 (id, created_at)
+- 分区表不支持外键：移除 user_id 外键约束
+"""
+from datetime import datetime
+from database import engine, MYSQL_DATABASE
+from sqlalchemy import text
+from utils.audit_archive import (
+    FUTURE_PARTITIONS, add_months, month_start, partition_clause, list_partition_months
+)
+
+
+def drop_foreign_keys(conn):
+    """移除 operation_logs 上的外键约束"""
+    rows = conn.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = 'operation_logs' "
+        "AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+    ), {"schema": MYSQL_DATABASE}).fetchall()
+
+    for (name,) in rows:
+        conn.execute(text(f"ALTER TABLE operation_logs DROP FOREIGN KEY {name}"))
+        print(f"  ✓ 已移除外键 {name}")
+
+
+def partition_operation_logs():
+    """按月分区 operation_logs"""
+    print("正在升级 operation_logs 表为按月分区...")
+
+    with engine.begin() as conn:
+        if list_partition_months(conn):
+            print("  - 已分区，跳过")
+            return
+
+        drop_foreign_keys(conn)
+
+        conn.execute(text(
+            "ALTER TABLE operation_logs "
+            "MODIFY COLUMN created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '操作时间', "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+        ))
+        print("  ✓ 主键已改为 (id, created_at)")
+
+        earliest = conn.execute(text("SELECT MIN(created_at) FROM operation_logs")).scalar()
+        now = datetime.now()
+        first_month = month_start(earliest or now)
+        last_month = add_months(month_start(now), FUTURE_PARTITIONS)
+
+        conn.execute(text("ALTER TABLE operation_logs " + partition_clause(first_month, last_month)))
+        print(f"  ✓ 已创建分区 {first_month:%Y-%m} ~ {last_month:%Y-%m}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 审计日志分区升级")
+    print("=" * 60)
+    print()
+
+    try:
+        partition_operation_logs()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 分区升级完成！")
+        print("  定期执行 python archive_audit_logs.py 归档过期分区")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
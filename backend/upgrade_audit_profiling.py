@@ -0,0 +1,47 @@
+"""
+审计日志请求剖析升级脚本
+- operation_logs 增加 sql_count / sql_ms 列，记录请求内 SQL 语句数和耗时
+- operation_logs 增加 request_id 列，与应用日志关联
+"""
+from database import engine
+from sqlalchemy import text
+
+
+def add_profiling_columns():
+    """添加 SQL 统计列和请求ID列"""
+    print("正在升级 operation_logs 表...")
+
+    sqls = [
+        "ALTER TABLE operation_logs ADD COLUMN sql_count INT NULL COMMENT '请求内SQL语句数' AFTER duration",
+        "ALTER TABLE operation_logs ADD COLUMN sql_ms INT NULL COMMENT '请求内SQL总耗时(毫秒)' AFTER sql_count",
+        "ALTER TABLE operation_logs ADD COLUMN request_id VARCHAR(64) NULL COMMENT '请求ID' AFTER sql_ms",
+    ]
+
+    for sql in sqls:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(sql))
+            print(f"  ✓ {sql[:60]}...")
+        except Exception as e:
+            # 如果字段已存在则跳过
+            if "Duplicate column name" in str(e):
+                print(f"  - 字段已存在，跳过")
+            else:
+                raise
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 审计日志请求剖析升级")
+    print("=" * 60)
+    print()
+
+    try:
+        add_profiling_columns()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
@@ -0,0 +1,76 @@
+"""
+审计日志资源索引升级脚本
+- operation_logs 增加 resource_type / resource_id 列及联合索引
+- 从 details JSON 中回填历史记录的资源类型和资源ID
+"""
+from database import engine
+from sqlalchemy import text
+
+BACKFILL_BATCH = 20000  # 每批回填的 ID 跨度
+
+
+def add_resource_columns():
+    """添加资源列和索引"""
+    print("正在升级 operation_logs 表...")
+
+    sqls = [
+        "ALTER TABLE operation_logs ADD COLUMN resource_type VARCHAR(50) NULL COMMENT '资源类型' AFTER details",
+        "ALTER TABLE operation_logs ADD COLUMN resource_id VARCHAR(50) NULL COMMENT '资源ID' AFTER resource_type",
+        "CREATE INDEX ix_operation_logs_resource ON operation_logs(resource_type, resource_id, id)",
+    ]
+
+    for sql in sqls:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(sql))
+            print(f"  ✓ {sql[:60]}...")
+        except Exception as e:
+            # 如果字段或索引已存在则跳过
+            if "Duplicate column name" in str(e) or "Duplicate key name" in str(e):
+                print(f"  - 字段/索引已存在，跳过")
+            else:
+                raise
+
+
+def backfill_resource_columns():
+    """从 details 中回填资源列（按 ID 分批，避免长事务）"""
+    print("\n正在回填历史日志的资源信息...")
+
+    with engine.connect() as conn:
+        min_id, max_id = conn.execute(text("SELECT MIN(id), MAX(id) FROM operation_logs")).fetchone()
+
+    if min_id is None:
+        print("  - 无历史日志")
+        return
+
+    updated = 0
+    for start in range(min_id, max_id + 1, BACKFILL_BATCH):
+        with engine.begin() as conn:
+            result = conn.execute(text(
+                "UPDATE operation_logs SET "
+                "resource_type = JSON_UNQUOTE(JSON_EXTRACT(details, '$.resource_type')), "
+                "resource_id = JSON_UNQUOTE(JSON_EXTRACT(details, '$.resource_id')) "
+                "WHERE id >= :start AND id < :end AND resource_type IS NULL "
+                "AND JSON_VALID(details) AND JSON_EXTRACT(details, '$.resource_id') IS NOT NULL"
+            ), {"start": start, "end": start + BACKFILL_BATCH})
+            updated += result.rowcount
+
+    print(f"  ✓ 已回填 {updated} 条")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 审计日志资源索引升级")
+    print("=" * 60)
+    print()
+
+    try:
+        add_resource_columns()
+        backfill_resource_columns()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
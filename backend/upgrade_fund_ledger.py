@@ -0,0 +1,54 @@
+"""
+项目经费台账升级脚本
+- 创建 project_fund_ledgers / project_fund_ledger_types 表
+- funds 增加 (project_id, expense_date) 联合索引（扣除最近一笔支出时重新取最大日期）
+- 按 funds 回填台账（与定时对账任务相同，可重复执行，只重建有偏差的项目）
+"""
+from sqlalchemy import text
+from database import engine
+import models
+from utils.fund_ledger import reconcile_fund_ledgers
+
+
+def create_ledger_tables():
+    """创建经费台账表和经费索引"""
+    print("正在创建经费台账表...")
+    models.ProjectFundLedger.__table__.create(bind=engine, checkfirst=True)
+    models.ProjectFundLedgerType.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ project_fund_ledgers、project_fund_ledger_types 表已就绪")
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_funds_project_date ON funds(project_id, expense_date)"))
+        print("  ✓ 已创建索引 ix_funds_project_date")
+    except Exception as e:
+        # 索引已存在则跳过
+        if "Duplicate key name" in str(e):
+            print("  - 索引已存在，跳过")
+        else:
+            raise
+
+
+def backfill_fund_ledgers():
+    """按 funds 回填经费台账"""
+    print("\n正在回填经费台账...")
+    rebuilt = reconcile_fund_ledgers()
+    print(f"  ✓ 已重建 {rebuilt} 个项目的台账")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 经费台账升级")
+    print("=" * 60)
+    print()
+
+    try:
+        create_ledger_tables()
+        backfill_fund_ledgers()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
@@ -0,0 +1,41 @@
+"""
+经费月末快照升级脚本
+- 创建 fund_snapshot_periods / fund_month_snapshots 表
+- 从最早的经费月份起逐月生成快照到上月（与定时任务相同，可重复执行，已完成的月份跳过）
+"""
+from database import engine
+import models
+from utils.fund_snapshots import build_month_snapshots
+
+
+def create_snapshot_tables():
+    """创建经费月末快照表"""
+    print("正在创建经费月末快照表...")
+    models.FundSnapshotPeriod.__table__.create(bind=engine, checkfirst=True)
+    models.FundMonthSnapshot.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ fund_snapshot_periods、fund_month_snapshots 表已就绪")
+
+
+def backfill_fund_snapshots():
+    """生成历史月份的快照"""
+    print("\n正在生成经费月末快照...")
+    built = build_month_snapshots()
+    print(f"  ✓ 已生成 {built} 个月的快照")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 经费月末快照升级")
+    print("=" * 60)
+    print()
+
+    try:
+        create_snapshot_tables()
+        backfill_fund_snapshots()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
@@ -0,0 +1,76 @@
+"""
+论文作者表升级脚本
+- 创建 paper_authors 表（每位作者一行，按 user_id、paper_id 和姓名建索引）
+- 解析 papers.authors 回填作者行；只处理尚无作者行的论文，可重复执行
+- 作者姓名在用户表中唯一时关联用户ID，重名或校外作者只记录姓名
+"""
+from database import engine, SessionLocal
+import models
+from crud.paper import sync_paper_authors
+from crud.user import load_unique_name_ids
+
+BACKFILL_BATCH = 2000  # 每批回填的论文数
+
+
+def create_authors_table():
+    """创建论文作者表"""
+    print("正在创建 paper_authors 表...")
+    models.PaperAuthor.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ paper_authors 表已就绪")
+
+
+def backfill_paper_authors():
+    """为尚无作者行的论文回填作者（按 ID 分批，每批一个事务）"""
+    print("\n正在回填论文作者...")
+
+    db = SessionLocal()
+    try:
+        unique_ids = load_unique_name_ids(db)
+        last_id = 0
+        filled = 0
+        linked = 0
+        while True:
+            papers = (
+                db.query(models.Paper)
+                .filter(
+                    models.Paper.id > last_id,
+                    ~models.Paper.author_rows.any()
+                )
+                .order_by(models.Paper.id)
+                .limit(BACKFILL_BATCH)
+                .all()
+            )
+            if not papers:
+                break
+
+            for paper in papers:
+                sync_paper_authors(db, paper, user_ids=unique_ids)
+                linked += sum(1 for row in paper.author_rows if row.user_id is not None)
+            db.commit()
+
+            last_id = papers[-1].id
+            filled += len(papers)
+            db.expunge_all()
+            print(f"\r  已回填 {filled} 篇论文", end="", flush=True)
+
+        print(f"\r  ✓ 已回填 {filled} 篇论文，{linked} 个作者关联到用户")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 论文作者表升级")
+    print("=" * 60)
+    print()
+
+    try:
+        create_authors_table()
+        backfill_paper_authors()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
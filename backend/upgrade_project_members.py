@@ -0,0 +1,76 @@
+"""
+项目成员表升级脚本
+- 创建 project_members 表（负责人与成员各一行，按 user_id、project_id 建索引）
+- 从 projects.members（JSON）回填成员行；只处理尚无成员行的项目，可重复执行
+- members 中的姓名在用户表中唯一时关联用户ID，重名或校外成员只记录姓名
+"""
+from database import engine, SessionLocal
+import models
+from crud.project import parse_members, sync_project_members
+from crud.user import load_unique_name_ids
+
+BACKFILL_BATCH = 1000  # 每批回填的项目数
+
+
+def create_members_table():
+    """创建项目成员表"""
+    print("正在创建 project_members 表...")
+    models.ProjectMember.__table__.create(bind=engine, checkfirst=True)
+    print("  ✓ project_members 表已就绪")
+
+
+def backfill_project_members():
+    """为尚无成员行的项目回填成员（按 ID 分批，每批一个事务）"""
+    print("\n正在回填项目成员...")
+
+    db = SessionLocal()
+    try:
+        unique_ids = load_unique_name_ids(db)
+        last_id = 0
+        filled = 0
+        linked = 0
+        while True:
+            projects = (
+                db.query(models.Project)
+                .filter(
+                    models.Project.id > last_id,
+                    ~models.Project.member_rows.any()
+                )
+                .order_by(models.Project.id)
+                .limit(BACKFILL_BATCH)
+                .all()
+            )
+            if not projects:
+                break
+
+            for project in projects:
+                sync_project_members(db, project, user_ids=unique_ids)
+                linked += sum(1 for name in parse_members(project.members) if name in unique_ids)
+            db.commit()
+
+            last_id = projects[-1].id
+            filled += len(projects)
+            db.expunge_all()
+            print(f"\r  已回填 {filled} 个项目", end="", flush=True)
+
+        print(f"\r  ✓ 已回填 {filled} 个项目，{linked} 个成员关联到用户")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("  科研管理系统 - 项目成员表升级")
+    print("=" * 60)
+    print()
+
+    try:
+        create_members_table()
+        backfill_project_members()
+
+        print("\n" + "=" * 60)
+        print("  ✅ 升级完成！")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ 升级失败: {e}")
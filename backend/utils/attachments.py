@@ -0,0 +1,312 @@
+"""
+附件存储（按内容寻址）
+- 文件按内容 SHA-256 存放于 STORAGE_DIR/<前2位>/<3-4位>/<sha256>，相同内容只存一份
+- 上传按块写入临时文件并同时计算哈希，不在内存中缓冲整个文件
+- attachment_blobs 记录每份内容的引用次数，随附件增删在同一事务内增减，并显式更新 updated_at（原生 SQL 不触发 ORM onupdate）
+- 放置文件和清理文件都在持有内容行锁时进行，上传与清理任务并发时不会删掉刚被引用的文件
+- 引用次数归零超过 GC_GRACE_SECONDS 的文件由定时任务删除（collect_garbage）
+- 文件在提交前放置，提交失败时文件没有内容行；清理任务同时删除没有内容行的文件
+- 下载支持 ETag / If-None-Match 和单段 Range；服务器支持 ASGI zerocopysend 扩展时直接发送文件（零拷贝）
+"""
+import os
+import time
+import uuid
+import hashlib
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from database import engine
+from utils.logger import get_logger
+
+logger = get_logger("attachments")
+
+# 附件配置
+STORAGE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage")
+STORAGE_DIR = os.path.join(STORAGE_ROOT, "attachments")
+TMP_DIR = os.path.join(STORAGE_ROOT, "tmp")
+MAX_ATTACHMENT_BYTES = 100 * 1024 * 1024  # 单个附件大小上限
+DOWNLOAD_CHUNK_BYTES = 256 * 1024  # 不支持零拷贝时每次读取的大小
+GC_GRACE_SECONDS = 3600  # 引用次数归零后保留的时间（期间再次上传相同内容可直接复用）
+GC_BATCH = 500  # 每个清理事务处理的内容数
+SHA256_HEX_LENGTH = 64  # 内容文件名长度（用于识别存储目录中的内容文件）
+
+
+class AttachmentTooLarge(Exception):
+    """上传内容超过大小上限"""
+
+
+def blob_path(sha256: str) -> str:
+    """内容在磁盘上的路径"""
+    return os.path.join(STORAGE_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+# ==================== 上传 ====================
+
+async def receive_to_temp(chunks: AsyncIterator[bytes], max_bytes: int = MAX_ATTACHMENT_BYTES) -> Tuple[str, str, int]:
+    """
+    将上传内容逐块写入临时文件并计算哈希，返回 (临时文件路径, sha256, 字节数)
+    写盘和哈希在线程池中执行，不阻塞事件循环；出错或超限时删除临时文件
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    path = os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(f, chunk: bytes):
+        digest.update(chunk)
+        f.write(chunk)
+
+    f = open(path, "wb")
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise AttachmentTooLarge(f"附件超过 {max_bytes // (1024 * 1024)}MB 上限")
+            await run_in_threadpool(write, f, chunk)
+        await run_in_threadpool(os.fsync, f.fileno())
+    except BaseException:
+        f.close()
+        discard_temp(path)
+        raise
+    f.close()
+    return path, digest.hexdigest(), size
+
+
+def discard_temp(path: str):
+    """删除临时文件（不存在时忽略）"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def store_blob(db: Session, temp_path: str, sha256: str, size: int):
+    """
+    在调用方事务内引用一份内容（不提交）
+    先写内容行（取得行锁）再放置文件：内容已存在时删除临时文件，否则原子移动到内容地址
+    """
+    db.execute(text(
+        "INSERT INTO attachment_blobs (sha256, size, ref_count, updated_at) VALUES (:sha256, :size, 1, NOW()) "
+        "ON DUPLICATE KEY UPDATE ref_count = ref_count + 1, updated_at = NOW()"
+    ), {"sha256": sha256, "size": size})
+
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        discard_temp(temp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+
+def release_blob(db: Session, sha256: str):
+    """在调用方事务内释放一次引用（不提交，文件由清理任务删除）"""
+    db.execute(text(
+        "UPDATE attachment_blobs SET ref_count = ref_count - 1, updated_at = NOW() "
+        "WHERE sha256 = :sha256 AND ref_count > 0"
+    ), {"sha256": sha256})
+
+
+# ==================== 清理 ====================
+
+def collect_garbage() -> int:
+    """删除引用次数归零超过保留时间的内容、没有内容行的文件及残留的临时文件（定时任务），返回删除的内容数"""
+    cutoff = datetime.now() - timedelta(seconds=GC_GRACE_SECONDS)
+    removed = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT sha256 FROM attachment_blobs WHERE ref_count = 0 AND updated_at < :cutoff "
+                "LIMIT :limit FOR UPDATE"
+            ), {"cutoff": cutoff, "limit": GC_BATCH}).fetchall()
+            if not rows:
+                break
+            # 持有行锁时删除文件：并发上传相同内容会等待本事务结束，再重新放置文件
+            for (sha256,) in rows:
+                try:
+                    os.remove(blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+            conn.execute(
+                text("DELETE FROM attachment_blobs WHERE sha256 = :sha256 AND ref_count = 0"),
+                [{"sha256": sha256} for (sha256,) in rows]
+            )
+        removed += len(rows)
+        if len(rows) < GC_BATCH:
+            break
+
+    _sweep_orphans()
+
+    # 进程异常退出时残留的上传临时文件
+    if os.path.isdir(TMP_DIR):
+        expire = time.time() - GC_GRACE_SECONDS
+        for filename in os.listdir(TMP_DIR):
+            path = os.path.join(TMP_DIR, filename)
+            try:
+                if os.path.getmtime(path) < expire:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    if removed:
+        logger.info("Removed %d unreferenced attachment blobs", removed)
+    return removed
+
+
+def _sweep_orphans() -> int:
+    """
+    删除没有内容行的文件（放置文件后事务提交失败时残留），返回删除的文件数
+    只处理超过保留时间的文件；加锁读取内容行，正在上传相同内容的事务提交后才判断
+    """
+    if not os.path.isdir(STORAGE_DIR):
+        return 0
+
+    expire = time.time() - GC_GRACE_SECONDS
+    candidates = []
+    for directory, _, filenames in os.walk(STORAGE_DIR):
+        for filename in filenames:
+            if len(filename) != SHA256_HEX_LENGTH:
+                continue
+            try:
+                if os.path.getmtime(os.path.join(directory, filename)) < expire:
+                    candidates.append(filename)
+            except OSError:
+                continue
+
+    removed = 0
+    for offset in range(0, len(candidates), GC_BATCH):
+        batch = candidates[offset:offset + GC_BATCH]
+        with engine.begin() as conn:
+            # 加锁读：等待未提交的上传事务结束，并阻止本事务结束前插入这些内容行
+            known = {
+                sha256 for (sha256,) in conn.execute(
+                    text("SELECT sha256 FROM attachment_blobs WHERE sha256 IN :hashes FOR UPDATE")
+                    .bindparams(bindparam("hashes", expanding=True)),
+                    {"hashes": batch}
+                )
+            }
+            for sha256 in batch:
+                if sha256 in known:
+                    continue
+                try:
+                    os.remove(blob_path(sha256))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    if removed:
+        logger.info("Removed %d attachment files without blob rows", removed)
+    return removed
+
+
+# ==================== 下载 ====================
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 头，返回 [start, end]（含两端）
+    无 Range 头或多段 Range 时返回 None（按完整内容响应），范围无法满足时抛出 ValueError
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text == "":
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        raise ValueError("invalid range")
+    if start < 0 or start > end or start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or any(value.replace("W/", "", 1) == etag for value in candidates)
+
+
+def _content_disposition(filename: str) -> str:
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "") or "attachment"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class AttachmentFileResponse(Response):
+    """
+    附件下载响应
+    - ETag 为内容哈希，If-None-Match 命中时返回 304
+    - 单段 Range 返回 206，无法满足时返回 416；If-Range 与 ETag 不一致时返回完整内容
+    - 服务器支持 http.response.zerocopysend 扩展时直接发送文件，否则在线程池中分块读取
+    """
+
+    def __init__(self, path: str, sha256: str, size: int, filename: str,
+                 content_type: Optional[str], request_headers):
+        self.path = path
+        self.start, self.end = 0, size - 1
+        etag = f'"{sha256}"'
+        headers = {
+            "etag": etag,
+            "accept-ranges": "bytes",
+            "cache-control": "private, no-cache",
+            "content-disposition": _content_disposition(filename),
+        }
+
+        if _etag_matches(request_headers.get("if-none-match"), etag):
+            # 304 不带 Content-Length（否则必须等于完整内容的长度）
+            status_code = 304
+        else:
+            status_code = 200
+            if_range = request_headers.get("if-range")
+            try:
+                byte_range = None if if_range and if_range != etag else parse_range(request_headers.get("range"), size)
+            except ValueError:
+                byte_range = None
+                status_code = 416
+                headers["content-range"] = f"bytes */{size}"
+                headers["content-length"] = "0"
+            if byte_range is not None:
+                status_code = 206
+                self.start, self.end = byte_range
+                headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+            if status_code != 416:
+                headers["content-length"] = str(self.end - self.start + 1)
+
+        super().__init__(status_code=status_code, headers=headers,
+                         media_type=content_type or "application/octet-stream")
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.status_code not in (200, 206) or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        count = self.end - self.start + 1
+        f = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": self.start, "count": count})
+                return
+
+            await run_in_threadpool(f.seek, self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(DOWNLOAD_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await run_in_threadpool(f.close)
@@ -9,6 +9,12 @@ from typing import Optional, Dict, Any
 from fastapi import Request
 from sqlalchemy.orm import Session
 from models import OperationLog
+from utils.audit_dict import AuditDict
+from utils.audit_chain import append_to_chain
+from utils.profiling import current_profile
+from utils.logger import get_logger, current_request_id
+
+logger = get_logger("audit")
 
 
 class AuditLogger:
@@ -32,7 +38,34 @@ class AuditLogger:
             return request.client.host
         
         return "unknown"
-    
+
+    @staticmethod
+    def to_dict(log: OperationLog) -> Dict[str, Any]:
+        """将日志记录转换为字典（接口返回、归档文件共用此格式）"""
+        return {
+            "id": log.id,
+            "user_id": log.user_id,
+            "username": log.username,
+            "operation": log.operation,
+            "module": log.module,
+            "method": log.method,
+            "path": log.path,
+            "details": log.details,
+            "resource_type": log.resource_type,
+            "resource_id": log.resource_id,
+            "ip_address": log.ip_address,
+            "user_agent": log.user_agent,
+            "status": log.status,
+            "error_msg": log.error_msg,
+            "duration": log.duration,
+            "sql_count": log.sql_count,
+            "sql_ms": log.sql_ms,
+            "request_id": log.request_id,
+            "prev_hash": log.prev_hash,
+            "row_hash": log.row_hash,
+            "created_at": log.created_at.strftime("%Y-%m-%d %H:%M:%S") if log.created_at else None
+        }
+
     @staticmethod
     def log_operation(
         db: Session,
@@ -44,7 +77,9 @@ class AuditLogger:
         details: Optional[Dict[str, Any]] = None,
         status: str = "SUCCESS",
         error_msg: Optional[str] = None,
-        duration: Optional[int] = None
+        duration: Optional[int] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Any = None
     ):
         """
         记录操作日志
@@ -59,28 +94,77 @@ class AuditLogger:
             details: 操作详情（字典格式，会转为JSON）
             status: 操作结果（SUCCESS/FAILED）
             error_msg: 错误信息
-            duration: 执行时间（毫秒）
+            duration: 执行时间（毫秒），为空时取当前请求已耗时
+            resource_type: 资源类型（如：项目、论文），写入索引列用于资源变更历史查询
+            resource_id: 资源ID
         """
         try:
+            username = username or "anonymous"
+            path = str(request.url.path)[:500]
+            user_agent = request.headers.get("User-Agent", "")[:500]
+            details_json = json.dumps(details, ensure_ascii=False) if details else None
+            resource_id = str(resource_id) if resource_id is not None else None
+            ip_address = AuditLogger.get_client_ip(request)
+            request_id = current_request_id()
+            # 在应用侧确定时间（精确到秒，与数据库存储一致），使其可参与哈希
+            created_at = datetime.now().replace(microsecond=0)
+            
+            # 由剖析中间件自动补充耗时与 SQL 统计（截至记录日志时）
+            sql_count = sql_ms = None
+            profile = current_profile()
+            if profile is not None:
+                if duration is None:
+                    duration = profile.elapsed_ms()
+                sql_count = profile.sql_count
+                sql_ms = profile.sql_ms()
+            
+            # 重复字符串编码为字典ID（命中进程内缓存时无需访问数据库）
             log = OperationLog(
                 user_id=user_id,
-                username=username or "anonymous",
-                operation=operation,
-                module=module,
-                method=request.method,
-                path=str(request.url.path),
-                details=json.dumps(details, ensure_ascii=False) if details else None,
-                ip_address=AuditLogger.get_client_ip(request),
-                user_agent=request.headers.get("User-Agent", "")[:500],
+                username_id=AuditDict.encode("username", username),
+                operation_id=AuditDict.encode("operation", operation),
+                module_id=AuditDict.encode("module", module),
+                method_id=AuditDict.encode("method", request.method),
+                path=path,
+                details=details_json,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                ip_address=ip_address,
+                user_agent_id=AuditDict.encode("user_agent", user_agent),
                 status=status,
                 error_msg=error_msg,
-                duration=duration
+                duration=duration,
+                sql_count=sql_count,
+                sql_ms=sql_ms,
+                request_id=request_id,
+                created_at=created_at
             )
-            db.add(log)
+            
+            # 接入防篡改哈希链（哈希内容与 to_dict 输出一致）
+            append_to_chain(db, log, {
+                "user_id": user_id,
+                "username": username,
+                "operation": operation,
+                "module": module,
+                "method": request.method,
+                "path": path,
+                "details": details_json,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "status": status,
+                "error_msg": error_msg,
+                "duration": duration,
+                "sql_count": sql_count,
+                "sql_ms": sql_ms,
+                "request_id": request_id,
+                "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S")
+            })
             db.commit()
         except Exception as e:
-            # 日志记录失败不应影响业务，只打印错误
-            print(f"[AuditLog Error] Failed to log operation: {e}")
+            # 日志记录失败不应影响业务，只记录错误
+            logger.error("Failed to log operation: %s", e, exc_info=True)
             db.rollback()
     
     @staticmethod
@@ -144,7 +228,9 @@ class AuditLogger:
                 "resource_type": resource_type,
                 "resource_id": str(resource_id),
                 "data": data
-            }
+            },
+            resource_type=resource_type,
+            resource_id=resource_id
         )
     
     @staticmethod
@@ -170,7 +256,9 @@ class AuditLogger:
                 "resource_type": resource_type,
                 "resource_id": str(resource_id),
                 "changes": changes
-            }
+            },
+            resource_type=resource_type,
+            resource_id=resource_id
         )
     
     @staticmethod
@@ -181,9 +269,10 @@ class AuditLogger:
         module: str,
         resource_type: str,
         resource_id: Any,
-        request: Request
+        request: Request,
+        data: Optional[Dict] = None
     ):
-        """记录删除操作"""
+        """记录删除操作（data 为删除前的资源快照）"""
         AuditLogger.log_operation(
             db=db,
             user_id=user_id,
@@ -193,8 +282,11 @@ class AuditLogger:
             request=request,
             details={
                 "resource_type": resource_type,
-                "resource_id": str(resource_id)
-            }
+                "resource_id": str(resource_id),
+                "data": data
+            },
+            resource_type=resource_type,
+            resource_id=resource_id
         )
     
     @staticmethod
@@ -229,9 +321,16 @@ class AuditLogger:
         module: str,
         resource_type: str,
         request: Request,
-        count: int
+        count: int,
+        filters: Optional[Dict] = None
     ):
-        """记录导出操作"""
+        """记录导出操作（filters 为导出条件，如截止日期）"""
+        details = {
+            "resource_type": resource_type,
+            "count": count
+        }
+        if filters:
+            details["filters"] = filters
         AuditLogger.log_operation(
             db=db,
             user_id=user_id,
@@ -239,10 +338,7 @@ class AuditLogger:
             operation=f"导出{resource_type}",
             module=module,
             request=request,
-            details={
-                "resource_type": resource_type,
-                "count": count
-            }
+            details=details
         )
     
     @staticmethod
@@ -0,0 +1,258 @@
+"""
+审计日志分区与归档工具（等保二级要求）
+- operation_logs 按月 RANGE 分区，保留最近 N 个月在线数据
+- 超过保留期的分区导出为 gzip 压缩的 NDJSON 归档文件后删除
+- 查询历史日期时透明读取归档文件
+"""
+import os
+import gzip
+import json
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any, Iterator, Callable
+from sqlalchemy import text, desc
+from database import engine, SessionLocal, MYSQL_DATABASE
+from models import OperationLog
+from utils.audit import AuditLogger
+
+# 归档配置
+HOT_RETENTION_MONTHS = 6  # 在线保留月数（含当月）
+FUTURE_PARTITIONS = 3  # 预先创建的未来月份分区数
+ARCHIVE_BATCH_SIZE = 5000  # 导出时每批读取的行数
+ARCHIVE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "audit_logs"
+)
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def month_start(value) -> date:
+    """返回所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    """月份加减"""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """月份对应的分区名，如 p202501"""
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_definition(month: date) -> str:
+    """单个月份分区的定义语句"""
+    return (
+        f"PARTITION {partition_name(month)} "
+        f"VALUES LESS THAN (TO_DAYS('{add_months(month, 1).isoformat()}'))"
+    )
+
+
+def partition_clause(first_month: date, last_month: date) -> str:
+    """生成 first_month 至 last_month 的完整分区子句（含 pmax）"""
+    parts = []
+    month = first_month
+    while month <= last_month:
+        parts.append(partition_definition(month))
+        month = add_months(month, 1)
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (TO_DAYS(created_at)) (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def list_partition_months(conn) -> List[date]:
+    """列出 operation_logs 现有的月份分区（不含 pmax），未分区时返回空列表"""
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = 'operation_logs' "
+        "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"schema": MYSQL_DATABASE}).fetchall()
+
+    months = []
+    for (name,) in rows:
+        if name and name.startswith("p") and name[1:].isdigit():
+            months.append(date(int(name[1:5]), int(name[5:7]), 1))
+    return months
+
+
+def ensure_future_partitions(conn, now: Optional[datetime] = None) -> List[str]:
+    """从 pmax 中拆分出未来月份的分区，返回新建的分区名"""
+    months = list_partition_months(conn)
+    if not months:
+        return []
+
+    target = add_months(month_start(now or datetime.now()), FUTURE_PARTITIONS)
+    month = add_months(months[-1], 1)
+    new_months = []
+    while month <= target:
+        new_months.append(month)
+        month = add_months(month, 1)
+
+    if not new_months:
+        return []
+
+    definitions = [partition_definition(m) for m in new_months]
+    definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    conn.execute(text(
+        "ALTER TABLE operation_logs REORGANIZE PARTITION pmax INTO (" + ", ".join(definitions) + ")"
+    ))
+    return [partition_name(m) for m in new_months]
+
+
+def archive_path(month: date) -> str:
+    """月份对应的归档文件路径"""
+    return os.path.join(ARCHIVE_DIR, f"operation_logs_{month.year:04d}{month.month:02d}.ndjson.gz")
+
+
+def export_month(month: date) -> int:
+    """
+    将指定月份的日志按时间倒序导出到归档文件
+    先写临时文件，完成后再原子替换，返回导出条数
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = archive_path(month)
+    tmp_path = path + ".tmp"
+    start = datetime(month.year, month.month, 1)
+    next_month = add_months(month, 1)
+    end = datetime(next_month.year, next_month.month, 1)
+
+    db = SessionLocal()
+    count = 0
+    try:
+        query = db.query(OperationLog).filter(
+            OperationLog.created_at >= start,
+            OperationLog.created_at < end
+        ).order_by(
+            desc(OperationLog.created_at), desc(OperationLog.id)
+        ).execution_options(stream_results=True).yield_per(ARCHIVE_BATCH_SIZE)
+
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for log in query:
+                f.write(json.dumps(AuditLogger.to_dict(log), ensure_ascii=False))
+                f.write("\n")
+                count += 1
+        os.replace(tmp_path, path)
+    finally:
+        db.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return count
+
+
+def archive_partition(month: date) -> int:
+    """归档并删除单个月份分区；导出条数与分区行数不一致时不删除"""
+    count = export_month(month)
+    name = partition_name(month)
+
+    with engine.begin() as conn:
+        remaining = conn.execute(text(f"SELECT COUNT(*) FROM operation_logs PARTITION ({name})")).scalar()
+        if remaining != count:
+            raise RuntimeError(f"分区 {name} 导出 {count} 条，但分区内有 {remaining} 条，已中止删除")
+        conn.execute(text(f"ALTER TABLE operation_logs DROP PARTITION {name}"))
+
+    return count
+
+
+def run_retention(now: Optional[datetime] = None, retention_months: int = HOT_RETENTION_MONTHS) -> Dict[str, Any]:
+    """
+    执行保留策略：
+    1. 预建未来月份分区
+    2. 将超过保留期的分区归档并删除
+
+    Returns:
+        dict: 新建分区和已归档分区的统计
+    """
+    now = now or datetime.now()
+    cutoff = add_months(month_start(now), -(retention_months - 1))
+
+    with engine.begin() as conn:
+        months = list_partition_months(conn)
+        if not months:
+            return {"partitioned": False, "created": [], "archived": {}}
+        created = ensure_future_partitions(conn, now)
+
+    archived = {}
+    for month in months:
+        if month >= cutoff:
+            break
+        archived[partition_name(month)] = archive_partition(month)
+
+    return {"partitioned": True, "created": created, "archived": archived}
+
+
+def build_predicate(
+    username: Optional[str] = None,
+    operation: Optional[str] = None,
+    module: Optional[str] = None,
+    status: Optional[str] = None
+) -> Callable[[Dict[str, Any]], bool]:
+    """构建归档记录的过滤条件，语义与在线查询一致"""
+    def predicate(row: Dict[str, Any]) -> bool:
+        if username and username not in (row.get("username") or ""):
+            return False
+        if operation and operation not in (row.get("operation") or ""):
+            return False
+        if module and row.get("module") != module:
+            return False
+        if status and row.get("status") != status:
+            return False
+        return True
+    return predicate
+
+
+class AuditArchive:
+    """归档日志读取"""
+
+    @staticmethod
+    def archived_months() -> List[date]:
+        """已归档的月份（从新到旧）"""
+        if not os.path.isdir(ARCHIVE_DIR):
+            return []
+        months = []
+        for filename in os.listdir(ARCHIVE_DIR):
+            if filename.startswith("operation_logs_") and filename.endswith(".ndjson.gz"):
+                stamp = filename[len("operation_logs_"):-len(".ndjson.gz")]
+                if len(stamp) == 6 and stamp.isdigit():
+                    months.append(date(int(stamp[:4]), int(stamp[4:]), 1))
+        return sorted(months, reverse=True)
+
+    @staticmethod
+    def cutoff() -> Optional[datetime]:
+        """归档数据的上界（最新归档月份的下一个月第一天），无归档时返回 None"""
+        months = AuditArchive.archived_months()
+        if not months:
+            return None
+        next_month = add_months(months[0], 1)
+        return datetime(next_month.year, next_month.month, 1)
+
+    @staticmethod
+    def iter_logs(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按时间倒序遍历 [start, end) 范围内的归档记录
+        归档文件按月存放且文件内已倒序，逐行解压，内存占用恒定
+        """
+        start_str = start.strftime(DATETIME_FORMAT) if start else None
+        end_str = end.strftime(DATETIME_FORMAT) if end else None
+
+        for month in AuditArchive.archived_months():
+            if end and datetime(month.year, month.month, 1) >= end:
+                continue
+            next_month = add_months(month, 1)
+            if start and datetime(next_month.year, next_month.month, 1) <= start:
+                break
+
+            with gzip.open(archive_path(month), "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    created_at = row.get("created_at") or ""
+                    if end_str and created_at >= end_str:
+                        continue
+                    if start_str and created_at < start_str:
+                        break
+                    if predicate is None or predicate(row):
+                        yield row
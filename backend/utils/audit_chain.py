@@ -0,0 +1,255 @@
+"""
+审计日志防篡改哈希链（等保二级要求）
+- 每条日志的哈希 = SHA-256(前一条哈希 + 本条内容)，在写日志时计算
+- 链头保存在 audit_chain_head 单行表中，写日志时行锁串行推进，多进程安全
+- 定时任务每 BLOCK_SIZE 条日志生成一个 Merkle 检查点
+- 校验任意ID范围：按块切分重算，耗时与范围大小成正比；命令行校验用进程池并行，
+  请求内只在本进程中校验（带后台线程的工作进程中 fork 子进程可能因继承已持有的锁而死锁）
+"""
+import json
+import hashlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import OperationLog, AuditChainHead, AuditCheckpoint
+
+# 哈希链配置
+GENESIS_HASH = "0" * 64  # 链首的前驱哈希
+BLOCK_SIZE = 1024  # 每个检查点覆盖的日志条数
+VERIFY_WORKERS = 4  # 命令行校验的进程数
+VERIFY_MAX_PENDING = 16  # 同时提交给进程池的块数上限
+
+# 参与哈希的字段（取值为 None 的字段不参与，便于日后新增字段时兼容旧记录）
+HASHED_FIELDS = (
+    "user_id", "username", "operation", "module", "method", "path", "details",
+    "resource_type", "resource_id", "ip_address", "user_agent", "status", "error_msg",
+    "duration", "sql_count", "sql_ms", "request_id", "created_at",
+)
+
+
+def canonical(record: Dict[str, Any]) -> str:
+    """日志内容的规范化 JSON 表示"""
+    content = {field: record[field] for field in HASHED_FIELDS if record.get(field) is not None}
+    return json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def chain_hash(prev_hash: str, record: Dict[str, Any]) -> str:
+    """链式哈希"""
+    return hashlib.sha256((prev_hash + "\n" + canonical(record)).encode("utf-8")).hexdigest()
+
+
+def merkle_root(hashes: List[str]) -> str:
+    """Merkle 根（奇数个节点时复制最后一个）"""
+    if not hashes:
+        return GENESIS_HASH
+    level = hashes
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [
+            hashlib.sha256((level[i] + level[i + 1]).encode("ascii")).hexdigest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def append_to_chain(db: Session, log: OperationLog, record: Dict[str, Any]):
+    """
+    将日志接入哈希链（在调用方事务内执行，由调用方提交）
+    锁定链头行直到事务提交，保证链顺序与日志ID顺序一致
+    """
+    head = db.query(AuditChainHead).filter(AuditChainHead.id == 1).with_for_update().first()
+    if head is None:
+        head = AuditChainHead(id=1, last_log_id=None, last_hash=GENESIS_HASH)
+        db.add(head)
+
+    log.prev_hash = head.last_hash
+    log.row_hash = chain_hash(head.last_hash, record)
+    db.add(log)
+    db.flush()
+
+    head.last_log_id = log.id
+    head.last_hash = log.row_hash
+
+
+def _iter_chained_rows(start_id: Optional[int], end_id: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """按ID顺序遍历已接入哈希链的日志"""
+    from utils.audit_export import iter_hot_rows
+
+    filters = [OperationLog.row_hash.isnot(None)]
+    if start_id:
+        filters.append(OperationLog.id >= start_id)
+    if end_id:
+        filters.append(OperationLog.id <= end_id)
+    return iter_hot_rows(filters, order_by=[OperationLog.id])
+
+
+def build_checkpoints() -> int:
+    """
+    为链尾之前所有完整的块生成检查点（定时任务）
+
+    Returns:
+        int: 新生成的检查点数量
+    """
+    db = SessionLocal()
+    try:
+        last_id = db.query(func.max(AuditCheckpoint.last_id)).scalar() or 0
+    finally:
+        db.close()
+
+    created = 0
+    block: List[Dict[str, Any]] = []
+    for row in _iter_chained_rows(last_id + 1, None):
+        block.append(row)
+        if len(block) == BLOCK_SIZE:
+            _save_checkpoint(block)
+            created += 1
+            block = []
+    return created
+
+
+def _save_checkpoint(block: List[Dict[str, Any]]):
+    db = SessionLocal()
+    try:
+        db.add(AuditCheckpoint(
+            first_id=block[0]["id"],
+            last_id=block[-1]["id"],
+            record_count=len(block),
+            merkle_root=merkle_root([row["row_hash"] for row in block]),
+            last_hash=block[-1]["row_hash"],
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def verify_segment(
+    rows: List[Tuple[int, str, str, str]],
+    expected_prev: Optional[str],
+    expected_root: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    校验一段连续日志（在进程池中执行）
+
+    Args:
+        rows: [(id, prev_hash, row_hash, 规范化内容)]
+        expected_prev: 第一条日志应有的前驱哈希（None 表示不校验）
+        expected_root: 检查点记录的 Merkle 根（None 表示该段尚无检查点）
+
+    Returns:
+        list: 发现的问题
+    """
+    problems = []
+    prev = expected_prev
+    for log_id, prev_hash, row_hash, content in rows:
+        if prev is not None and prev_hash != prev:
+            problems.append({"id": log_id, "error": "前驱哈希不匹配（记录被删除、插入或重排）"})
+        actual = hashlib.sha256((prev_hash + "\n" + content).encode("utf-8")).hexdigest()
+        if actual != row_hash:
+            problems.append({"id": log_id, "error": "内容哈希不匹配（记录被篡改）"})
+        prev = row_hash
+
+    if expected_root is not None and merkle_root([row[2] for row in rows]) != expected_root:
+        problems.append({"id": rows[0][0] if rows else None, "error": "Merkle 根与检查点不一致"})
+    return problems
+
+
+def _iter_segments(
+    start_id: Optional[int],
+    end_id: Optional[int],
+    checkpoints: List[AuditCheckpoint]
+) -> Iterator[Tuple[List[Tuple[int, str, str, str]], Optional[AuditCheckpoint]]]:
+    """按检查点块切分待校验的日志；检查点之后的日志按 BLOCK_SIZE 切分"""
+    checkpoint_iter = iter(checkpoints)
+    checkpoint = next(checkpoint_iter, None)
+    segment: List[Tuple[int, str, str, str]] = []
+
+    for row in _iter_chained_rows(start_id, end_id):
+        log_id = row["id"]
+        while checkpoint is not None and log_id > checkpoint.last_id:
+            if segment:
+                yield segment, checkpoint
+                segment = []
+            checkpoint = next(checkpoint_iter, None)
+
+        segment.append((log_id, row["prev_hash"], row["row_hash"], canonical(row)))
+
+        if checkpoint is None and len(segment) == BLOCK_SIZE:
+            yield segment, None
+            segment = []
+
+    if segment:
+        yield segment, checkpoint if checkpoint is not None and segment[-1][0] <= checkpoint.last_id else None
+
+
+def verify_range(
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    processes: bool = False
+) -> Dict[str, Any]:
+    """
+    校验ID范围内日志的完整性
+
+    Args:
+        processes: 是否用进程池并行校验（仅限命令行脚本，不要在 Web 工作进程中使用）
+
+    Returns:
+        dict: 校验的日志条数、块数和发现的问题
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(AuditCheckpoint)
+        if start_id:
+            query = query.filter(AuditCheckpoint.last_id >= start_id)
+        if end_id:
+            query = query.filter(AuditCheckpoint.first_id <= end_id)
+        checkpoints = query.order_by(AuditCheckpoint.first_id).all()
+        db.expunge_all()
+    finally:
+        db.close()
+
+    checked = 0
+    blocks = 0
+    problems: List[Dict[str, Any]] = []
+    pending = []
+    prev_last_hash: Optional[str] = None
+
+    pool = None
+    if processes:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+
+    try:
+        for segment, checkpoint in _iter_segments(start_id, end_id, checkpoints):
+            # 仅当整块都在校验范围内时才比对 Merkle 根（范围两端或已归档的块只校验链）
+            expected_root = None
+            if (checkpoint is not None and segment[0][0] == checkpoint.first_id
+                    and segment[-1][0] == checkpoint.last_id and len(segment) == checkpoint.record_count):
+                expected_root = checkpoint.merkle_root
+
+            if pool is None:
+                problems.extend(verify_segment(segment, prev_last_hash, expected_root))
+            else:
+                pending.append(pool.submit(verify_segment, segment, prev_last_hash, expected_root))
+            prev_last_hash = segment[-1][2]
+            checked += len(segment)
+            blocks += 1
+
+            if len(pending) >= VERIFY_MAX_PENDING:
+                problems.extend(pending.pop(0).result())
+
+        for future in pending:
+            problems.extend(future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {
+        "start_id": start_id,
+        "end_id": end_id,
+        "checked": checked,
+        "blocks": blocks,
+        "valid": not problems,
+        "problems": problems,
+    }
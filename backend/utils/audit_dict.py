@@ -0,0 +1,123 @@
+"""
+审计日志字典编码
+- 用户名、操作类型、模块、方法、用户代理等重复字符串存入 audit_dictionary，日志表只存整数ID
+- 请求路径含资源ID（/api/projects/123），取值几乎不重复，作为普通列存储，不进入字典
+- 进程内缓存 值→ID 与 ID→值 映射，写入时命中缓存无需访问数据库
+- 子串查询在内存字典上匹配，改写为整数列上的 IN 查询，可走索引
+- 自增ID不保证按提交顺序可见（其他进程ID较小的字典项可能晚提交），增量加载时回看 SYNC_OVERLAP_IDS 个ID，
+  解码时缓存未命中的ID按ID单独加载
+"""
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from database import engine
+from utils.metrics import AUDIT_DICT_LOOKUPS
+
+SYNC_OVERLAP_IDS = 1000  # 增量加载时回看的ID数（覆盖并发写入字典时晚提交的较小ID）
+SYNC_MIN_INTERVAL_SECONDS = 1.0  # 子串查询前增量加载的最小间隔（筛选查询频繁时不重复读取字典）
+
+
+class AuditDict:
+    """审计日志字典缓存"""
+
+    _lock = threading.Lock()
+    _ids: Dict[Tuple[str, str], int] = {}
+    _values: Dict[int, str] = {}
+    _max_id = 0
+    _synced_at = 0.0
+
+    @classmethod
+    def _remember(cls, entry_id: int, kind: str, value: str):
+        cls._ids[(kind, value)] = entry_id
+        cls._values[entry_id] = value
+        if entry_id > cls._max_id:
+            cls._max_id = entry_id
+
+    @classmethod
+    def sync(cls):
+        """增量加载其他进程新写入的字典项（从已知最大ID之前 SYNC_OVERLAP_IDS 处开始）"""
+        cls._synced_at = time.monotonic()
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id, kind, value FROM audit_dictionary WHERE id > :after"),
+                {"after": cls._max_id - SYNC_OVERLAP_IDS}
+            ).fetchall()
+        with cls._lock:
+            for entry_id, kind, value in rows:
+                cls._remember(entry_id, kind, value)
+
+    @classmethod
+    def _load(cls, entry_id: int):
+        """按ID加载单个字典项（不受增量加载水位限制）"""
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT id, kind, value FROM audit_dictionary WHERE id = :id"), {"id": entry_id}
+            ).first()
+        if row is not None:
+            with cls._lock:
+                cls._remember(*row)
+
+    @classmethod
+    def encode(cls, kind: str, value: Optional[str]) -> Optional[int]:
+        """
+        获取字符串对应的字典ID，不存在时写入字典
+        字典写入使用独立连接，不影响调用方事务
+        """
+        if value is None:
+            return None
+
+        entry_id = cls._ids.get((kind, value))
+        if entry_id is not None:
+            AUDIT_DICT_LOOKUPS.inc("hit")
+            return entry_id
+
+        AUDIT_DICT_LOOKUPS.inc("miss")
+        params = {"kind": kind, "value": value}
+        with engine.begin() as conn:
+            conn.execute(text("INSERT IGNORE INTO audit_dictionary (kind, value) VALUES (:kind, :value)"), params)
+            entry_id = conn.execute(
+                text("SELECT id FROM audit_dictionary WHERE kind = :kind AND value = :value"), params
+            ).scalar()
+
+        with cls._lock:
+            cls._remember(entry_id, kind, value)
+        return entry_id
+
+    @classmethod
+    def decode(cls, entry_id: Optional[int]) -> Optional[str]:
+        """字典ID还原为字符串"""
+        if entry_id is None:
+            return None
+        value = cls._values.get(entry_id)
+        if value is None:
+            AUDIT_DICT_LOOKUPS.inc("miss")
+            cls._load(entry_id)
+            value = cls._values.get(entry_id)
+        else:
+            AUDIT_DICT_LOOKUPS.inc("hit")
+        return value
+
+    @classmethod
+    def lookup(cls, kind: str, value: str) -> Optional[int]:
+        """查找字符串对应的字典ID，不存在时返回 None（不写入字典）"""
+        entry_id = cls._ids.get((kind, value))
+        if entry_id is None:
+            cls.sync()
+            entry_id = cls._ids.get((kind, value))
+        return entry_id
+
+    @classmethod
+    def match_ids(cls, kind: str, keyword: str) -> List[int]:
+        """
+        返回包含 keyword 的字典项ID（不区分大小写，与 LIKE '%keyword%' 语义一致）
+        距上次增量加载不足 SYNC_MIN_INTERVAL_SECONDS 时直接使用缓存
+        """
+        if time.monotonic() - cls._synced_at >= SYNC_MIN_INTERVAL_SECONDS:
+            cls.sync()
+        keyword = keyword.casefold()
+        with cls._lock:
+            return [
+                entry_id for (entry_kind, value), entry_id in cls._ids.items()
+                if entry_kind == kind and keyword in value.casefold()
+            ]
@@ -0,0 +1,185 @@
+"""
+审计日志小时汇总（等保二级要求）
+- 定时任务按小时汇总 operation_logs，写入 operation_log_hourly
+- 统计接口 = 已汇总的整点小时 + 范围两端未汇总部分的实时查询
+  统计耗时只与时间范围相关，不随日志总量增长
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import OperationLog, OperationLogHourly
+from utils.audit_dict import AuditDict
+
+# 汇总配置
+ROLLUP_DELAY = timedelta(minutes=1)  # 整点结束后延迟汇总，等待在途事务提交
+ROLLUP_CHUNK = timedelta(days=1)  # 每个事务处理的时间跨度
+TOP_N = 10  # 操作类型、活跃用户排行数量
+
+ONE_HOUR = timedelta(hours=1)
+
+
+def hour_start(dt: datetime) -> datetime:
+    """返回所在整点"""
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_watermark(db: Session) -> Optional[datetime]:
+    """已汇总范围的上界（最后一个汇总小时 + 1 小时），尚未汇总时返回 None"""
+    last_hour = db.query(func.max(OperationLogHourly.hour)).scalar()
+    return last_hour + ONE_HOUR if last_hour else None
+
+
+def refresh_hourly_rollups(now: Optional[datetime] = None) -> int:
+    """
+    将水位线之后、已结束的整点小时汇总到 operation_log_hourly
+    按天分批，每批先删后插，可重复执行
+
+    Returns:
+        int: 本次写入的汇总行数
+    """
+    now = now or datetime.now()
+    end = hour_start(now - ROLLUP_DELAY)
+
+    db = SessionLocal()
+    inserted = 0
+    try:
+        start = rollup_watermark(db)
+        if start is None:
+            earliest = db.query(func.min(OperationLog.created_at)).scalar()
+            if earliest is None:
+                return 0
+            start = hour_start(earliest)
+
+        bucket = func.date_format(OperationLog.created_at, "%Y-%m-%d %H:00:00")
+        status = func.coalesce(OperationLog.status, "")
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + ROLLUP_CHUNK, end)
+
+            # 按字典ID分组，写入汇总表时再还原为字符串
+            rows = db.query(
+                bucket,
+                OperationLog.module_id,
+                OperationLog.operation_id,
+                status,
+                OperationLog.username_id,
+                func.count(OperationLog.id)
+            ).filter(
+                OperationLog.created_at >= chunk_start,
+                OperationLog.created_at < chunk_end
+            ).group_by(
+                bucket,
+                OperationLog.module_id,
+                OperationLog.operation_id,
+                status,
+                OperationLog.username_id
+            ).all()
+
+            db.query(OperationLogHourly).filter(
+                OperationLogHourly.hour >= chunk_start,
+                OperationLogHourly.hour < chunk_end
+            ).delete(synchronize_session=False)
+
+            db.bulk_insert_mappings(OperationLogHourly, [
+                {
+                    "hour": datetime.strptime(hour, "%Y-%m-%d %H:%M:%S"),
+                    "module": AuditDict.decode(module_id) or "",
+                    "operation": AuditDict.decode(operation_id) or "",
+                    "status": row_status,
+                    "username": AuditDict.decode(username_id) or "",
+                    "count": count,
+                }
+                for hour, module_id, operation_id, row_status, username_id, count in rows
+            ])
+            db.commit()
+
+            inserted += len(rows)
+            chunk_start = chunk_end
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return inserted
+
+
+def _split_range(db: Session, start: datetime) -> Tuple[Optional[Tuple[datetime, datetime]], List[Tuple[datetime, Optional[datetime]]]]:
+    """
+    将 [start, 现在] 拆分为可用汇总的整点区间和需要实时查询的区间
+
+    Returns:
+        (汇总区间或 None, 实时查询区间列表)
+    """
+    first_full_hour = hour_start(start)
+    if first_full_hour < start:
+        first_full_hour += ONE_HOUR
+
+    watermark = rollup_watermark(db)
+    if watermark is None or watermark <= first_full_hour:
+        return None, [(start, None)]
+
+    return (first_full_hour, watermark), [(start, first_full_hour), (watermark, None)]
+
+
+def get_statistics(db: Session, start: datetime) -> Dict[str, Any]:
+    """
+    统计 start 至今的审计日志：操作类型、成功/失败、活跃用户、每日操作量
+    """
+    operations: Counter = Counter()
+    statuses: Counter = Counter()
+    users: Counter = Counter()
+    daily: Counter = Counter()
+
+    rollup_range, live_ranges = _split_range(db, start)
+
+    # 已汇总部分：在汇总表上聚合
+    if rollup_range:
+        in_range = (
+            OperationLogHourly.hour >= rollup_range[0],
+            OperationLogHourly.hour < rollup_range[1]
+        )
+        total = func.sum(OperationLogHourly.count)
+
+        for key, cnt in db.query(OperationLogHourly.operation, total).filter(*in_range).group_by(OperationLogHourly.operation):
+            operations[key] += int(cnt)
+        for key, cnt in db.query(OperationLogHourly.status, total).filter(*in_range).group_by(OperationLogHourly.status):
+            statuses[key] += int(cnt)
+        for key, cnt in db.query(OperationLogHourly.username, total).filter(*in_range).group_by(OperationLogHourly.username):
+            users[key] += int(cnt)
+        day = func.date(OperationLogHourly.hour)
+        for key, cnt in db.query(day, total).filter(*in_range).group_by(day):
+            daily[str(key)] += int(cnt)
+
+    # 未汇总部分：范围两端不足一小时的数据，走 created_at 索引实时聚合
+    day = func.date(OperationLog.created_at)
+    for live_start, live_end in live_ranges:
+        filters = [OperationLog.created_at >= live_start]
+        if live_end is not None:
+            filters.append(OperationLog.created_at < live_end)
+
+        rows = db.query(
+            day,
+            OperationLog.operation_id,
+            OperationLog.status,
+            OperationLog.username_id,
+            func.count(OperationLog.id)
+        ).filter(*filters).group_by(
+            day, OperationLog.operation_id, OperationLog.status, OperationLog.username_id
+        ).all()
+
+        for dt, operation_id, status, username_id, cnt in rows:
+            operations[AuditDict.decode(operation_id) or ""] += cnt
+            statuses[status or ""] += cnt
+            users[AuditDict.decode(username_id) or ""] += cnt
+            daily[str(dt)] += cnt
+
+    return {
+        "operation_stats": [{"operation": op, "count": cnt} for op, cnt in operations.most_common(TOP_N)],
+        "status_stats": [{"status": st or "未知", "count": cnt} for st, cnt in statuses.items()],
+        "user_stats": [{"username": usr, "count": cnt} for usr, cnt in users.most_common(TOP_N)],
+        "daily_stats": [{"date": dt, "count": cnt} for dt, cnt in sorted(daily.items())]
+    }
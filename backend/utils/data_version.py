@@ -0,0 +1,104 @@
+"""
+业务表数据版本号
+- 业务表写入提交后，用独立的短事务递增 data_versions 中对应表的版本号（回滚的写入不递增）
+- 不在写入事务内递增：版本号行是每张表一行的热点，持有到提交会使所有写该表的事务跨进程串行，
+  多次 flush 的事务还可能以不同顺序加锁而死锁
+- 版本号在提交之后才递增，期间读到旧版本号的请求看到的已是新数据，缓存不会因此变旧
+- 读取结果缓存 VERSION_REFRESH_SECONDS 秒；本进程提交写入后立即失效，其他进程的写入最多延迟该时间可见
+- 作为单飞合并与结果缓存键的一部分：数据变化后不会再复用旧结果
+"""
+import time
+import threading
+from itertools import chain
+from typing import Dict, Tuple
+from sqlalchemy import event, text
+from database import engine, SessionLocal
+from utils.logger import get_logger
+
+logger = get_logger("data_version")
+
+# 版本号配置
+TRACKED_TABLES = {  # 审计日志等高频写入表不参与
+    "users", "projects", "project_members", "papers", "paper_authors", "funds", "achievements",
+}
+VERSION_REFRESH_SECONDS = 1.0  # 版本号缓存时间
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_loaded_at = 0.0
+_generation = 0  # 每次本进程提交写入后递增，防止并发加载覆盖失效标记
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_tables(session, flush_context):
+    """记录事务内被修改的表"""
+    tables = {
+        type(obj).__table__.name for obj in chain(session.new, session.dirty, session.deleted)
+    } & TRACKED_TABLES
+    if tables:
+        session.info.setdefault("changed_tables", set()).update(tables)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        bump(tables)
+
+
+def bump(tables) -> bool:
+    """
+    递增各表版本号（每次提交每张表递增一次，独立短事务，按表名顺序加锁）
+    失败时只记录日志：写入已提交，不能因此向调用方报错
+
+    Returns:
+        bool: 是否递增成功
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO data_versions (table_name, version) VALUES (:table_name, 1) "
+                    "ON DUPLICATE KEY UPDATE version = version + 1"
+                ),
+                [{"table_name": name} for name in sorted(tables)]
+            )
+        return True
+    except Exception as e:
+        logger.error("Failed to bump data versions for %s: %s", ",".join(sorted(tables)), e, exc_info=True)
+        return False
+    finally:
+        invalidate()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_tables", None)
+
+
+def invalidate():
+    """使本进程缓存的版本号失效"""
+    global _loaded_at, _generation
+    with _lock:
+        _generation += 1
+        _loaded_at = 0.0
+
+
+def current(*tables: str) -> Tuple[int, ...]:
+    """
+    获取各表当前版本号
+
+    Returns:
+        tuple: 与 tables 顺序一致的版本号
+    """
+    global _versions, _loaded_at
+    now = time.monotonic()
+    if now - _loaded_at >= VERSION_REFRESH_SECONDS:
+        generation = _generation
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT table_name, version FROM data_versions")).fetchall()
+        with _lock:
+            _versions = {name: version for name, version in rows}
+            if generation == _generation:
+                _loaded_at = now
+    return tuple(_versions.get(table, 0) for table in tables)
@@ -1,9 +1,8 @@
 """
 Excel 导入导出工具
+openpyxl 导入较慢，仅在实际导入导出时加载，不拖慢应用启动
 """
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from typing import List, Dict
+from typing import Iterable, List, Dict
 from io import BytesIO
 from datetime import date, datetime
 
@@ -20,6 +19,9 @@ def export_to_excel(data: List[Dict], headers: Dict[str, str], filename: str = "
     Returns:
         BytesIO: Excel 文件二进制流
     """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+    
     wb = Workbook()
     ws = wb.active
     ws.title = "数据"
@@ -84,6 +86,8 @@ def import_from_excel(file: BytesIO, required_headers: List[str]) -> List[Dict]:
     Returns:
         List[Dict]: 导入的数据列表
     """
+    from openpyxl import load_workbook
+    
     wb = load_workbook(file)
     ws = wb.active
     
@@ -206,3 +210,61 @@ def export_achievements_to_excel(achievements: List) -> BytesIO:
     }
     
     return export_to_excel(data, headers, "成果数据.xlsx")
+
+
+def export_fund_balances_to_excel(balances: Iterable[Dict], as_of: date, expense_types: List[str]) -> BytesIO:
+    """
+    导出各项目截至指定日期的经费余额到 Excel
+    逐行写入（write_only 模式），项目数很多时不在内存中保留整张工作表；
+    expense_types 之外的支出类型计入“其他”列，最后一行为合计
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=f"截至{as_of.strftime('%Y-%m-%d')}")
+    
+    headers = ["ID", "项目名称", "负责人", "总预算", "已支出", "剩余经费"] + expense_types + ["其他"]
+    widths = [10, 40, 12, 14, 14, 14] + [12] * (len(expense_types) + 1)
+    for col_idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+    
+    # 写入表头
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    header_row = []
+    for title in headers:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_row.append(cell)
+    ws.append(header_row)
+    
+    # 写入数据
+    known_types = set(expense_types)
+    totals = [0.0] * (len(headers) - 3)
+    for item in balances:
+        by_type = item["by_type"]
+        other = sum(amount for name, amount in by_type.items() if name not in known_types)
+        amounts = [item["budget_total"], item["spent"], item["remaining"]]
+        amounts += [by_type.get(name, 0.0) for name in expense_types] + [other]
+        totals = [total + amount for total, amount in zip(totals, amounts)]
+        ws.append([item["project_id"], item["project_name"], item["pi_name"]] + amounts)
+    
+    total_row = []
+    for value in ["合计", "", ""] + [round(total, 2) for total in totals]:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        total_row.append(cell)
+    ws.append(total_row)
+    
+    # 保存到内存
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return output
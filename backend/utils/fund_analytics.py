@@ -0,0 +1,211 @@
+"""
+经费执行进度分析（支出速度与耗尽预测）
+- 一次查询取出在研项目的按月支出（窗口之前的月份在数据库中合并为一列），在 NumPy 中按 项目×月 矩阵一次性计算
+- 支出速度 = 当月之前 BURN_WINDOW_MONTHS 个完整月的月均支出（项目在窗口内开始的按实际月数平均）
+- 线性计划 = 总预算 × 已过天数 / 项目周期天数；预计耗尽日期 = 今天 + 剩余经费 / 支出速度
+- 计算结果按 (日期, funds/projects 数据版本号) 缓存，经费或项目写入后的请求重新计算，并发请求单飞合并
+- NumPy 在首次计算时加载，不拖慢应用启动
+"""
+import math
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+from utils.singleflight import SingleFlight, flight_key
+
+# 分析配置
+ACTIVE_STATUSES = (models.ProjectStatus.IN_PROGRESS, models.ProjectStatus.MID_CHECK)  # 参与分析的项目状态
+SERIES_MONTHS = 12  # 返回的月度支出序列长度（含当月）
+BURN_WINDOW_MONTHS = 6  # 计算支出速度的完整月数（不含当月）
+AHEAD_OF_PLAN_RATIO = 1.2  # 累计支出超过线性计划该倍数时视为支出超前
+MONTH_DAYS = 365.2425 / 12  # 平均每月天数
+CACHE_ENTRIES = 4  # 缓存的分析结果份数（不同截止日期各一份）
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[tuple, BurnRateReport]" = OrderedDict()
+_flight = SingleFlight("fund_burn")
+
+
+def month_index(d: date) -> int:
+    """日期所在月份的序号（年 × 12 + 月 - 1）"""
+    return d.year * 12 + d.month - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_end_ordinal(index: int) -> int:
+    """月份最后一天的序数日"""
+    year, month = divmod(index + 1, 12)
+    return date(year, month + 1, 1).toordinal() - 1
+
+
+def _ordinal(d: Optional[date]) -> float:
+    return d.toordinal() if d else math.nan
+
+
+def _to_date(ordinal: float) -> Optional[date]:
+    return None if math.isnan(ordinal) else date.fromordinal(int(ordinal))
+
+
+class BurnRateReport:
+    """一次向量化计算的结果（各数组按项目ID排序，下标一致）"""
+
+    def __init__(self, db: Session, as_of: date):
+        import numpy as np
+
+        started = time.perf_counter()
+        self.as_of = as_of
+        current = month_index(as_of)
+        first = current - SERIES_MONTHS + 1
+        self.months = [month_label(index) for index in range(first, current + 1)]
+
+        projects = (
+            db.query(
+                models.Project.id, models.Project.project_name, models.Project.pi_name,
+                models.Project.budget_total, models.Project.start_date, models.Project.end_date
+            )
+            .filter(models.Project.status.in_(ACTIVE_STATUSES))
+            .order_by(models.Project.id)
+            .all()
+        )
+        n = len(projects)
+        self.ids = np.fromiter((row[0] for row in projects), dtype=np.int64, count=n)
+        self.names = [row[1] for row in projects]
+        self.pi_names = [row[2] for row in projects]
+        self.budget = np.fromiter((row[3] or 0.0 for row in projects), dtype=np.float64, count=n)
+        self.start = np.fromiter((_ordinal(row[4]) for row in projects), dtype=np.float64, count=n)
+        self.end = np.fromiter((_ordinal(row[5]) for row in projects), dtype=np.float64, count=n)
+
+        # 按 项目×月 汇总（窗口之前的月份合并为 first - 1）
+        fund_month = func.year(models.Fund.expense_date) * 12 + func.month(models.Fund.expense_date) - 1
+        bucket = func.greatest(fund_month, first - 1)
+        rows = (
+            db.query(models.Fund.project_id, bucket, func.sum(models.Fund.amount))
+            .join(models.Project, models.Project.id == models.Fund.project_id)
+            .filter(models.Project.status.in_(ACTIVE_STATUSES), models.Fund.expense_date <= as_of)
+            .group_by(models.Fund.project_id, bucket)
+            .all()
+        )
+        fund_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        columns = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)) - (first - 1)
+        amounts = np.fromiter((row[2] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+
+        # 两次查询之间状态变化的项目不在 ids 中，丢弃其支出
+        positions = np.searchsorted(self.ids, fund_ids).clip(0, max(n - 1, 0))
+        known = (self.ids[positions] == fund_ids) if n else np.zeros(len(rows), dtype=bool)
+        width = SERIES_MONTHS + 1
+        matrix = np.bincount(
+            positions[known] * width + columns[known], weights=amounts[known], minlength=n * width
+        ).reshape(n, width)
+
+        self.monthly = matrix[:, 1:]
+        self.cumulative = matrix[:, :1] + np.cumsum(self.monthly, axis=1)
+        self.spent = self.cumulative[:, -1]
+        self.remaining = self.budget - self.spent
+
+        # 支出速度：当月之前 BURN_WINDOW_MONTHS 个完整月的月均支出
+        window = self.monthly[:, SERIES_MONTHS - 1 - BURN_WINDOW_MONTHS:SERIES_MONTHS - 1]
+        start_month = np.array([month_index(row[4]) if row[4] else current - BURN_WINDOW_MONTHS for row in projects],
+                               dtype=np.int64)
+        active_months = np.clip(current - np.maximum(start_month, current - BURN_WINDOW_MONTHS), 1, BURN_WINDOW_MONTHS)
+        self.burn_rate = window.sum(axis=1) / active_months
+
+        # 线性计划：各月末（当月为截止日期）按已过天数比例应支出的金额
+        checkpoints = np.array([month_end_ordinal(index) for index in range(first, current)] + [as_of.toordinal()],
+                               dtype=np.float64)
+        duration = self.end - self.start
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = np.clip((checkpoints[None, :] - self.start[:, None]) / duration[:, None], 0.0, 1.0)
+            progress[~(duration > 0)] = np.nan
+            self.planned = self.budget[:, None] * progress
+            self.planned_to_date = self.planned[:, -1]
+            self.plan_ratio = np.where(self.planned_to_date > 0, self.spent / self.planned_to_date, np.nan)
+
+            # 预计耗尽日期：已无余额的为截止日期，无支出或无预算的不预测
+            has_budget = self.budget > 0
+            exhausted = has_budget & (self.remaining <= 0)
+            months_left = np.where(self.burn_rate > 0, self.remaining / self.burn_rate, np.nan)
+            self.exhaustion = np.where(
+                exhausted, float(as_of.toordinal()),
+                np.where(has_budget, as_of.toordinal() + months_left * MONTH_DAYS, np.nan)
+            )
+
+        self.over_budget = has_budget & (self.remaining < 0)
+        self.at_risk = ~np.isnan(self.exhaustion) & ~np.isnan(self.end) & (self.exhaustion < self.end)
+        self.ahead_of_plan = np.nan_to_num(self.plan_ratio) > AHEAD_OF_PLAN_RATIO
+
+        self.summary = {
+            "active_projects": n,
+            "at_risk": int(self.at_risk.sum()),
+            "over_budget": int(self.over_budget.sum()),
+            "ahead_of_plan": int(self.ahead_of_plan.sum()),
+            "total_budget": float(self.budget.sum()),
+            "total_spent": float(self.spent.sum()),
+            "monthly_burn_rate": float(self.burn_rate.sum()),
+            "compute_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def query(self, at_risk_only: bool = True, skip: int = 0, limit: int = 50) -> Tuple[int, List[dict]]:
+        """按预计耗尽日期排序（最早的在前，不预测的在后）分页返回项目明细"""
+        import numpy as np
+
+        selected = np.flatnonzero(self.at_risk) if at_risk_only else np.arange(len(self.ids))
+        exhaustion = np.where(np.isnan(self.exhaustion[selected]), np.inf, self.exhaustion[selected])
+        order = selected[np.lexsort((self.ids[selected], exhaustion))]
+        return len(order), [self._item(i) for i in order[skip:skip + limit]]
+
+    def _item(self, i: int) -> dict:
+        import numpy as np
+
+        plan_ratio = self.plan_ratio[i]
+        return {
+            "project_id": int(self.ids[i]),
+            "project_name": self.names[i],
+            "pi_name": self.pi_names[i],
+            "budget_total": float(self.budget[i]),
+            "spent": round(float(self.spent[i]), 2),
+            "remaining": round(float(self.remaining[i]), 2),
+            "monthly_burn_rate": round(float(self.burn_rate[i]), 2),
+            "planned_to_date": None if np.isnan(self.planned_to_date[i]) else round(float(self.planned_to_date[i]), 2),
+            "plan_ratio": None if np.isnan(plan_ratio) else round(float(plan_ratio), 3),
+            "start_date": _to_date(self.start[i]),
+            "end_date": _to_date(self.end[i]),
+            "projected_exhaustion_date": _to_date(self.exhaustion[i]),
+            "at_risk": bool(self.at_risk[i]),
+            "over_budget": bool(self.over_budget[i]),
+            "monthly_spend": np.round(self.monthly[i], 2).tolist(),
+            "cumulative_spend": np.round(self.cumulative[i], 2).tolist(),
+            "planned_cumulative": [None if np.isnan(v) else round(float(v), 2) for v in self.planned[i]],
+        }
+
+
+def get_burn_rate_report(as_of: Optional[date] = None) -> BurnRateReport:
+    """获取经费执行进度分析结果（经费、项目未变化时复用缓存）"""
+    as_of = as_of or date.today()
+    key = flight_key("fund_burn", {"as_of": as_of.isoformat()}, tables=("funds", "projects"))
+    with _cache_lock:
+        report = _cache.get(key)
+        if report is not None:
+            _cache.move_to_end(key)
+            return report
+
+    def compute() -> BurnRateReport:
+        db = SessionLocal()
+        try:
+            report = BurnRateReport(db, as_of)
+        finally:
+            db.close()
+        with _cache_lock:
+            _cache[key] = report
+            while len(_cache) > CACHE_ENTRIES:
+                _cache.popitem(last=False)
+        return report
+
+    return _flight.do(key, compute)
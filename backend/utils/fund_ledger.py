@@ -0,0 +1,273 @@
+"""
+项目经费台账
+- project_fund_ledgers 记录每个项目的已支出合计、记录数和最近支出日期，project_fund_ledger_types 记录按支出类型的合计
+- 经费增删改时在同一事务内先锁定项目台账行，再增减合计（提交则生效，回滚则一并撤销）
+- 经费汇总和预算检查只读台账行，不随经费记录数增长
+- 对账任务按批比对台账与 funds 实际合计，发现偏差时记录日志并按 funds 重建（reconcile_fund_ledgers）
+- 支出日期落在已生成月末快照的月份时，同时修正该月及之后各月的快照（见 utils/fund_snapshots.py）
+"""
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from database import engine
+from utils.logger import get_logger
+
+logger = get_logger("fund_ledger")
+
+# 台账配置
+FUND_BUDGET_HARD_STOP = False  # 为 True 时，新增/修改经费使已支出超过项目总预算将被拒绝（总预算为 0 的项目不限制）
+RECONCILE_BATCH = 1000  # 对账每批处理的项目数
+AMOUNT_TOLERANCE = 0.01  # 对账时允许的金额误差（浮点累加误差）
+
+
+class BudgetExceeded(Exception):
+    """经费支出超过项目总预算"""
+
+
+# ==================== 事务内维护 ====================
+
+def lock_ledger(db: Session, project_id: int) -> float:
+    """
+    在调用方事务内锁定项目台账行（不存在时创建），返回当前已支出合计
+    同一项目的经费写入在此串行，台账增减与预算检查不会交错
+    """
+    db.execute(text(
+        "INSERT IGNORE INTO project_fund_ledgers (project_id, spent_total, fund_count, updated_at) "
+        "SELECT id, 0, 0, NOW() FROM projects WHERE id = :project_id"
+    ), {"project_id": project_id})
+    spent = db.execute(text(
+        "SELECT spent_total FROM project_fund_ledgers WHERE project_id = :project_id FOR UPDATE"
+    ), {"project_id": project_id}).scalar()
+    return spent or 0.0
+
+
+def check_budget(db: Session, project_id: int, spent: float, increase: float):
+    """开启硬性限制时检查本次支出是否超过项目总预算（需先调用 lock_ledger）"""
+    if not FUND_BUDGET_HARD_STOP or increase <= 0:
+        return
+    budget = db.execute(
+        text("SELECT budget_total FROM projects WHERE id = :project_id"), {"project_id": project_id}
+    ).scalar()
+    if budget and budget > 0 and spent + increase > budget + AMOUNT_TOLERANCE:
+        raise BudgetExceeded(
+            f"超出项目总预算：总预算 {budget:.2f}，已支出 {spent:.2f}，本次增加 {increase:.2f}"
+        )
+
+
+def record_expense(db: Session, project_id: int, expense_type: str, amount: float, expense_date: date):
+    """在调用方事务内计入一条经费（不提交）"""
+    db.execute(text(
+        "UPDATE project_fund_ledgers SET spent_total = spent_total + :amount, fund_count = fund_count + 1, "
+        "last_expense_date = GREATEST(COALESCE(last_expense_date, :expense_date), :expense_date), "
+        "updated_at = NOW() WHERE project_id = :project_id"
+    ), {"project_id": project_id, "amount": amount, "expense_date": expense_date})
+    db.execute(text(
+        "INSERT INTO project_fund_ledger_types (project_id, expense_type, amount, fund_count) "
+        "VALUES (:project_id, :expense_type, :amount, 1) "
+        "ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount), fund_count = fund_count + 1"
+    ), {"project_id": project_id, "expense_type": expense_type, "amount": amount})
+    _adjust_snapshots(db, project_id, expense_type, amount, 1, expense_date)
+
+
+def unrecord_expense(db: Session, project_id: int, expense_type: str, amount: float, expense_date: date):
+    """
+    在调用方事务内扣除一条经费（不提交）
+    需在经费删除/修改已 flush 后调用：扣除的是最近支出日期时按 funds 重新取最大日期
+    """
+    db.execute(text(
+        "UPDATE project_fund_ledgers SET spent_total = spent_total - :amount, fund_count = fund_count - 1, "
+        "updated_at = NOW() WHERE project_id = :project_id"
+    ), {"project_id": project_id, "amount": amount})
+    db.execute(text(
+        "UPDATE project_fund_ledgers SET last_expense_date = "
+        "(SELECT MAX(expense_date) FROM funds WHERE project_id = :project_id) "
+        "WHERE project_id = :project_id AND last_expense_date <= :expense_date"
+    ), {"project_id": project_id, "expense_date": expense_date})
+    db.execute(text(
+        "UPDATE project_fund_ledger_types SET amount = amount - :amount, fund_count = fund_count - 1 "
+        "WHERE project_id = :project_id AND expense_type = :expense_type"
+    ), {"project_id": project_id, "expense_type": expense_type, "amount": amount})
+    db.execute(text(
+        "DELETE FROM project_fund_ledger_types "
+        "WHERE project_id = :project_id AND expense_type = :expense_type AND fund_count <= 0"
+    ), {"project_id": project_id, "expense_type": expense_type})
+    _adjust_snapshots(db, project_id, expense_type, -amount, -1, expense_date)
+
+
+def _adjust_snapshots(db: Session, project_id: int, expense_type: str, amount: float, count: int, expense_date: date):
+    """
+    修正支出月份及之后各月已生成（含生成中）的月末快照
+    读取期间表为加锁读，生成任务先提交期间再逐批锁定台账行生成，不会漏掉并发写入
+    """
+    params = {
+        "project_id": project_id, "expense_type": expense_type, "amount": amount, "count": count,
+        "month": expense_date.replace(day=1),
+    }
+    db.execute(text(
+        "INSERT INTO fund_month_snapshots (month, project_id, expense_type, amount, fund_count) "
+        "SELECT month, :project_id, :expense_type, :amount, :count FROM fund_snapshot_periods "
+        "WHERE month >= :month "
+        "ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount), fund_count = fund_count + VALUES(fund_count)"
+    ), params)
+    if count < 0:
+        db.execute(text(
+            "DELETE FROM fund_month_snapshots WHERE month >= :month AND project_id = :project_id "
+            "AND expense_type = :expense_type AND fund_count <= 0"
+        ), params)
+
+
+# ==================== 读取 ====================
+
+def get_ledger(db: Session, project_id: int) -> Optional[dict]:
+    """
+    读取项目台账（按主键），项目不存在时返回 None
+    尚未建立台账的项目视为没有经费记录
+    """
+    row = db.execute(text(
+        "SELECT p.budget_total, l.spent_total, l.fund_count, l.last_expense_date "
+        "FROM projects p LEFT JOIN project_fund_ledgers l ON l.project_id = p.id WHERE p.id = :project_id"
+    ), {"project_id": project_id}).first()
+    if row is None:
+        return None
+
+    budget_total, spent_total, fund_count, last_expense_date = row
+    by_type = {
+        expense_type: amount
+        for expense_type, amount in db.execute(text(
+            "SELECT expense_type, amount FROM project_fund_ledger_types WHERE project_id = :project_id"
+        ), {"project_id": project_id})
+    }
+    budget_total = budget_total or 0.0
+    spent_total = spent_total or 0.0
+    return {
+        "budget_total": budget_total,
+        "spent_total": spent_total,
+        "remaining": budget_total - spent_total,
+        "fund_count": fund_count or 0,
+        "last_expense_date": last_expense_date,
+        "by_type": by_type,
+    }
+
+
+# ==================== 对账 ====================
+
+_ids_param = bindparam("ids", expanding=True)
+
+
+def lock_ledgers(conn, project_ids: List[int]):
+    """在调用方事务内锁定一批项目的台账行（不存在时创建），此后这些项目的经费写入等待本事务结束"""
+    params = {"ids": project_ids}
+    conn.execute(text(
+        "INSERT IGNORE INTO project_fund_ledgers (project_id, spent_total, fund_count, updated_at) "
+        "SELECT id, 0, 0, NOW() FROM projects WHERE id IN :ids"
+    ).bindparams(_ids_param), params)
+    conn.execute(text(
+        "SELECT project_id FROM project_fund_ledgers WHERE project_id IN :ids FOR UPDATE"
+    ).bindparams(_ids_param), params)
+
+
+def rebuild_ledgers(conn, project_ids: List[int]):
+    """在调用方事务内按 funds 重建指定项目的台账（先锁定台账行，与经费写入串行）"""
+    params = {"ids": project_ids}
+    lock_ledgers(conn, project_ids)
+    conn.execute(text(
+        "DELETE FROM project_fund_ledger_types WHERE project_id IN :ids"
+    ).bindparams(_ids_param), params)
+    conn.execute(text(
+        "INSERT INTO project_fund_ledger_types (project_id, expense_type, amount, fund_count) "
+        "SELECT project_id, expense_type, SUM(amount), COUNT(*) FROM funds "
+        "WHERE project_id IN :ids GROUP BY project_id, expense_type"
+    ).bindparams(_ids_param), params)
+    conn.execute(text(
+        "UPDATE project_fund_ledgers l LEFT JOIN ("
+        "  SELECT project_id, SUM(amount) AS spent, COUNT(*) AS cnt, MAX(expense_date) AS last_date "
+        "  FROM funds WHERE project_id IN :ids GROUP BY project_id"
+        ") f ON f.project_id = l.project_id "
+        "SET l.spent_total = COALESCE(f.spent, 0), l.fund_count = COALESCE(f.cnt, 0), "
+        "l.last_expense_date = f.last_date, l.updated_at = NOW() "
+        "WHERE l.project_id IN :ids"
+    ).bindparams(_ids_param), params)
+
+
+def _find_drift(conn, first_id: int, last_id: int) -> List[int]:
+    """比对 ID 范围内项目的台账与 funds 实际合计，返回有偏差的项目ID"""
+    params = {"first_id": first_id, "last_id": last_id}
+    actual: Dict[Tuple[int, str], Tuple[float, int]] = {}
+    actual_last: Dict[int, date] = {}
+    for project_id, expense_type, amount, count, last_date in conn.execute(text(
+        "SELECT project_id, expense_type, SUM(amount), COUNT(*), MAX(expense_date) FROM funds "
+        "WHERE project_id BETWEEN :first_id AND :last_id GROUP BY project_id, expense_type"
+    ), params):
+        actual[(project_id, expense_type)] = (amount, count)
+        if project_id not in actual_last or last_date > actual_last[project_id]:
+            actual_last[project_id] = last_date
+
+    recorded = {
+        (project_id, expense_type): (amount, count)
+        for project_id, expense_type, amount, count in conn.execute(text(
+            "SELECT project_id, expense_type, amount, fund_count FROM project_fund_ledger_types "
+            "WHERE project_id BETWEEN :first_id AND :last_id"
+        ), params)
+    }
+    ledgers = {
+        project_id: (spent, count, last_date)
+        for project_id, spent, count, last_date in conn.execute(text(
+            "SELECT project_id, spent_total, fund_count, last_expense_date FROM project_fund_ledgers "
+            "WHERE project_id BETWEEN :first_id AND :last_id"
+        ), params)
+    }
+
+    drifted = set()
+    for key in actual.keys() | recorded.keys():
+        amount, count = actual.get(key, (0.0, 0))
+        recorded_amount, recorded_count = recorded.get(key, (0.0, 0))
+        if count != recorded_count or abs(amount - recorded_amount) > AMOUNT_TOLERANCE:
+            drifted.add(key[0])
+
+    totals: Dict[int, Tuple[float, int]] = {}
+    for (project_id, _), (amount, count) in actual.items():
+        spent, cnt = totals.get(project_id, (0.0, 0))
+        totals[project_id] = (spent + amount, cnt + count)
+    for project_id in totals.keys() | ledgers.keys():
+        spent, count = totals.get(project_id, (0.0, 0))
+        if project_id not in ledgers:
+            drifted.add(project_id)
+            continue
+        recorded_spent, recorded_count, recorded_last = ledgers[project_id]
+        if (count != recorded_count or abs(spent - recorded_spent) > AMOUNT_TOLERANCE
+                or actual_last.get(project_id) != recorded_last):
+            drifted.add(project_id)
+    return sorted(drifted)
+
+
+def reconcile_fund_ledgers() -> int:
+    """
+    按项目ID分批对账，重建有偏差的台账（定时任务，升级时也用于回填），返回重建的项目数
+    比对在同一事务的一致性快照内进行，经费写入与台账更新同时提交，不会误报
+    """
+    last_id = 0
+    rebuilt = 0
+    while True:
+        with engine.connect() as conn:
+            ids = [row[0] for row in conn.execute(text(
+                "SELECT id FROM projects WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": RECONCILE_BATCH})]
+        if not ids:
+            break
+
+        with engine.begin() as conn:
+            targets = _find_drift(conn, ids[0], ids[-1])
+        if targets:
+            logger.warning(
+                "Fund ledger drift detected for %d projects", len(targets),
+                extra={"project_ids": targets[:20]}
+            )
+            with engine.begin() as conn:
+                rebuild_ledgers(conn, targets)
+            rebuilt += len(targets)
+
+        last_id = ids[-1]
+        if len(ids) < RECONCILE_BATCH:
+            break
+    return rebuilt
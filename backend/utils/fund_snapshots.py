@@ -0,0 +1,239 @@
+"""
+经费月末快照
+- fund_month_snapshots 记录截至每个月末各项目按支出类型的累计支出，由定时任务逐月生成（build_month_snapshots）
+- 每月快照 = 上月快照 + 本月经费，按项目分批生成；每批先锁定项目台账行，与经费写入串行
+- 补录、修改、删除往期经费时，在经费写入事务内修正该月及之后各月快照（见 utils/fund_ledger.py）
+- 任意日期的余额 = 该日期之前最近一个已完成的月末快照 + 快照之后到该日期的经费（get_balances）
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.orm import Session
+from database import engine
+import models
+from utils.fund_ledger import lock_ledgers
+from utils.logger import get_logger
+
+logger = get_logger("fund_snapshots")
+
+# 快照配置
+SNAPSHOT_BATCH = 1000  # 每个生成事务处理的项目数
+EXPORT_BATCH = 2000  # 导出时每次查询的项目数
+
+_ids_param = bindparam("ids", expanding=True)
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month(d: date) -> date:
+    """下月1日"""
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def previous_month(d: date) -> date:
+    """上月1日"""
+    return (d.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+# ==================== 生成 ====================
+
+def _build_batch(month: date, project_ids: List[int], has_previous: bool):
+    """生成一批项目的当月快照（重复执行时覆盖该批已有的当月快照）"""
+    params = {
+        "ids": project_ids, "month": month, "previous": previous_month(month), "next": next_month(month),
+    }
+    with engine.begin() as conn:
+        lock_ledgers(conn, project_ids)
+        conn.execute(text(
+            "DELETE FROM fund_month_snapshots WHERE month = :month AND project_id IN :ids"
+        ).bindparams(_ids_param), params)
+
+        # 首个快照月份没有上月快照，直接累计此前全部经费
+        funds_filter = "expense_date >= :month AND expense_date < :next" if has_previous else "expense_date < :next"
+        previous = (
+            "SELECT project_id, expense_type, amount, fund_count FROM fund_month_snapshots "
+            "WHERE month = :previous AND project_id IN :ids UNION ALL "
+        ) if has_previous else ""
+        conn.execute(text(
+            "INSERT INTO fund_month_snapshots (month, project_id, expense_type, amount, fund_count) "
+            "SELECT :month, project_id, expense_type, SUM(amount), SUM(fund_count) FROM ("
+            f"  {previous}"
+            "  SELECT project_id, expense_type, SUM(amount) AS amount, COUNT(*) AS fund_count FROM funds "
+            f"  WHERE project_id IN :ids AND {funds_filter} GROUP BY project_id, expense_type"
+            ") t GROUP BY project_id, expense_type"
+        ).bindparams(_ids_param), params)
+
+
+def _build_month(month: date, has_previous: bool):
+    """按项目ID分批生成一个月的快照"""
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            ids = [row[0] for row in conn.execute(text(
+                "SELECT id FROM projects WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": SNAPSHOT_BATCH})]
+        if not ids:
+            break
+        _build_batch(month, ids, has_previous)
+        last_id = ids[-1]
+        if len(ids) < SNAPSHOT_BATCH:
+            break
+
+
+def build_month_snapshots(today: Optional[date] = None) -> int:
+    """
+    逐月生成已结束月份的快照，直到上月为止（定时任务，中断后从未完成的月份继续）
+
+    Returns:
+        int: 本次完成的月份数
+    """
+    last_month = previous_month(today or date.today())
+    built = 0
+    while True:
+        with engine.connect() as conn:
+            latest = conn.execute(text(
+                "SELECT month, completed FROM fund_snapshot_periods ORDER BY month DESC LIMIT 1"
+            )).first()
+            if latest is None:
+                earliest = conn.execute(text("SELECT MIN(expense_date) FROM funds")).scalar()
+                if earliest is None:
+                    return built
+                month, has_previous = month_start(earliest), False
+            elif latest.completed:
+                month, has_previous = next_month(latest.month), True
+            else:
+                month = latest.month
+                has_previous = conn.execute(text(
+                    "SELECT COUNT(*) FROM fund_snapshot_periods WHERE month < :month"
+                ), {"month": month}).scalar() > 0
+        if month > last_month:
+            return built
+
+        # 先提交期间行：此后的经费写入会同时修正本月快照，逐批生成时再按锁定后的数据覆盖
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT IGNORE INTO fund_snapshot_periods (month, completed, created_at) VALUES (:month, 0, NOW())"
+            ), {"month": month})
+
+        _build_month(month, has_previous)
+
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE fund_snapshot_periods SET completed = 1, completed_at = NOW() WHERE month = :month"
+            ), {"month": month})
+        built += 1
+        logger.info("Fund snapshot for %s completed", month.strftime("%Y-%m"))
+
+
+# ==================== 查询 ====================
+
+def snapshot_month_for(db: Session, as_of: date) -> Optional[date]:
+    """截至 as_of 可用的最近一个已完成快照月份（月末不晚于 as_of）"""
+    return (
+        db.query(func.max(models.FundSnapshotPeriod.month))
+        .filter(
+            models.FundSnapshotPeriod.completed.is_(True),
+            models.FundSnapshotPeriod.month < month_start(as_of + timedelta(days=1))
+        )
+        .scalar()
+    )
+
+
+def _balances_for(db: Session, projects: List, as_of: date, snapshot_month: Optional[date]) -> List[dict]:
+    """一批项目在 as_of 的余额 = 月末快照 + 快照之后到 as_of 的经费"""
+    ids = [project.id for project in projects]
+    by_type: Dict[int, Dict[str, float]] = {project_id: {} for project_id in ids}
+    if ids:
+        params = {"ids": ids, "as_of": as_of}
+        if snapshot_month is not None:
+            params["month"] = snapshot_month
+            params["after"] = next_month(snapshot_month)
+            snapshot_rows = db.execute(text(
+                "SELECT project_id, expense_type, amount FROM fund_month_snapshots "
+                "WHERE month = :month AND project_id IN :ids"
+            ).bindparams(_ids_param), params)
+            delta_filter = "expense_date >= :after AND expense_date <= :as_of"
+        else:
+            snapshot_rows = []
+            delta_filter = "expense_date <= :as_of"
+        delta_rows = db.execute(text(
+            "SELECT project_id, expense_type, SUM(amount) FROM funds "
+            f"WHERE project_id IN :ids AND {delta_filter} GROUP BY project_id, expense_type"
+        ).bindparams(_ids_param), params)
+
+        for rows in (snapshot_rows, delta_rows):
+            for project_id, expense_type, amount in rows:
+                types = by_type[project_id]
+                types[expense_type] = types.get(expense_type, 0.0) + amount
+
+    items = []
+    for project in projects:
+        types = {name: round(amount, 2) for name, amount in by_type[project.id].items() if abs(amount) >= 0.005}
+        spent = round(sum(types.values()), 2)
+        budget_total = project.budget_total or 0.0
+        items.append({
+            "project_id": project.id,
+            "project_name": project.project_name,
+            "pi_name": project.pi_name,
+            "budget_total": budget_total,
+            "spent": spent,
+            "remaining": round(budget_total - spent, 2),
+            "by_type": types,
+        })
+    return items
+
+
+def _project_columns(db: Session):
+    return db.query(
+        models.Project.id, models.Project.project_name, models.Project.pi_name, models.Project.budget_total
+    )
+
+
+def get_balances(
+    db: Session,
+    as_of: date,
+    skip: int = 0,
+    limit: int = 100,
+    project_id: Optional[int] = None
+) -> Tuple[int, Optional[date], List[dict]]:
+    """
+    查询各项目截至 as_of 的经费余额（按项目ID分页）
+
+    Returns:
+        tuple: (项目总数, 使用的快照月份, 项目余额列表)
+    """
+    query = _project_columns(db)
+    if project_id:
+        query = query.filter(models.Project.id == project_id)
+    total = query.count()
+    projects = query.order_by(models.Project.id).offset(skip).limit(limit).all()
+    snapshot_month = snapshot_month_for(db, as_of)
+    return total, snapshot_month, _balances_for(db, projects, as_of, snapshot_month)
+
+
+def iter_balances(db: Session, as_of: date) -> Iterator[dict]:
+    """按项目ID顺序逐批生成全部项目截至 as_of 的余额（导出用）"""
+    snapshot_month = snapshot_month_for(db, as_of)
+    last_id = 0
+    while True:
+        projects = (
+            _project_columns(db)
+            .filter(models.Project.id > last_id)
+            .order_by(models.Project.id)
+            .limit(EXPORT_BATCH)
+            .all()
+        )
+        if not projects:
+            return
+        yield from _balances_for(db, projects, as_of, snapshot_month)
+        last_id = projects[-1].id
+
+
+def expense_types(db: Session) -> List[str]:
+    """当前使用中的支出类型（按名称排序）"""
+    return [
+        row[0] for row in
+        db.query(models.ProjectFundLedgerType.expense_type).distinct().order_by(models.ProjectFundLedgerType.expense_type)
+    ]
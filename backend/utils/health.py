@@ -0,0 +1,100 @@
+"""
+健康检查与就绪检查
+- 存活检查：进程能响应即可，不访问任何依赖
+- 就绪检查：限时执行 SELECT 1 并测量延迟，检查连接池饱和度，并附带后台任务积压情况
+- 探测结果缓存 PROBE_CACHE_SECONDS 秒，并发探测共享同一次结果，避免探测本身给数据库加压
+- 数据库或连接池任一指标超过阈值时判定为未就绪，负载均衡应停止向该进程转发请求
+- 后台任务积压只作为信息返回：任务在单线程中依次执行，长任务会使其他任务逾期，
+  而摘除进程既不能让任务追上，也会在数据库恢复后仍拒绝请求
+"""
+import time
+import threading
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from database import engine, DATABASE_URL
+from utils.scheduler import scheduler
+
+# 就绪检查配置
+DB_PROBE_TIMEOUT_SECONDS = 1  # 数据库探测的连接/读取超时
+DB_LATENCY_LIMIT_MS = 500  # 数据库延迟阈值
+POOL_SATURATION_LIMIT = 0.9  # 连接池占用比例阈值
+SCHEDULER_BACKLOG_LIMIT_SECONDS = 600  # 后台任务逾期超过该时间时标记为 behind（不影响就绪）
+PROBE_CACHE_SECONDS = 0.5  # 探测结果缓存时间
+
+# 探测使用独立的无池连接：连接池耗尽时探测不会排队等待，且超时可控
+_probe_engine = create_engine(
+    DATABASE_URL,
+    poolclass=NullPool,
+    connect_args={
+        "connect_timeout": DB_PROBE_TIMEOUT_SECONDS,
+        "read_timeout": DB_PROBE_TIMEOUT_SECONDS,
+    },
+)
+
+_probe_lock = threading.Lock()
+_cached_result: Optional[Dict[str, Any]] = None
+_cached_at = 0.0
+
+
+def probe_database() -> Dict[str, Any]:
+    """限时执行 SELECT 1"""
+    started = time.perf_counter()
+    try:
+        with _probe_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "error": str(e).splitlines()[0][:200]}
+
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    return {"ok": latency_ms <= DB_LATENCY_LIMIT_MS, "latency_ms": latency_ms}
+
+
+def probe_pool() -> Dict[str, Any]:
+    """连接池饱和度"""
+    pool = engine.pool
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    saturation = round(checked_out / capacity, 2) if capacity else 0
+    return {
+        "ok": saturation < POOL_SATURATION_LIMIT,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": saturation,
+    }
+
+
+def probe_scheduler() -> Dict[str, Any]:
+    """后台任务积压（仅供参考，不参与就绪判定）"""
+    backlog = scheduler.backlog()
+    return dict(
+        backlog,
+        running=scheduler.is_alive(),
+        behind=backlog["max_overdue_seconds"] > SCHEDULER_BACKLOG_LIMIT_SECONDS,
+    )
+
+
+def check_readiness() -> Dict[str, Any]:
+    """
+    就绪检查（带短时缓存）
+
+    Returns:
+        dict: ready 及各项检查结果
+    """
+    global _cached_result, _cached_at
+
+    with _probe_lock:
+        if _cached_result is not None and time.monotonic() - _cached_at < PROBE_CACHE_SECONDS:
+            return _cached_result
+
+        checks = {
+            "database": probe_database(),
+            "pool": probe_pool(),
+        }
+        _cached_result = {
+            "ready": all(check["ok"] for check in checks.values()),
+            "checks": checks,
+            "scheduler": probe_scheduler(),
+        }
+        _cached_at = time.monotonic()
+        return _cached_result
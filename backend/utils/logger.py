@@ -0,0 +1,211 @@
+"""
+结构化日志
+- 每条日志输出为一行 JSON，带 request_id，可与审计日志（operation_logs.request_id）关联
+- 请求线程只把日志放入内存队列，由后台 QueueListener 线程格式化并写出，请求路径不阻塞在 I/O 上
+- 队列满时丢弃日志并计数，不阻塞请求
+- 各日志器级别见 LOG_LEVELS
+- DEBUG 日志按比例采样，并按调用位置限速，防止高频调试日志拖慢进程
+"""
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# 日志配置
+LOG_QUEUE_SIZE = 10000  # 日志队列容量
+DEBUG_SAMPLE_RATE = 0.1  # DEBUG 日志采样比例
+RATE_LIMIT_PER_MINUTE = 60  # 每个调用位置每分钟最多输出的 DEBUG 日志条数
+
+# 各日志器级别（"" 为根日志器）
+LOG_LEVELS: Dict[str, str] = {
+    "": "INFO",
+    "rms": "INFO",
+    "sqlalchemy.engine": "WARNING",  # 改为 INFO 可输出 SQL 语句
+    "uvicorn.access": "WARNING",  # 访问日志由 /metrics 和审计日志覆盖
+}
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# LogRecord 自带属性，其余属性视为 extra 字段输出
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取系统日志器（统一挂在 rms 下）"""
+    return logging.getLogger(f"rms.{name}")
+
+
+def current_request_id() -> Optional[str]:
+    """当前请求的ID（不在请求上下文中时返回 None）"""
+    return _request_id.get()
+
+
+def dropped_count() -> int:
+    """因队列已满而丢弃的日志条数"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class JsonFormatter(logging.Formatter):
+    """单行 JSON 格式"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and key != "request_id":
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """DEBUG 日志采样与按调用位置限速（WARNING 及以上级别不受影响）"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[str, int], list] = {}  # (文件, 行号) -> [窗口起点, 已输出条数]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if random.random() >= DEBUG_SAMPLE_RATE:
+            return False
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 60:
+                window = self._windows[key] = [now, 0]
+            window[1] += 1
+            return window[1] <= RATE_LIMIT_PER_MINUTE
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    放入有界队列，队列满时丢弃
+    在请求线程内补上 request_id 并展开异常堆栈，格式化留给监听线程
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """配置日志（重复调用无副作用）"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name or None).setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """停止监听线程（写出队列中剩余的日志）"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def reinit_after_fork():
+    """fork 出的子进程中监听线程不存在，重新配置日志"""
+    global _listener, _queue_handler
+    _listener = None
+    _queue_handler = None
+    setup_logging()
+
+
+class RequestIdMiddleware:
+    """
+    为每个请求分配 request_id（沿用上游传入的合法 X-Request-ID），写入响应头
+    日志与审计日志通过 current_request_id() 读取
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,356 @@
+"""
+运行指标采集（Prometheus 文本格式）
+- 进程内计数器、仪表、直方图，每个指标一把锁，记录开销为一次加锁加法
+- 多进程部署时，各进程定期将快照写入 METRICS_DIR/<pid>.json，抓取时合并所有进程的快照
+- 超过 STALE_SECONDS 未更新的快照视为进程已退出，合并时删除
+- 抓取需携带令牌（见 METRICS_TOKEN，未配置时不开放），不依赖外部服务
+"""
+import os
+import hmac
+import json
+import time
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from database import engine
+from utils.logger import get_logger, dropped_count
+
+logger = get_logger("metrics")
+
+# 指标配置
+METRICS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run", "metrics"
+)
+FLUSH_SECONDS = 5  # 快照写入间隔
+STALE_SECONDS = 30  # 快照过期时间
+# 抓取令牌（Prometheus 以 Authorization: Bearer <令牌> 抓取），为空时 /metrics 不开放；生产环境需设置
+# 不按客户端地址放行：经本机反向代理转发的外部请求来源地址也是 127.0.0.1
+METRICS_TOKEN = ""
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """指标基类"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+        REGISTRY[name] = self
+
+    def samples(self) -> List[List[Any]]:
+        """[[标签值列表, 取值]]"""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Counter(Metric):
+    """计数器"""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """仪表"""
+
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """直方图（取值为 [各桶计数（非累计，末位为 +Inf）, 总和]）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels: str, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self._values.items()]
+
+
+REGISTRY: Dict[str, Metric] = {}
+_collectors: List[Callable[[], None]] = []
+
+
+def register_collector(func: Callable[[], None]):
+    """注册抓取前执行的采集函数（用于更新连接池等瞬时状态类指标）"""
+    _collectors.append(func)
+    return func
+
+
+# ==================== 指标定义 ====================
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP 请求耗时", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "正在处理的 HTTP 请求数")
+
+DB_POOL = Gauge("db_pool_connections", "数据库连接池连接数", ("state",))
+
+AUDIT_DICT_LOOKUPS = Counter("audit_dict_cache_lookups_total", "审计字典缓存查找次数", ("result",))
+AUDIT_DICT_ENTRIES = Gauge("audit_dict_cache_entries", "审计字典缓存项数")
+
+AUDIT_EXPORTS = Counter("audit_exports_total", "审计日志导出次数", ("format",))
+AUDIT_EXPORTS_IN_FLIGHT = Gauge("audit_exports_in_flight", "正在进行的审计日志导出数")
+
+SINGLEFLIGHT_CALLS = Counter("singleflight_calls_total", "单飞合并调用次数（shared 为被合并的请求）", ("name", "role"))
+
+LOGS_DROPPED = Gauge("logs_dropped", "因日志队列已满而丢弃的日志条数")
+
+
+@register_collector
+def _collect_pool():
+    pool = engine.pool
+    DB_POOL.set("size", value=pool.size())
+    DB_POOL.set("checked_out", value=pool.checkedout())
+    DB_POOL.set("checked_in", value=pool.checkedin())
+    DB_POOL.set("overflow", value=max(pool.overflow(), 0))
+
+
+@register_collector
+def _collect_audit_dict():
+    from utils.audit_dict import AuditDict
+    AUDIT_DICT_ENTRIES.set(value=len(AuditDict._values))
+
+
+@register_collector
+def _collect_logging():
+    LOGS_DROPPED.set(value=dropped_count())
+
+
+# ==================== 中间件 ====================
+
+class MetricsMiddleware:
+    """按路由模板统计请求数和耗时（使用路由模板而非实际路径，避免标签基数膨胀）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUESTS.inc(scope["method"], route_path, str(status_code))
+            HTTP_DURATION.observe(scope["method"], route_path, value=time.perf_counter() - started)
+
+
+# ==================== 多进程快照 ====================
+
+def snapshot() -> Dict[str, Any]:
+    """本进程的指标快照"""
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.error("Collector %s failed: %s", collector.__name__, e)
+
+    return {
+        name: {
+            "type": metric.kind,
+            "help": metric.help,
+            "labels": list(metric.labelnames),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": metric.samples(),
+        }
+        for name, metric in REGISTRY.items()
+    }
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def flush():
+    """将本进程快照写入共享目录"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _load_snapshots() -> List[Dict[str, Any]]:
+    """读取所有进程的快照，顺便清理过期快照"""
+    snapshots = []
+    now = time.time()
+    for filename in os.listdir(METRICS_DIR):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(METRICS_DIR, filename)
+        try:
+            if now - os.path.getmtime(path) > STALE_SECONDS:
+                os.remove(path)
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # 其他进程正在替换或删除该文件
+            continue
+    return snapshots
+
+
+def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并多个进程的快照（所有类型均按标签求和）"""
+    merged: Dict[str, Any] = {}
+    for data in snapshots:
+        for name, metric in data.items():
+            target = merged.setdefault(name, dict(metric, values={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    entry = target["values"].get(key)
+                    if entry is None:
+                        target["values"][key] = [list(value[0]), value[1]]
+                    else:
+                        entry[0] = [a + b for a, b in zip(entry[0], value[0])]
+                        entry[1] += value[1]
+                else:
+                    target["values"][key] = target["values"].get(key, 0.0) + value
+    return merged
+
+
+# ==================== 文本格式输出 ====================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: List[str], values: List[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(merged: Dict[str, Any]) -> str:
+    """按 Prometheus 文本格式（0.0.4）输出"""
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labels"]
+        for key in sorted(metric["values"]):
+            value = metric["values"][key]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, list(key))} {_format_value(value)}")
+                continue
+
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(names, list(key), ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, list(key))} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(names, list(key))} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def authorized(authorization: Optional[str]) -> bool:
+    """校验抓取请求的 Authorization 头（未配置令牌时一律拒绝）"""
+    if not METRICS_TOKEN or not authorization:
+        return False
+    return hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+
+
+def export_text() -> str:
+    """汇总所有进程的指标（共享目录不可用时只输出本进程）"""
+    try:
+        flush()
+        return render(merge(_load_snapshots()))
+    except OSError as e:
+        logger.warning("Shared registry unavailable: %s", e)
+        return render(merge([snapshot()]))
+
+
+# ==================== 后台写入 ====================
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _flush_loop():
+    while not _stop.wait(FLUSH_SECONDS):
+        try:
+            flush()
+        except Exception as e:
+            logger.error("Flush failed: %s", e)
+
+
+def start_flusher():
+    """启动快照写入线程"""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_flush_loop, name="rms-metrics", daemon=True)
+    _thread.start()
+
+
+def stop_flusher():
+    """停止快照写入线程并删除本进程快照"""
+    global _thread
+    _stop.set()
+    if _thread:
+        _thread.join(FLUSH_SECONDS)
+        _thread = None
+    try:
+        os.remove(_snapshot_path(os.getpid()))
+    except OSError:
+        pass
@@ -0,0 +1,579 @@
+"""
+统计立方体（进程内列式存储，支持任意维度的分组/筛选）
+- 事实表：项目（学院 × 年份 × 项目类型 × 状态）、论文（学院 × 年份 × JCR分区 × 中科院分区）、
+  经费（学院 × 年份 × 月份 × 支出类型）
+- 维度取值字典编码为 int32 列，度量为 float64 列；查询时各维度编码合成一个分组键，一次 bincount 完成聚合
+  （列式存储见 utils/olap_store.py，由后台加载线程导入，NumPy 不拖慢应用启动）
+- 事实可叠加：启动后由后台线程在数据库中按维度预聚合加载；本进程提交的写入以增量行追加
+  （新增为正行、删除为负行、修改为旧值负行 + 新值正行），增量行过多时由后台线程在内存中合并（合并计算不持有锁）
+- 学院取自项目负责人 / 论文录入人（经费取所属项目负责人），用户学院或项目负责人变化时按归属列就地改写
+- 其他进程的写入通过数据版本号发现（版本号增量多于本进程提交的次数），由后台线程重新加载该事实表；
+  不经 ORM 的批量写入和其他进程修改用户学院由定期全量重载兜底
+"""
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+from utils import data_version
+from utils.logger import get_logger
+
+logger = get_logger("olap_cube")
+
+# 立方体配置
+REFRESH_SECONDS = 30  # 后台检查其他进程写入的间隔
+FULL_RELOAD_SECONDS = 6 * 3600  # 定期全量重载的间隔
+
+
+class CubeNotReady(Exception):
+    """立方体尚未完成首次加载"""
+
+
+def _label(value) -> Optional[str]:
+    """维度取值规范化为字符串（枚举取中文值）"""
+    if value is None or value == "":
+        return None
+    return str(getattr(value, "value", value))
+
+
+def _year(d) -> Optional[str]:
+    return str(d.year) if d else None
+
+
+def _month(d) -> Optional[str]:
+    return f"{d.year:04d}-{d.month:02d}" if d else None
+
+
+# ==================== 事实定义 ====================
+
+class FactSpec:
+    """
+    事实表定义
+    - attrs: 模型中参与维度/度量的属性，修改这些属性时生成增量行
+    - owner_attr: 学院归属键属性
+    - row: 由属性值生成 (维度取值, 度量值)，不含学院
+    - load: 在数据库中按维度预聚合，返回 [(owner, 各维度取值..., 各度量值...)]
+    """
+
+    def __init__(self, name: str, model, dims: Tuple[str, ...], measures: Tuple[str, ...], attrs: Tuple[str, ...],
+                 owner_attr: str, row: Callable[[dict], Tuple[dict, dict]], load: Callable[[Session], List]):
+        self.name = name
+        self.model = model
+        self.table = model.__table__.name
+        self.dims = dims
+        self.measures = measures
+        self.attrs = attrs
+        self.owner_attr = owner_attr
+        self.row = row
+        self.load = load
+
+
+def _load_projects(db: Session) -> List:
+    year = func.year(models.Project.start_date)
+    return (
+        db.query(models.Project.pi_id, year, models.Project.project_type, models.Project.status,
+                 func.count(), func.sum(models.Project.budget_total))
+        .group_by(models.Project.pi_id, year, models.Project.project_type, models.Project.status)
+        .all()
+    )
+
+
+def _load_papers(db: Session) -> List:
+    year = func.year(models.Paper.publication_date)
+    return (
+        db.query(models.Paper.creator_id, year, models.Paper.jcr_zone, models.Paper.cas_zone,
+                 func.count(), func.sum(models.Paper.impact_factor))
+        .group_by(models.Paper.creator_id, year, models.Paper.jcr_zone, models.Paper.cas_zone)
+        .all()
+    )
+
+
+def _load_funds(db: Session) -> List:
+    year = func.year(models.Fund.expense_date)
+    month = func.date_format(models.Fund.expense_date, "%Y-%m")
+    return (
+        db.query(models.Fund.project_id, year, month, models.Fund.expense_type,
+                 func.count(), func.sum(models.Fund.amount))
+        .group_by(models.Fund.project_id, year, month, models.Fund.expense_type)
+        .all()
+    )
+
+
+FACTS = {
+    "projects": FactSpec(
+        "projects", models.Project,
+        dims=("college", "year", "project_type", "status"), measures=("count", "budget_total"),
+        attrs=("pi_id", "start_date", "project_type", "status", "budget_total"), owner_attr="pi_id",
+        row=lambda v: (
+            {"year": _year(v["start_date"]), "project_type": _label(v["project_type"]), "status": _label(v["status"])},
+            {"count": 1.0, "budget_total": v["budget_total"]},
+        ),
+        load=_load_projects,
+    ),
+    "papers": FactSpec(
+        "papers", models.Paper,
+        dims=("college", "year", "jcr_zone", "cas_zone"), measures=("count", "impact_factor"),
+        attrs=("creator_id", "publication_date", "jcr_zone", "cas_zone", "impact_factor"), owner_attr="creator_id",
+        row=lambda v: (
+            {"year": _year(v["publication_date"]), "jcr_zone": _label(v["jcr_zone"]), "cas_zone": _label(v["cas_zone"])},
+            {"count": 1.0, "impact_factor": v["impact_factor"]},
+        ),
+        load=_load_papers,
+    ),
+    "funds": FactSpec(
+        "funds", models.Fund,
+        dims=("college", "year", "month", "expense_type"), measures=("count", "amount"),
+        attrs=("project_id", "expense_date", "expense_type", "amount"), owner_attr="project_id",
+        row=lambda v: (
+            {"year": _year(v["expense_date"]), "month": _month(v["expense_date"]),
+             "expense_type": _label(v["expense_type"])},
+            {"count": 1.0, "amount": v["amount"]},
+        ),
+        load=_load_funds,
+    ),
+}
+SOURCE_TABLES = tuple(spec.table for spec in FACTS.values())
+_MODEL_FACTS = {spec.model: spec for spec in FACTS.values()}
+
+
+# ==================== 立方体 ====================
+
+class Cube:
+    """进程内统计立方体"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.facts: Dict[str, "FactTable"] = {}
+        self.user_college: Dict[int, Optional[str]] = {}
+        self.project_pi: Dict[int, int] = {}
+        self.loaded_at: Optional[datetime] = None
+        self._seen: Dict[str, int] = {}  # 加载时各表的数据版本号
+        self._local_bumps: Dict[str, int] = {table: 0 for table in SOURCE_TABLES}  # 此后本进程提交的版本号增量
+        self._pending: deque = deque()  # 本进程已提交、尚未应用的写入批次 (序号, 批次)
+        self._sequence = 0  # 提交前分配的写入序号（见 _before_commit）
+        self._inflight: Set[int] = set()  # 已分配序号、尚未提交完成的写入
+        self._uncertain: Dict[int, Set[str]] = {}  # 无法确定是否在加载快照内的写入 -> 涉及的重新加载事实表
+        self._reloading = False
+        self._applied_during_reload: List[Tuple[int, dict]] = []  # 重新加载期间已应用到旧表的批次
+        self._last_full_reload = 0.0
+
+    # ---------- 学院归属 ----------
+
+    def _college_of(self, fact: str, owner: Optional[int]) -> Optional[str]:
+        if fact == "funds":
+            owner = self.project_pi.get(owner)
+        return _label(self.user_college.get(owner))
+
+    def _owners_of_user(self, fact: str, user_id: int) -> List[int]:
+        if fact == "funds":
+            return [project_id for project_id, pi_id in self.project_pi.items() if pi_id == user_id]
+        return [user_id]
+
+    # ---------- 加载 ----------
+
+    def reload(self, names: Iterable[str] = tuple(FACTS)):
+        """
+        重新加载指定事实表（加载期间查询继续使用旧数据）
+        顺序：读版本号 → 记录 settled 与未完成的写入 → 首个查询建立一致性读快照 → 记录 mark
+        写入序号在提交前分配（见 _before_commit），据此判断批次是否已在快照内：
+        - 序号不超过 settled 且当时已提交完成的批次在快照内，丢弃其增量行
+        - 序号大于 mark 的批次在快照之后提交，照常应用
+        - 其余批次（快照前后正在提交）无法确定，丢弃其增量行并将涉及的事实表标记为过期，下次检查时重新加载
+        - 版本号先于快照读取：快照之后提交的批次其版本号递增都晚于读取，不会重复计入
+        """
+        from utils.olap_store import build_table
+
+        names = list(names)
+        started = time.perf_counter()
+        data_version.invalidate()
+        versions = dict(zip(SOURCE_TABLES, data_version.current(*SOURCE_TABLES)))
+
+        db = SessionLocal()
+        try:
+            with self._lock:
+                settled = self._sequence
+                uncertain = set(self._inflight)
+                self._reloading = True
+            db.query(models.User.id).limit(1).all()  # 首个一致性读，InnoDB 在此建立读视图
+            with self._lock:
+                mark = self._sequence
+                uncertain.update(range(settled + 1, mark + 1))
+                for sequence in uncertain:
+                    self._uncertain.setdefault(sequence, set()).update(names)
+            user_college = dict(db.query(models.User.id, models.User.college).all())
+            project_pi = dict(db.query(models.Project.id, models.Project.pi_id).all())
+            with self._lock:
+                self.user_college, self.project_pi = user_college, project_pi
+            tables = {
+                name: build_table(
+                    name, FACTS[name].dims, FACTS[name].measures, FACTS[name].load(db),
+                    lambda owner, fact=name: self._college_of(fact, owner)
+                )
+                for name in names
+            }
+        except Exception:
+            with self._lock:
+                self._reloading = False
+                self._applied_during_reload = []
+                for sequence in uncertain:
+                    self._uncertain.pop(sequence, None)
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            self.facts.update(tables)
+            for name in names:
+                table = FACTS[name].table
+                self._seen[table] = versions[table]
+                self._local_bumps[table] = 0
+            # 加载期间由查询应用到旧表的批次，只把快照之后提交、涉及重新加载的部分补到新表
+            replay = []
+            for sequence, batch in self._applied_during_reload:
+                if sequence in self._uncertain:
+                    self._settle(sequence, batch)
+                elif sequence > mark:
+                    replay.append((sequence, _restricted(batch, names, keep=True)))
+            self._reloading = False
+            self._applied_during_reload = []
+            # 快照内已包含的批次只保留其他事实表的部分（和幂等的学院归属变化），快照之后的照常应用；
+            # 无法确定的批次留给 _apply_pending 处理
+            self._pending = deque(replay + [
+                (sequence, batch if sequence > mark or sequence in self._uncertain
+                 else _restricted(batch, names, keep=False))
+                for sequence, batch in self._pending
+            ])
+            self._apply_pending()
+            self.loaded_at = datetime.now()
+
+        logger.info(
+            "Cube loaded %s", ",".join(names),
+            extra={"rows": {name: table.size for name, table in tables.items()},
+                   "duration_ms": int((time.perf_counter() - started) * 1000)}
+        )
+
+    # ---------- 增量 ----------
+
+    def begin_commit(self) -> int:
+        """提交前分配写入序号（在会话 before_commit 中调用）"""
+        with self._lock:
+            self._sequence += 1
+            self._inflight.add(self._sequence)
+            return self._sequence
+
+    def enqueue(self, sequence: int, batch: Optional[dict]):
+        """登记本进程已提交的写入批次（在会话 after_commit 中调用，batch 为 None 表示没有相关写入）"""
+        with self._lock:
+            self._inflight.discard(sequence)
+            if batch is None:
+                self._uncertain.pop(sequence, None)
+            else:
+                self._pending.append((sequence, batch))
+
+    def abandon(self, sequence: int):
+        """提交未完成（回滚或提交失败后关闭会话）时释放写入序号"""
+        with self._lock:
+            self._inflight.discard(sequence)
+            self._uncertain.pop(sequence, None)
+
+    def _settle(self, sequence: int, batch: dict) -> dict:
+        """
+        处理无法确定是否在加载快照内的批次（需持有锁）：
+        涉及的重新加载事实表标记为过期，返回去掉这些事实表增量的批次
+        """
+        names = self._uncertain.pop(sequence)
+        for name in names:
+            table = FACTS[name].table
+            if name in batch["deltas"] or name in batch["stale"] or table in batch["bumps"]:
+                self._seen[table] = -1  # 下次检查时重新加载
+        return _restricted(batch, list(names), keep=False)
+
+    def _apply_pending(self):
+        """应用已提交的写入批次（需持有锁）"""
+        while self._pending:
+            sequence, batch = self._pending.popleft()
+            if self._reloading:
+                self._applied_during_reload.append((sequence, batch))
+            elif sequence in self._uncertain:
+                batch = self._settle(sequence, batch)
+            for table, count in batch["bumps"].items():
+                self._local_bumps[table] += count
+
+            # 负行按变化前的学院归属、正行按变化后的学院归属计入（如删除项目时其经费的负行）
+            self._append_deltas(batch, sign=-1)
+            for user_id, college in batch["user_college"].items():
+                self.user_college[user_id] = college
+                for name, table in self.facts.items():
+                    table.recode("college", self._owners_of_user(name, user_id), _label(college))
+            for project_id, pi_id in batch["project_pi"].items():
+                if pi_id is None:
+                    self.project_pi.pop(project_id, None)
+                    continue
+                self.project_pi[project_id] = pi_id
+                if "funds" in self.facts:
+                    self.facts["funds"].recode("college", [project_id], self._college_of("funds", project_id))
+
+            self._append_deltas(batch, sign=1)
+
+            for name in batch["stale"]:
+                self._seen[FACTS[name].table] = -1  # 下次检查时重新加载
+
+    def _append_deltas(self, batch: dict, sign: int):
+        """追加批次中指定符号的增量行（需持有锁）"""
+        for name, deltas in batch["deltas"].items():
+            table = self.facts.get(name)
+            if table is None:
+                continue
+            rows = []
+            for delta_sign, owner, values in deltas:
+                if delta_sign != sign:
+                    continue
+                dims, measures = FACTS[name].row(values)
+                dims["college"] = self._college_of(name, owner)
+                rows.append((owner, dims, {measure: sign * (value or 0.0) for measure, value in measures.items()}))
+            table.append_rows(rows)
+
+    def compact(self):
+        """合并增量行过多的事实表（后台线程调用；合并计算不持有锁，期间查询继续使用未合并的表）"""
+        for name in list(self.facts):
+            with self._lock:
+                table = self.facts.get(name)
+                if table is None or not table.needs_compaction():
+                    continue
+            started = time.perf_counter()
+            merged = table.merge_prefix()
+            with self._lock:
+                if self.facts.get(name) is not table or not table.replace_prefix(merged):
+                    continue  # 合并期间表被重新加载或学院归属被改写，下次再合并
+            logger.info("Cube compacted %s", name,
+                        extra={"rows": table.size, "duration_ms": int((time.perf_counter() - started) * 1000)})
+
+    def refresh(self):
+        """后台检查：应用本进程写入，重新加载被其他进程修改的事实表，合并增量行过多的事实表"""
+        if not self.facts or time.monotonic() - self._last_full_reload >= FULL_RELOAD_SECONDS:
+            self.reload()
+            self._last_full_reload = time.monotonic()
+            return
+
+        # 先读版本号再应用本进程写入：已计入版本号的本进程提交都已登记，多出的增量来自其他进程
+        data_version.invalidate()
+        versions = dict(zip(SOURCE_TABLES, data_version.current(*SOURCE_TABLES)))
+        with self._lock:
+            self._apply_pending()
+            expected = {table: self._seen.get(table, -1) + self._local_bumps[table] for table in SOURCE_TABLES}
+        stale = [name for name, spec in FACTS.items() if versions[spec.table] > expected[spec.table]]
+        if stale:
+            self.reload(stale)
+        self.compact()
+
+    # ---------- 查询 ----------
+
+    def query(self, fact: str, group_by: List[str], filters: Dict[str, List[str]]) -> dict:
+        """多维聚合查询（先应用本进程已提交的写入）"""
+        spec = FACTS.get(fact)
+        if spec is None:
+            raise ValueError(f"未知的事实表: {fact}")
+        for dim in list(group_by) + list(filters):
+            if dim not in spec.dims:
+                raise ValueError(f"{fact} 没有维度 {dim}，可用维度: {', '.join(spec.dims)}")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("分组维度重复")
+
+        with self._lock:
+            table = self.facts.get(fact)
+            if table is None:
+                raise CubeNotReady("统计数据加载中")
+            self._apply_pending()
+            started = time.perf_counter()
+            result = table.query(group_by, filters)
+        result.update({
+            "fact": fact,
+            "group_by": group_by,
+            "filters": filters,
+            "measures": list(spec.measures),
+            "loaded_at": self.loaded_at,
+            "query_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+        return result
+
+    def describe(self, fact: str) -> dict:
+        """事实表的维度及各维度取值（供前端生成下钻选项）"""
+        spec = FACTS.get(fact)
+        if spec is None:
+            raise ValueError(f"未知的事实表: {fact}")
+        with self._lock:
+            table = self.facts.get(fact)
+            if table is None:
+                raise CubeNotReady("统计数据加载中")
+            return {
+                "fact": fact,
+                "dimensions": {dim: sorted(table.dictionaries[dim].values) for dim in spec.dims},
+                "measures": list(spec.measures),
+                "rows": table.size,
+                "loaded_at": self.loaded_at,
+            }
+
+
+def _restricted(batch: dict, names: List[str], keep: bool) -> dict:
+    """
+    按事实表筛选批次中的增量行、版本号增量和过期标记（学院归属变化可重复应用，始终保留）
+    keep=True 只保留 names 的部分，keep=False 去掉 names 的部分
+    """
+    tables = {FACTS[name].table for name in names}
+    return {
+        "bumps": {table: count for table, count in batch["bumps"].items() if (table in tables) == keep},
+        "deltas": {name: deltas for name, deltas in batch["deltas"].items() if (name in names) == keep},
+        "user_college": batch["user_college"],
+        "project_pi": batch["project_pi"],
+        "stale": [name for name in batch["stale"] if (name in names) == keep],
+    }
+
+
+cube = Cube()
+
+
+# ==================== 会话事件 ====================
+
+_MISSING = object()
+
+
+def _values(obj, attrs: Tuple[str, ...], old: bool = False, inserted: bool = False):
+    """取对象 flush 前的旧值或 flush 后的新值，属性未加载（无法得知取值）时返回 None"""
+    state = inspect(obj)
+    values = {}
+    for attr in attrs:
+        if inserted:
+            value = state.dict.get(attr)  # 新增对象未赋值的属性写入的是 NULL
+        else:
+            history = state.attrs[attr].history
+            value = ((history.deleted if old else history.added) or history.unchanged or [_MISSING])[0]
+        if value is _MISSING:
+            return None
+        values[attr] = value
+    return values
+
+
+def _changed(obj, attrs: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session, flush_context):
+    """记录本次 flush 对事实表的影响（flush 后属性历史仍可读）"""
+    batch = session.info.setdefault("cube_batch", {
+        "bumps": {}, "deltas": {}, "user_college": {}, "project_pi": {}, "stale": [],
+    })
+
+    def add(spec: FactSpec, sign: int, values: Optional[dict]):
+        if values is None:
+            batch["stale"].append(spec.name)
+            return
+        batch["deltas"].setdefault(spec.name, []).append((sign, values[spec.owner_attr], values))
+
+    for obj in session.new:
+        spec = _MODEL_FACTS.get(type(obj))
+        if spec:
+            add(spec, 1, _values(obj, spec.attrs, inserted=True))
+        if isinstance(obj, models.Project):
+            batch["project_pi"][obj.id] = obj.pi_id
+        elif isinstance(obj, models.User):
+            batch["user_college"][obj.id] = obj.college
+
+    for obj in session.deleted:
+        spec = _MODEL_FACTS.get(type(obj))
+        if spec:
+            add(spec, -1, _values(obj, spec.attrs, old=True))
+        if isinstance(obj, models.Project):
+            batch["project_pi"][obj.id] = None
+
+    for obj in session.dirty:
+        spec = _MODEL_FACTS.get(type(obj))
+        if spec and _changed(obj, spec.attrs):
+            add(spec, -1, _values(obj, spec.attrs, old=True))
+            add(spec, 1, _values(obj, spec.attrs))
+        if isinstance(obj, models.Project) and _changed(obj, ("pi_id",)):
+            batch["project_pi"][obj.id] = obj.pi_id
+        elif isinstance(obj, models.User) and _changed(obj, ("college",)):
+            batch["user_college"][obj.id] = obj.college
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _before_commit(session):
+    """
+    提交前分配写入序号：重新加载时据此判断批次是否已在快照内
+    （序号在数据库提交之前分配，快照之后才分配序号的写入一定不在快照内）
+    """
+    session.info["cube_sequence"] = cube.begin_commit()
+
+
+@event.listens_for(SessionLocal, "after_commit", insert=True)
+def _after_commit(session):
+    """
+    提交后立即登记写入批次（insert=True：先于 utils/data_version.py 递增版本号执行，
+    使数据库提交与登记之间没有其他数据库操作）
+    """
+    sequence = session.info.pop("cube_sequence", None)
+    batch = session.info.pop("cube_batch", None)
+    if sequence is None:
+        return
+    # data_version 随后对每张被修改的表各递增一次版本号
+    changed = session.info.get("changed_tables", ())
+    if batch is None:
+        batch = {"bumps": {}, "deltas": {}, "user_college": {}, "project_pi": {}, "stale": []}
+    batch["bumps"] = {table: 1 for table in changed if table in SOURCE_TABLES}
+    cube.enqueue(sequence, batch if any(batch.values()) else None)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("cube_batch", None)
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _after_transaction_end(session, transaction):
+    # 提交失败（未触发 after_commit）的事务结束时释放序号（flush 的子事务结束时不处理）
+    if transaction.parent is not None:
+        return
+    sequence = session.info.pop("cube_sequence", None)
+    if sequence is not None:
+        cube.abandon(sequence)
+
+
+# ==================== 后台线程 ====================
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _refresh_loop():
+    while True:
+        try:
+            cube.refresh()
+        except Exception as e:
+            logger.error("Cube refresh failed: %s", e, exc_info=True)
+        if _stop.wait(REFRESH_SECONDS):
+            return
+
+
+def start_loader():
+    """启动立方体加载/刷新线程（首次加载在后台进行，完成前查询返回未就绪）"""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_refresh_loop, name="rms-cube", daemon=True)
+    _thread.start()
+
+
+def stop_loader():
+    """停止立方体刷新线程"""
+    global _thread
+    _stop.set()
+    if _thread:
+        _thread.join(REFRESH_SECONDS)
+        _thread = None
@@ -0,0 +1,251 @@
+"""
+统计立方体的列式存储（NumPy）
+- 维度取值字典编码为 int32 列，度量为 float64 列，owner 列记录学院归属键
+- 查询时各维度编码按混合进制合成一个分组键，一次 bincount 完成聚合
+- 仅由 utils/olap_cube.py 在后台加载线程中导入，NumPy 不拖慢应用启动
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# 存储配置
+COMPACT_MIN_ROWS = 100000  # 增量行达到该数量且超过基础行的 COMPACT_RATIO 时合并
+COMPACT_RATIO = 0.2
+DENSE_GROUP_LIMIT = 1 << 22  # 分组组合数不超过该值时用 bincount 直接聚合，否则先 np.unique 压缩
+UNKNOWN = "未知"  # 空维度取值
+
+
+class Dictionary:
+    """维度取值字典（字符串 ↔ 整数编码，编码只增不减）"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value) -> int:
+        """取值编码（空值记为 UNKNOWN，枚举取中文值），新取值追加到字典末尾"""
+        value = UNKNOWN if value is None or value == "" else str(getattr(value, "value", value))
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values: Iterable, count: int) -> np.ndarray:
+        return np.fromiter((self.encode(value) for value in values), dtype=np.int32, count=count)
+
+
+def _ranks(dictionary: Dictionary) -> np.ndarray:
+    """各编码对应取值的字典序名次"""
+    ranks = np.empty(len(dictionary.values), dtype=np.int64)
+    ranks[np.argsort(np.array(dictionary.values, dtype=object), kind="stable")] = np.arange(len(dictionary.values))
+    return ranks
+
+
+class FactTable:
+    """
+    可叠加的事实表
+    owner 为学院的归属键（项目/论文为用户ID，经费为项目ID），不参与分组
+    """
+
+    def __init__(self, name: str, dims: Tuple[str, ...], measures: Tuple[str, ...]):
+        self.name = name
+        self.dims = dims
+        self.measures = measures
+        self.dictionaries = {dim: Dictionary() for dim in dims}
+        self.size = 0
+        self.base_size = 0
+        self.recodes = 0  # 就地改写维度的次数（合并期间发生改写时放弃合并结果）
+        self.owner = np.zeros(0, dtype=np.int64)
+        self.codes = {dim: np.zeros(0, dtype=np.int32) for dim in dims}
+        self.values = {measure: np.zeros(0, dtype=np.float64) for measure in measures}
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= len(self.owner):
+            return
+        capacity = max(needed, len(self.owner) * 2, 1024)
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            return grown
+
+        self.owner = grow(self.owner)
+        self.codes = {dim: grow(array) for dim, array in self.codes.items()}
+        self.values = {measure: grow(array) for measure, array in self.values.items()}
+
+    def append(self, owner: np.ndarray, codes: Dict[str, np.ndarray], values: Dict[str, np.ndarray]):
+        """追加一批事实行"""
+        count = len(owner)
+        self._reserve(count)
+        end = self.size + count
+        self.owner[self.size:end] = owner
+        for dim in self.dims:
+            self.codes[dim][self.size:end] = codes[dim]
+        for measure in self.measures:
+            self.values[measure][self.size:end] = values[measure]
+        self.size = end
+
+    def append_rows(self, rows: List[Tuple[int, Dict[str, Optional[str]], Dict[str, float]]]):
+        """追加增量行 [(owner, 维度取值, 度量值)]"""
+        if not rows:
+            return
+        count = len(rows)
+        self.append(
+            np.fromiter((row[0] or 0 for row in rows), dtype=np.int64, count=count),
+            {dim: self.dictionaries[dim].encode_many((row[1][dim] for row in rows), count) for dim in self.dims},
+            {
+                measure: np.fromiter((row[2][measure] or 0.0 for row in rows), dtype=np.float64, count=count)
+                for measure in self.measures
+            },
+        )
+
+    def recode(self, dim: str, owners: Iterable[int], value: Optional[str]):
+        """将归属于 owners 的事实行的维度改为 value"""
+        owners = list(owners)
+        if not owners or not self.size:
+            return
+        mask = np.isin(self.owner[:self.size], owners)
+        self.codes[dim][:self.size][mask] = self.dictionaries[dim].encode(value)
+        self.recodes += 1
+
+    def needs_compaction(self) -> bool:
+        """增量行是否多到需要合并"""
+        return self.size - self.base_size >= max(COMPACT_MIN_ROWS, int(self.base_size * COMPACT_RATIO))
+
+    def merge_prefix(self) -> tuple:
+        """
+        合并当前全部事实行：(owner, 各维度) 相同的行相加，去掉已抵消为 0 的组合
+        只读已有的行（追加只写在 size 之后，扩容时换新数组），可在不持有立方体锁时调用；
+        返回值交给 replace_prefix 替换
+        """
+        n, recodes = self.size, self.recodes
+        owner = self.owner[:n]
+        codes = {dim: array[:n] for dim, array in self.codes.items()}
+        values = {measure: array[:n] for measure, array in self.values.items()}
+
+        columns = np.column_stack([owner] + [codes[dim].astype(np.int64) for dim in self.dims])
+        unique, inverse = np.unique(columns, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        sums = {
+            measure: np.bincount(inverse, weights=values[measure], minlength=len(unique))
+            for measure in self.measures
+        }
+        keep = np.round(sums["count"]) != 0
+        merged = (
+            unique[keep, 0],
+            {dim: unique[keep, i + 1].astype(np.int32) for i, dim in enumerate(self.dims)},
+            {measure: sums[measure][keep] for measure in self.measures},
+        )
+        return n, recodes, merged
+
+    def replace_prefix(self, merged: tuple) -> bool:
+        """
+        用 merge_prefix 的结果替换被合并的行，合并期间追加的行接在其后
+        合并期间发生过就地改写时放弃（返回 False，下次再合并）
+        """
+        n, recodes, (owner, codes, values) = merged
+        if recodes != self.recodes:
+            return False
+        tail = (
+            self.owner[n:self.size].copy(),
+            {dim: array[n:self.size].copy() for dim, array in self.codes.items()},
+            {measure: array[n:self.size].copy() for measure, array in self.values.items()},
+        )
+        self.size = 0
+        self.append(owner, codes, values)
+        self.base_size = self.size
+        self.append(*tail)
+        return True
+
+    def query(self, group_by: List[str], filters: Dict[str, List[str]]) -> dict:
+        """按 group_by 分组、filters 筛选（同一维度多个取值为或，不同维度为且）聚合全部度量"""
+        n = self.size
+        mask = None
+        for dim, wanted in filters.items():
+            dictionary = self.dictionaries[dim]
+            lookup = np.zeros(len(dictionary.values), dtype=bool)
+            for value in wanted:
+                code = dictionary.codes.get(value)
+                if code is not None:
+                    lookup[code] = True
+            hit = lookup[self.codes[dim][:n]]
+            mask = hit if mask is None else mask & hit
+
+        cardinalities = [len(self.dictionaries[dim].values) for dim in group_by]
+        key = np.zeros(n, dtype=np.int64)
+        for dim, cardinality in zip(group_by, cardinalities):
+            key = key * cardinality + self.codes[dim][:n]
+        values = {measure: self.values[measure][:n] for measure in self.measures}
+        if mask is not None:
+            key = key[mask]
+            values = {measure: array[mask] for measure, array in values.items()}
+
+        combinations = int(np.prod(cardinalities, dtype=np.int64)) if group_by else 1
+        if combinations <= DENSE_GROUP_LIMIT:
+            group_keys = np.arange(combinations, dtype=np.int64)
+            slots = key
+        else:
+            group_keys, slots = np.unique(key, return_inverse=True)
+        sums = {
+            measure: np.bincount(slots, weights=array, minlength=len(group_keys))
+            for measure, array in values.items()
+        }
+        present = np.flatnonzero(np.round(sums["count"]) != 0)
+
+        # 解码分组键：按各维度取值的字典序排序，整列取值后再组装行
+        codes = np.unravel_index(group_keys[present], cardinalities) if group_by else ()
+        if group_by:
+            ranks = [_ranks(self.dictionaries[dim])[code] for dim, code in zip(group_by, codes)]
+            order = np.lexsort(ranks[::-1])
+            present, codes = present[order], [code[order] for code in codes]
+        columns = [np.array(self.dictionaries[dim].values, dtype=object)[code].tolist()
+                   for dim, code in zip(group_by, codes)]
+        for measure in self.measures:
+            column = sums[measure][present]
+            columns.append(np.rint(column).astype(np.int64).tolist() if measure == "count"
+                           else np.round(column, 2).tolist())
+        names = list(group_by) + list(self.measures)
+        rows = [dict(zip(names, values)) for values in zip(*columns)]
+
+        total = {}
+        for measure, array in values.items():
+            value = float(array.sum())
+            total[measure] = int(round(value)) if measure == "count" else round(value, 2)
+        return {"rows": rows, "total": total}
+
+
+def build_table(
+    name: str,
+    dims: Tuple[str, ...],
+    measures: Tuple[str, ...],
+    rows: List,
+    college_of: Callable[[int], Optional[str]]
+) -> FactTable:
+    """
+    由数据库预聚合结果建表
+
+    Args:
+        rows: [(owner, 第 2 个及之后各维度取值..., 各度量值...)]，首个维度为学院
+        college_of: owner -> 学院
+    """
+    count = len(rows)
+    table = FactTable(name, dims, measures)
+    owner = np.fromiter((row[0] or 0 for row in rows), dtype=np.int64, count=count)
+
+    # 学院按归属键去重后映射
+    owners, inverse = np.unique(owner, return_inverse=True)
+    owner_codes = np.fromiter(
+        (table.dictionaries[dims[0]].encode(college_of(int(value))) for value in owners),
+        dtype=np.int32, count=len(owners)
+    )
+    codes = {dims[0]: owner_codes[inverse.ravel()] if count else np.zeros(0, dtype=np.int32)}
+    for i, dim in enumerate(dims[1:], start=1):
+        codes[dim] = table.dictionaries[dim].encode_many((row[i] for row in rows), count)
+    values = {
+        measure: np.fromiter((row[len(dims) + i] or 0.0 for row in rows), dtype=np.float64, count=count)
+        for i, measure in enumerate(measures)
+    }
+    table.append(owner, codes, values)
+    table.base_size = table.size
+    return table
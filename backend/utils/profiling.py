@@ -0,0 +1,139 @@
+"""
+请求耗时与 SQL 剖析
+- ASGI 中间件为每个请求记录总耗时、SQL 语句数和 SQL 总耗时
+- 通过 SQLAlchemy before/after_cursor_execute 事件统计当前请求内执行的 SQL
+- 响应附带 Server-Timing 头，浏览器开发者工具可直接查看
+- 超过慢请求阈值时记录请求信息及最慢的若干条 SQL
+- 审计日志自动记录当前请求的耗时与 SQL 统计（见 AuditLogger.log_operation）
+"""
+import heapq
+import time
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from database import engine
+from utils.logger import get_logger
+
+logger = get_logger("profiling")
+
+# 剖析配置
+SLOW_REQUEST_MS = 1000  # 慢请求阈值（毫秒）
+SLOW_STATEMENT_TOP = 5  # 慢请求日志中保留的最慢 SQL 条数
+STATEMENT_MAX_LENGTH = 500  # 日志中 SQL 语句的最大长度
+
+
+class RequestProfile:
+    """单个请求的剖析数据"""
+
+    __slots__ = ("method", "path", "start", "sql_count", "sql_seconds", "slowest", "_lock")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.slowest: List[Tuple[float, int, str]] = []  # 最小堆：(耗时, 序号, 语句)
+        self._lock = threading.Lock()  # 同一请求的 SQL 可能在多个线程中并行执行
+
+    def record(self, statement: str, seconds: float):
+        """记录一条 SQL"""
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+            item = (seconds, self.sql_count, statement)
+            if len(self.slowest) < SLOW_STATEMENT_TOP:
+                heapq.heappush(self.slowest, item)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def elapsed_ms(self) -> int:
+        """请求开始至今的毫秒数"""
+        return int((time.perf_counter() - self.start) * 1000)
+
+    def sql_ms(self) -> int:
+        """SQL 总耗时（毫秒）"""
+        return int(self.sql_seconds * 1000)
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头"""
+        return (
+            f'app;dur={(time.perf_counter() - self.start) * 1000:.1f}, '
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.sql_count} queries"'
+        )
+
+    def slow_statements(self) -> List[Dict[str, Any]]:
+        """最慢的 SQL（按耗时倒序）"""
+        return [
+            {"ms": round(seconds * 1000, 1), "statement": statement[:STATEMENT_MAX_LENGTH]}
+            for seconds, _, statement in sorted(self.slowest, reverse=True)
+        ]
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """当前请求的剖析数据（不在请求上下文中时返回 None）"""
+    return _current_profile.get()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - context._query_start)
+
+
+class ProfilingMiddleware:
+    """请求剖析中间件（纯 ASGI 实现，不缓冲流式响应）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            elapsed = profile.elapsed_ms()
+            if elapsed >= SLOW_REQUEST_MS:
+                report_slow_request(profile, status_code, elapsed)
+
+
+def report_slow_request(profile: RequestProfile, status_code: int, elapsed: int):
+    """记录慢请求及其最慢的 SQL"""
+    logger.warning(
+        "Slow request %s %s",
+        profile.method, profile.path,
+        extra={
+            "status": status_code,
+            "duration_ms": elapsed,
+            "sql_count": profile.sql_count,
+            "sql_ms": profile.sql_ms(),
+            "slow_statements": profile.slow_statements(),
+        }
+    )
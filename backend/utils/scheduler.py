@@ -0,0 +1,151 @@
+"""
+后台定时任务调度
+- 单个守护线程按间隔执行已注册的任务
+- 多进程部署时通过 MySQL GET_LOCK 保证同一任务同一时刻只在一个进程中执行
+"""
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+from sqlalchemy import text
+from database import engine
+from utils.logger import get_logger
+
+logger = get_logger("scheduler")
+
+
+class Job:
+    """定时任务"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Any], delay: float):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = time.monotonic() + delay
+        self.last_run: Optional[datetime] = None
+        self.last_duration: Optional[int] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self.running = False
+
+
+class Scheduler:
+    """定时任务调度器"""
+
+    TICK_SECONDS = 1.0  # 调度检查间隔
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, interval_seconds: float, func: Callable[[], Any], delay: Optional[float] = None):
+        """
+        注册定时任务
+
+        Args:
+            name: 任务名称（同时作为跨进程锁名）
+            interval_seconds: 执行间隔（秒）
+            func: 任务函数（无参数）
+            delay: 首次执行延迟（秒），默认等于执行间隔
+        """
+        self._jobs[name] = Job(name, interval_seconds, func, interval_seconds if delay is None else delay)
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="rms-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """停止调度线程，等待正在执行的任务结束"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in list(self._jobs.values()):
+                if self._stop.is_set():
+                    break
+                if now >= job.next_run:
+                    try:
+                        self.run_job(job.name)
+                    except Exception as e:
+                        # 连接数据库或获取跨进程锁失败：记录后继续调度，下个周期重试
+                        job.last_error = str(e)
+                        logger.error("Job %s could not run: %s", job.name, e, exc_info=True)
+            self._stop.wait(self.TICK_SECONDS)
+
+    def run_job(self, name: str) -> bool:
+        """
+        立即执行任务（获取跨进程锁失败时跳过）
+
+        Returns:
+            bool: 本进程是否实际执行了任务
+        """
+        job = self._jobs[name]
+        job.next_run = time.monotonic() + job.interval
+
+        with engine.connect() as conn:
+            acquired = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": f"rms_job_{name}"}).scalar()
+            if not acquired:
+                return False
+            try:
+                job.running = True
+                started = time.monotonic()
+                job.last_run = datetime.now()
+                try:
+                    job.last_result = job.func()
+                    job.last_error = None
+                except Exception as e:
+                    # 任务失败不影响调度线程，下个周期重试
+                    job.last_error = str(e)
+                    logger.error("Job %s failed: %s", name, e, exc_info=True)
+                job.last_duration = int((time.monotonic() - started) * 1000)
+            finally:
+                job.running = False
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": f"rms_job_{name}"})
+        return True
+
+    def status(self) -> List[Dict[str, Any]]:
+        """各任务的执行状态"""
+        now = time.monotonic()
+        return [
+            {
+                "name": job.name,
+                "interval": job.interval,
+                "running": job.running,
+                "next_run_in": max(0, int(job.next_run - now)),
+                "last_run": job.last_run.strftime("%Y-%m-%d %H:%M:%S") if job.last_run else None,
+                "last_duration": job.last_duration,
+                "last_error": job.last_error,
+            }
+            for job in self._jobs.values()
+        ]
+
+    def is_alive(self) -> bool:
+        """调度线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def backlog(self) -> Dict[str, Any]:
+        """
+        任务积压情况（供就绪检查使用）
+
+        Returns:
+            dict: 已到期未执行的任务数，以及最久的逾期秒数
+        """
+        now = time.monotonic()
+        overdue = [now - job.next_run for job in self._jobs.values() if now > job.next_run]
+        return {
+            "overdue_jobs": len(overdue),
+            "max_overdue_seconds": round(max(overdue), 1) if overdue else 0,
+        }
+
+
+# 全局调度器
+scheduler = Scheduler()
@@ -1,11 +1,11 @@
 """
 安全相关工具函数
 包括：密码加密、JWT Token 生成与验证
+jose 在首次使用时加载，不拖慢应用启动
 """
 from datetime import datetime, timedelta
 from typing import Optional
 import bcrypt
-from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -47,6 +47,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     """
     创建 JWT Token
     """
+    from jose import jwt
+    
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -62,6 +64,8 @@ def decode_access_token(token: str) -> dict:
     """
     解析 JWT Token
     """
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -86,12 +90,10 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = decode_access_token(token)
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    # 无效 Token 已在 decode_access_token 中转换为 401
+    payload = decode_access_token(token)
+    user_id: int = payload.get("user_id")
+    if user_id is None:
         raise credentials_exception
     
     user = db.query(models.User).filter(models.User.id == user_id).first()
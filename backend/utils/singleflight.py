@@ -0,0 +1,108 @@
+"""
+单飞合并（single-flight）
+- 相同键的并发请求只执行一次计算，其余请求等待并共享同一结果（含异常）
+- 键通常为 (接口, 规范化参数, 数据版本号)，数据变化后的请求不会合并到变化前开始的计算上
+- 只合并进行中的计算，不缓存已完成的结果
+- 共享结果会被多个请求同时使用，调用方不得修改
+- 提供线程（同步路由）与 asyncio（异步路由）两种实现，合并次数见 /metrics
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from utils import data_version
+from utils.metrics import SINGLEFLIGHT_CALLS
+
+
+def flight_key(endpoint: str, params: Optional[Dict[str, Any]] = None, tables: Iterable[str] = ()) -> Tuple:
+    """
+    构造合并键
+
+    Args:
+        endpoint: 接口名称
+        params: 查询参数（值为 None 的参数忽略，与参数顺序无关）
+        tables: 结果依赖的表，其数据版本号计入键
+    """
+    tables = tuple(tables)
+    normalized = tuple(sorted((name, value) for name, value in (params or {}).items() if value is not None))
+    return endpoint, normalized, tables, data_version.current(*tables)
+
+
+class _Call:
+    """进行中的一次计算"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """线程版单飞合并"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """执行 func，或等待相同键进行中的计算并共享其结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(self.name, "shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLEFLIGHT_CALLS.inc(self.name, "leader")
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """asyncio 版单飞合并（同一事件循环内）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 func，或等待相同键进行中的计算并共享其结果"""
+        future = self._calls.get(key)
+        if future is not None:
+            SINGLEFLIGHT_CALLS.inc(self.name, "shared")
+            # shield：某个等待者被取消时不影响计算本身和其他等待者
+            return await asyncio.shield(future)
+
+        SINGLEFLIGHT_CALLS.inc(self.name, "leader")
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 标记异常已读取，无等待者时不产生警告
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,40 @@
+"""
+审计日志完整性校验
+补齐检查点后重算哈希链，报告被篡改、删除或插入的日志
+用法：python verify_audit_chain.py [起始ID] [结束ID]
+"""
+import sys
+import time
+from utils.audit_chain import build_checkpoints, verify_range
+
+if __name__ == "__main__":
+    start_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    end_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print("=" * 60)
+    print(f"  审计日志完整性校验（ID 范围：{start_id or '最早'} ~ {end_id or '最新'}）")
+    print("=" * 60)
+    print()
+
+    try:
+        created = build_checkpoints()
+        if created:
+            print(f"  ✓ 新建检查点 {created} 个")
+
+        started = time.perf_counter()
+        result = verify_range(start_id, end_id, processes=True)
+        elapsed = time.perf_counter() - started
+
+        print(f"  已校验 {result['checked']} 条日志，{result['blocks']} 个块，耗时 {elapsed:.2f}s")
+        for problem in result["problems"]:
+            print(f"  ✗ 日志 {problem['id']}：{problem['error']}")
+
+        if result["valid"]:
+            print("\n✅ 校验通过，未发现篡改")
+        else:
+            print(f"\n❌ 发现 {len(result['problems'])} 处问题")
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"\n❌ 校验失败: {e}")
+        sys.exit(1)